@@ -1,20 +1,189 @@
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
 from src.database.db import db
 from src.database.models.asset_service import  AssetModel
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+# Mongo error code of a unique index violation
+DUPLICATE_KEY = 11000
+
+
+# Fields read by AssetModel; everything else (outbox, hashes, ...) stays in Mongo
+ASSET_PROJECTION = {
+    "user_id": 1, "filename": 1, "content_type": 1, "file_type": 1, "url": 1,
+    "metadata.description": 1, "derivatives": 1,
+}
+
+
+def outbox_record(
+    asset_id: ObjectId, content_hash: Optional[str] = None, content_type: Optional[str] = None
+) -> dict:
+    """Pending asset-upload event, stored inside the asset document it announces."""
+    event = {"asset_id": str(asset_id)}
+    if content_hash:
+        event["content_hash"] = content_hash
+    if content_type:
+        event["content_type"] = content_type
+    return {
+        "events": [event],
+        "created_at": datetime.utcnow(),
+        "lease_owner": None,
+        "lease_until": datetime.min,
+    }
+
 
 class AssetCRUD:
     @staticmethod
     async def create(asset_data: dict) -> dict:
-        result = await db.assets.insert_one(asset_data)
-        asset_data["_id"] = result.inserted_id
+        # The upload event is written in the same document as the asset, so
+        # both are stored atomically without needing a replica set for
+        # transactions; the outbox relay publishes and removes it.
+        document = AssetCRUD._document(asset_data)
+        await db.assets.insert_one(document)
+        asset_data["_id"] = document["_id"]
         return AssetModel(asset_data).to_dict()
 
+    @staticmethod
+    async def create_many(assets: list[dict]) -> list[Optional[dict]]:
+        """
+        Insert several assets (and their outbox records) in one round trip.
+        Assets rejected by a unique index come back as None; the rest are
+        inserted regardless.
+        """
+        documents = [AssetCRUD._document(data) for data in assets]
+        duplicates = set()
+        try:
+            await db.assets.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY for error in errors) or e.details.get("writeConcernErrors"):
+                raise
+            duplicates = {error["index"] for error in errors}
+        saved = []
+        for index, (data, document) in enumerate(zip(assets, documents)):
+            if index in duplicates:
+                saved.append(None)
+                continue
+            data["_id"] = document["_id"]
+            saved.append(AssetModel(data).to_dict())
+        return saved
+
+    @staticmethod
+    def _document(asset_data: dict) -> dict:
+        asset_id = ObjectId()
+        document = {**asset_data, "_id": asset_id}
+        document["outbox"] = outbox_record(
+            asset_id, asset_data.get("content_hash"), asset_data.get("content_type")
+        )
+        return document
+
+    @staticmethod
+    async def get_by_content_hash(content_hash: str, user_id: str) -> Optional[dict]:
+        """Raw asset document of ``user_id`` with these exact bytes."""
+        return await db.assets.find_one({"content_hash": content_hash, "user_id": user_id})
+
+    @staticmethod
+    async def get_by_content_hashes(content_hashes: list[str], user_id: str) -> dict[str, dict]:
+        """Raw asset documents of ``user_id`` by content hash, for many hashes at once."""
+        return {
+            doc["content_hash"]: doc
+            async for doc in db.assets.find({"content_hash": {"$in": content_hashes}, "user_id": user_id})
+        }
+
     @staticmethod
     async def get_by_id(asset_id: str) -> Optional[dict]:
-        asset = await db.assets.find_one({"_id": ObjectId(asset_id)})
+        asset = await db.assets.find_one({"_id": ObjectId(asset_id)}, ASSET_PROJECTION)
         return AssetModel(asset).to_dict() if asset else None
+
+    @staticmethod
+    async def set_derivatives(asset_id: str, derivatives: dict) -> None:
+        """Record the URLs of an asset's derivatives, e.g. ``{"thumbnail": url}``."""
+        await db.assets.update_one({"_id": ObjectId(asset_id)}, {"$set": {"derivatives": derivatives}})
+
+    @staticmethod
+    def _user_query(user_id: str, after: Optional[str]) -> dict:
+        query = {"user_id": user_id}
+        if after is not None:
+            query["_id"] = {"$lt": ObjectId(after)}
+        return query
+
+    @staticmethod
+    async def get_by_user_id(user_id: str, limit: int, after: Optional[str] = None) -> list[dict]:
+        """
+        One page of a user's assets, newest first. ``after`` is the id of the
+        last asset of the previous page (keyset pagination on the
+        ``(user_id, _id)`` index, so deep pages cost the same as the first).
+        """
+        cursor = db.assets.find(AssetCRUD._user_query(user_id, after), ASSET_PROJECTION) \
+            .sort("_id", -1).limit(limit)
+        return [AssetModel(asset).to_dict() async for asset in cursor]
+
+    @staticmethod
+    async def iter_by_user_id(user_id: str, batch_size: int) -> AsyncIterator[dict]:
+        """All of a user's assets, newest first, fetched ``batch_size`` at a time."""
+        cursor = db.assets.find({"user_id": user_id}, ASSET_PROJECTION) \
+            .sort("_id", -1).batch_size(batch_size)
+        async for asset in cursor:
+            yield AssetModel(asset).to_dict()
+
+
+class OutboxCRUD:
+    """Access to the asset-upload events still waiting to be published."""
+
+    PENDING = {"outbox": {"$exists": True}}
+
+    @staticmethod
+    async def claim(owner: str, limit: int, lease_seconds: float) -> list[dict]:
+        """
+        Lease up to ``limit`` of the oldest pending outbox records to
+        ``owner``. Records leased by another relay are skipped until their
+        lease runs out, so several replicas can relay side by side.
+        """
+        now = datetime.utcnow()
+        available = {**OutboxCRUD.PENDING, "outbox.lease_until": {"$lte": now}}
+        candidates = await db.assets.find(available, {"_id": 1}) \
+            .sort("outbox.created_at", 1).limit(limit).to_list(length=limit)
+        if not candidates:
+            return []
+        ids = [doc["_id"] for doc in candidates]
+        await db.assets.update_many(
+            {**available, "_id": {"$in": ids}},
+            {"$set": {"outbox.lease_owner": owner, "outbox.lease_until": now + timedelta(seconds=lease_seconds)}},
+        )
+        return await db.assets.find(
+            {"_id": {"$in": ids}, "outbox.lease_owner": owner}, {"outbox": 1}
+        ).to_list(length=limit)
+
+    @staticmethod
+    async def complete(owner: str, ids: list) -> None:
+        await db.assets.update_many(
+            {"_id": {"$in": ids}, "outbox.lease_owner": owner}, {"$unset": {"outbox": ""}}
+        )
+
+    @staticmethod
+    async def backlog() -> tuple[int, Optional[datetime]]:
+        """Number of pending records and creation time of the oldest one."""
+        count = await db.assets.count_documents(OutboxCRUD.PENDING)
+        oldest = await db.assets.find_one(
+            OutboxCRUD.PENDING, {"outbox.created_at": 1}, sort=[("outbox.created_at", 1)]
+        )
+        return count, oldest["outbox"]["created_at"] if oldest else None
+
+
+class UploadCRUD:
+    """Pending direct-to-S3 uploads, between presigning and completion."""
+
+    @staticmethod
+    async def create(upload_data: dict) -> str:
+        result = await db.uploads.insert_one(upload_data)
+        return str(result.inserted_id)
+
+    @staticmethod
+    async def get_by_id(upload_id: str) -> Optional[dict]:
+        return await db.uploads.find_one({"_id": ObjectId(upload_id)})
+
     @staticmethod
-    async def get_by_user_id(user_id: str) -> list[dict]:
-        assets = await db.assets.find({"user_id": user_id}).to_list(length=None)
-        return [AssetModel(assets).to_dict() for asset in assets] if assets else []
+    async def delete(upload_id: str) -> bool:
+        result = await db.uploads.delete_one({"_id": ObjectId(upload_id)})
+        return result.deleted_count == 1
@@ -6,5 +6,27 @@ class Database:
         self.client = AsyncIOMotorClient(Config.MONGO_URI)
         self.db = self.client[Config.DB_NAME]
         self.assets = self.db["assets"]
+        # Direct-to-S3 uploads handed out but not completed yet
+        self.uploads = self.db["uploads"]
+
+    async def ensure_indexes(self):
+        # Listing a user's assets newest first, paginated by _id
+        await self.assets.create_index([("user_id", 1), ("_id", -1)], name="user_assets")
+        # Abandoned pending uploads expire on their own
+        await self.uploads.create_index("expires_at", expireAfterSeconds=0)
+        # Only assets with unpublished events are indexed for the outbox relay
+        await self.assets.create_index(
+            "outbox.created_at",
+            name="outbox_pending",
+            partialFilterExpression={"outbox": {"$exists": True}},
+        )
+        # Content-addressed dedup: unique on (content_hash, user_id), so each
+        # user holds a distinct file once and dedup never crosses users
+        await self.assets.create_index(
+            [("content_hash", 1), ("user_id", 1)],
+            name="content_hash_user",
+            unique=True,
+            partialFilterExpression={"content_hash": {"$exists": True}},
+        )
 
 db = Database()
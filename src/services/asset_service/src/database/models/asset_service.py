@@ -15,6 +15,7 @@ class AssetModel:
         meta = getattr(self, '_raw', {})  # raw asset dict if stored
         # Actual metadata stored in asset dict
         stored_meta = meta.get('metadata', {}) if isinstance(meta, dict) else {}
+        derivatives = meta.get('derivatives') or {}
         return {
             "id": self.id,
             "user_id": self.user_id,
@@ -23,5 +24,9 @@ class AssetModel:
             "url": self.url,
             "file_type": self.file_type,
             # Pydantic schema expects 'meta_data'
-            "meta_data": {"description": stored_meta.get("description")}
+            "meta_data": {"description": stored_meta.get("description")},
+            # smaller renditions, once the derivative worker has made them
+            "thumbnail_url": derivatives.get("thumbnail"),
+            "rendition_url": derivatives.get("rendition"),
+            "poster_url": derivatives.get("poster"),
         }
@@ -1,5 +1,39 @@
+import logging
 from fastapi import FastAPI
 from src.routes.asset_service import router as asset_router
+from src.database.db import db
+from src.utils.asset_cache import asset_cache
+from src.utils.derivatives import derivative_worker
+from src.utils.outbox import outbox_relay
+from src.utils.publisher import publisher
+from src.utils.storage import storage
 
 app = FastAPI()
 app.include_router(asset_router)
+
+
+@app.on_event("startup")
+async def startup():
+    # Ensure the target bucket exists (idempotent)
+    await storage.startup()
+    await db.ensure_indexes()
+    # One long-lived broker connection; the queue is declared once here
+    try:
+        await publisher.startup()
+    except Exception as e:
+        logging.error(f"RabbitMQ is not reachable yet, connecting on first publish: {e}")
+    # Drain upload events stored with the assets to the broker
+    await outbox_relay.startup()
+    # Cache asset reads, invalidated by metadata_service's update events
+    await asset_cache.startup()
+    # Thumbnails, renditions and poster frames, rendered off the request path
+    await derivative_worker.startup()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await derivative_worker.shutdown()
+    await asset_cache.shutdown()
+    await outbox_relay.shutdown()
+    await publisher.shutdown()
+    await storage.shutdown()
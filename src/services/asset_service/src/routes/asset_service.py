@@ -1,11 +1,24 @@
-import io, os
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+import asyncio
+import json
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from uuid import uuid4
-import boto3
 from botocore.exceptions import ClientError
-from src.utils.publisher import publish_asset
-from src.schemas.asset_service_schema import AssetCreate, AssetResponse
-from src.database.crud.asset_service_crud import AssetCRUD
+from pymongo.errors import DuplicateKeyError
+from src.utils.asset_cache import asset_cache
+from src.utils.derivatives import derivative_worker
+from src.utils.outbox import outbox_relay
+from src.utils.storage import StreamingUpload, storage
+from src.utils.uploads import FileChunk, FileEnd, FileStart, FormField, iter_form
+from src.schemas.asset_service_schema import (
+    AssetCreate, AssetResponse, BulkUploadResponse, BulkUploadResult, PresignedPart, UploadComplete, UploadInit, UploadTicket,
+)
+from src.database.crud.asset_service_crud import AssetCRUD, UploadCRUD
+from src.database.models.asset_service import AssetModel
 from src.core.config import Config
 from fastapi import Query
 from bson import ObjectId
@@ -28,93 +41,487 @@ ALLOWED_MIME_TYPES = {
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
 }
 
-s3_client = boto3.client(
-    "s3",
-    endpoint_url=Config.S3_ENDPOINT,
-    aws_access_key_id=Config.S3_ACCESS_KEY,
-    aws_secret_access_key=Config.S3_SECRET_KEY,
-)
-# Ensure the target bucket exists (idempotent)
-try:
-    s3_client.create_bucket(Bucket=Config.S3_BUCKET)
-except ClientError:
-    # ignore if bucket already exists or access issues
-    pass
-
-@router.post("/assets", response_model=AssetResponse)
-async def upload_asset(
-    file: UploadFile = File(...),
-    user_id: str = Form(...),
-):
-    # Validate MIME
-    if file.content_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.content_type}")
-
-    data = await file.read()
-    key = f"{uuid4().hex}-{file.filename}"
-    
-    # Upload, ensure bucket exists
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# S3 limit on the number of parts of a multipart upload
+MAX_UPLOAD_PARTS = 10000
+
+# OpenAPI description of the multipart body parsed by hand in upload_asset
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file", "user_id"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "user_id": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+# OpenAPI description of the multipart body parsed by hand in upload_assets_bulk
+BULK_UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files", "user_id"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        "user_id": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+async def _stream_upload(request: Request) -> tuple[dict, Optional[StreamingUpload], Optional[str]]:
+    """
+    Stream the ``file`` part of a multipart request straight into S3.
+
+    Returns the plain form fields, the finished upload and the original file
+    name. The upload is aborted, or the stored object deleted if the file was
+    already complete, if the request or S3 fails midway.
+    """
+    fields: dict[str, str] = {}
+    upload: Optional[StreamingUpload] = None
+    filename = None
     try:
-        s3_client.upload_fileobj(
-            io.BytesIO(data),
-            Config.S3_BUCKET,
-            key,
-            ExtraArgs={"ContentType": file.content_type},
+        async for event in iter_form(request):
+            if isinstance(event, FormField):
+                fields[event.name] = event.value
+            elif isinstance(event, FileStart):
+                if event.name != "file" or upload is not None:
+                    raise HTTPException(status_code=400, detail="Exactly one 'file' part is expected")
+                # Validate MIME before any byte is stored
+                if event.content_type not in ALLOWED_MIME_TYPES:
+                    raise HTTPException(status_code=400, detail=f"Unsupported file type: {event.content_type}")
+                filename = event.filename
+                upload = storage.upload(f"{uuid4().hex}-{filename}", event.content_type)
+            elif isinstance(event, FileChunk):
+                await upload.write(event.data)
+            elif isinstance(event, FileEnd):
+                await upload.complete()
+    except BaseException as e:
+        if upload is not None:
+            await upload.abort()
+        if isinstance(e, ClientError):
+            raise HTTPException(status_code=500, detail=str(e)) from e
+        raise
+    return fields, upload, filename
+
+
+@router.post("/assets", response_model=AssetResponse, openapi_extra=UPLOAD_REQUEST_BODY)
+async def upload_asset(request: Request):
+    """
+    Upload a file (multipart fields ``file`` and ``user_id``).
+
+    The file is streamed from the request into an S3 multipart upload with
+    parts sent in parallel, so memory use per request stays bounded no matter
+    how large the file is.
+    """
+    fields, upload, filename = await _stream_upload(request)
+    if upload is None:
+        raise HTTPException(status_code=422, detail="Field 'file' is required")
+    user_id = fields.get("user_id")
+    if not user_id:
+        await storage.delete(upload.key)
+        raise HTTPException(status_code=422, detail="Field 'user_id' is required")
+
+    return await _save_streamed_asset(user_id, filename, upload)
+
+
+async def _save_streamed_asset(user_id: str, filename: str, upload: StreamingUpload) -> dict:
+    """
+    Record a streamed upload, deduplicated by content hash.
+
+    If the user already has these exact bytes, the new copy is dropped from
+    S3 and their existing asset is returned. Deduplication never crosses
+    users: reusing another user's object would expose its key, which holds
+    their original filename, and reveal that they stored the file.
+    """
+    content_hash = upload.content_hash
+    existing = await AssetCRUD.get_by_content_hash(content_hash, user_id)
+    if existing is not None:
+        await storage.delete(upload.key)
+        return AssetModel(existing).to_dict()
+
+    try:
+        return await _save_asset(
+            user_id, filename, upload.content_type, storage.object_url(upload.key),
+            content_hash=content_hash,
+            size=upload.size,
         )
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "NoSuchBucket":
-            # create bucket then retry
-            s3_client.create_bucket(Bucket=Config.S3_BUCKET)
-            s3_client.upload_fileobj(
-                io.BytesIO(data),
-                Config.S3_BUCKET,
-                key,
-                ExtraArgs={"ContentType": file.content_type},
-            )
-        else:
-            raise HTTPException(status_code=500, detail=str(e))
+    except DuplicateKeyError:
+        # the same user uploaded the same bytes concurrently and won the race
+        await storage.delete(upload.key)
+        return AssetModel(await AssetCRUD.get_by_content_hash(content_hash, user_id)).to_dict()
+
+
+async def _save_asset(
+    user_id: str, filename: str, content_type: str, url: str,
+    content_hash: Optional[str] = None, size: Optional[int] = None,
+) -> dict:
+    """
+    Record an object stored at ``url`` as an asset. Its upload event is
+    stored along with it and published by the outbox relay.
+    """
+    saved = await AssetCRUD.create(_asset_data(user_id, filename, content_type, url, content_hash, size))
+
+    outbox_relay.notify()
+    return saved
+
 
-    url = f"{Config.S3_ENDPOINT}/{Config.S3_BUCKET}/{key}"
-    file_type = file.content_type.split("/")[0]
+def _asset_data(
+    user_id: str, filename: str, content_type: str, url: str,
+    content_hash: Optional[str] = None, size: Optional[int] = None,
+) -> dict:
+    file_type = content_type.split("/")[0]
 
     asset_data = {
         "user_id": user_id,
-        "filename": file.filename,
-        "content_type": file.content_type,
+        "filename": filename,
+        "content_type": content_type,
         "file_type": file_type,
         "url": url,
     }
+    if content_hash is not None:
+        asset_data["content_hash"] = content_hash
+        asset_data["size"] = size
+    return asset_data
 
 
-    saved = await AssetCRUD.create(asset_data)
+@dataclass
+class _BulkFile:
+    filename: str
+    content_type: str
+    upload: Optional[StreamingUpload] = None
+    task: Optional[asyncio.Task] = None
+    stored: bool = False
+    error: Optional[str] = None
+
+
+async def _finish_bulk_file(entry: _BulkFile, slots: asyncio.Semaphore) -> None:
+    try:
+        if entry.error is None:
+            await entry.upload.complete()
+            entry.stored = True
+        else:
+            await entry.upload.abort()
+    except Exception as e:
+        entry.error = str(e)
+        await entry.upload.abort()
+    finally:
+        slots.release()
 
-    await publish_asset({
-            "asset_id": str(saved["id"]),
-        })
-    return saved
 
+async def _discard_bulk_files(entries: list[_BulkFile]) -> None:
+    await asyncio.gather(*(e.task for e in entries if e.task is not None), return_exceptions=True)
+    for entry in entries:
+        if entry.stored:
+            await storage.delete(entry.upload.key)
+        elif entry.upload is not None and entry.task is None:
+            await entry.upload.abort()
+
+
+async def _stream_bulk_upload(request: Request) -> tuple[dict, list[_BulkFile]]:
+    """
+    Stream every ``files`` part of a multipart request into S3.
+
+    While the next file is being read from the request, the previous ones
+    finish uploading in the background, up to BULK_UPLOAD_CONCURRENCY at a
+    time; reading pauses while all of them are busy. A file that is rejected
+    or fails is reported on its entry and does not fail the others.
+    """
+    fields: dict[str, str] = {}
+    entries: list[_BulkFile] = []
+    current: Optional[_BulkFile] = None
+    slots = asyncio.Semaphore(Config.BULK_UPLOAD_CONCURRENCY)
+    try:
+        async for event in iter_form(request):
+            if isinstance(event, FormField):
+                fields[event.name] = event.value
+            elif isinstance(event, FileStart):
+                if event.name != "files":
+                    raise HTTPException(status_code=400, detail="Files must be sent as 'files' parts")
+                if len(entries) >= Config.BULK_MAX_FILES:
+                    raise HTTPException(status_code=413, detail=f"At most {Config.BULK_MAX_FILES} files per request")
+                current = _BulkFile(event.filename, event.content_type)
+                entries.append(current)
+                if event.content_type not in ALLOWED_MIME_TYPES:
+                    current.error = f"Unsupported file type: {event.content_type}"
+                    continue
+                await slots.acquire()
+                current.upload = storage.upload(f"{uuid4().hex}-{event.filename}", event.content_type)
+            elif isinstance(event, FileChunk):
+                if current.upload is None or current.error is not None:
+                    continue
+                try:
+                    await current.upload.write(event.data)
+                except Exception as e:
+                    # skip the rest of this file; its upload is aborted at its end
+                    current.error = str(e)
+            elif isinstance(event, FileEnd):
+                if current.upload is not None:
+                    current.task = asyncio.create_task(_finish_bulk_file(current, slots))
+        await asyncio.gather(*(e.task for e in entries if e.task is not None))
+    except BaseException:
+        await _discard_bulk_files(entries)
+        raise
+    return fields, entries
 
 
-@router.get("/assets", response_model=list[AssetResponse])
+async def _save_bulk_assets(user_id: str, entries: list[_BulkFile]) -> list[BulkUploadResult]:
+    """
+    Record the stored files of a bulk upload with one content-hash lookup
+    and one ``insert_many``; the outbox relay then publishes all their
+    events together. Deduplication follows ``_save_streamed_asset``,
+    including between files of the same request.
+    """
+    results = [
+        BulkUploadResult(filename=e.filename, status="rejected" if e.upload is None else "failed", error=e.error)
+        for e in entries
+    ]
+    stored = [(i, e) for i, e in enumerate(entries) if e.stored]
+    if not stored:
+        return results
+
+    existing = await AssetCRUD.get_by_content_hashes(list({e.upload.content_hash for _, e in stored}), user_id)
+    first_in_request: dict[str, int] = {}
+    repeats: list[tuple[int, int]] = []
+    to_insert: list[tuple[int, _BulkFile, dict]] = []
+    for index, entry in stored:
+        content_hash = entry.upload.content_hash
+        known = existing.get(content_hash)
+        if known is not None or content_hash in first_in_request:
+            await storage.delete(entry.upload.key)
+            if content_hash in first_in_request:
+                repeats.append((index, first_in_request[content_hash]))
+            else:
+                results[index] = BulkUploadResult(
+                    filename=entry.filename, status="existing", asset=AssetModel(known).to_dict()
+                )
+            continue
+        first_in_request[content_hash] = index
+        to_insert.append((index, entry, _asset_data(
+            user_id, entry.filename, entry.upload.content_type, storage.object_url(entry.upload.key),
+            content_hash=content_hash,
+            size=entry.upload.size,
+        )))
+
+    if to_insert:
+        saved = await AssetCRUD.create_many([data for _, _, data in to_insert])
+        outbox_relay.notify()
+        for (index, entry, data), asset in zip(to_insert, saved):
+            if asset is None:
+                # the same bytes were uploaded concurrently by another request
+                await storage.delete(entry.upload.key)
+                asset = AssetModel(await AssetCRUD.get_by_content_hash(data["content_hash"], user_id)).to_dict()
+                results[index] = BulkUploadResult(filename=entry.filename, status="existing", asset=asset)
+            else:
+                results[index] = BulkUploadResult(filename=entry.filename, status="created", asset=asset)
+    for index, first in repeats:
+        results[index] = BulkUploadResult(filename=entries[index].filename, status="existing", asset=results[first].asset)
+    return results
+
+
+@router.post("/assets/bulk", response_model=BulkUploadResponse, openapi_extra=BULK_UPLOAD_REQUEST_BODY)
+async def upload_assets_bulk(request: Request):
+    """
+    Upload many files in one request (multipart fields ``files``, repeated,
+    and ``user_id``).
+
+    Files are streamed to S3 with bounded concurrency, recorded with a single
+    database write and announced in one batch of events. The response lists
+    a status per file; a rejected or failed file does not fail the request.
+    """
+    fields, entries = await _stream_bulk_upload(request)
+    if not entries:
+        raise HTTPException(status_code=422, detail="Field 'files' is required")
+    user_id = fields.get("user_id")
+    if not user_id:
+        await _discard_bulk_files(entries)
+        raise HTTPException(status_code=422, detail="Field 'user_id' is required")
+
+    return BulkUploadResponse(results=await _save_bulk_assets(user_id, entries))
+
+
+@router.post("/assets/uploads", response_model=UploadTicket)
+async def create_upload(payload: UploadInit):
+    """
+    First phase of a direct-to-S3 upload: hand out presigned URLs so the
+    client sends the bytes to S3 itself. Files whose declared size reaches
+    PRESIGNED_MULTIPART_THRESHOLD get one presigned URL per part.
+    """
+    if payload.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {payload.content_type}")
+
+    key = f"{uuid4().hex}-{payload.filename}"
+    pending = {
+        "user_id": payload.user_id,
+        "filename": payload.filename,
+        "content_type": payload.content_type,
+        "size": payload.size,
+        "key": key,
+        "expires_at": datetime.utcnow() + timedelta(seconds=Config.PRESIGNED_URL_EXPIRES),
+    }
+    ticket = {"expires_in": Config.PRESIGNED_URL_EXPIRES}
+
+    try:
+        if payload.size and payload.size >= Config.PRESIGNED_MULTIPART_THRESHOLD:
+            # S3 allows at most 10,000 parts per upload
+            part_size = max(Config.S3_PART_SIZE, math.ceil(payload.size / MAX_UPLOAD_PARTS))
+            part_count = math.ceil(payload.size / part_size)
+            multipart_id = await storage.create_multipart(key, payload.content_type)
+            pending["multipart_upload_id"] = multipart_id
+            urls = await asyncio.gather(*(
+                storage.presign_part(key, multipart_id, number) for number in range(1, part_count + 1)
+            ))
+            ticket.update(
+                method="multipart",
+                part_size=part_size,
+                parts=[PresignedPart(part_number=n, url=url) for n, url in enumerate(urls, start=1)],
+            )
+        else:
+            ticket.update(
+                method="PUT",
+                url=await storage.presign_put(key, payload.content_type),
+                headers={"Content-Type": payload.content_type},
+            )
+    except ClientError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return UploadTicket(upload_id=await UploadCRUD.create(pending), **ticket)
+
+
+@router.post("/assets/{upload_id}/complete", response_model=AssetResponse)
+async def complete_upload(upload_id: str, payload: Optional[UploadComplete] = None):
+    """
+    Second phase of a direct-to-S3 upload: finish a multipart upload, check
+    the object landed in S3, then record the asset and publish its event.
+    """
+    try:
+        ObjectId(upload_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid upload_id format")
+    pending = await UploadCRUD.get_by_id(upload_id)
+    if not pending:
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    key = pending["key"]
+
+    multipart_id = pending.get("multipart_upload_id")
+    if multipart_id:
+        if payload and payload.parts:
+            parts = [{"PartNumber": p.part_number, "ETag": p.etag} for p in payload.parts]
+        else:
+            parts = await storage.list_parts(key, multipart_id)
+        if not parts:
+            raise HTTPException(status_code=400, detail="No parts have been uploaded")
+        try:
+            await storage.complete_multipart(key, multipart_id, parts)
+        except ClientError as e:
+            raise HTTPException(status_code=400, detail=f"Could not complete multipart upload: {e}")
+
+    head = await storage.head(key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="The file has not been uploaded yet")
+    if pending.get("size") and head.get("ContentLength") != pending["size"]:
+        raise HTTPException(status_code=400, detail="Uploaded size does not match the declared size")
+
+    # claim the upload so concurrent completions record it only once
+    if not await UploadCRUD.delete(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found or expired")
+    return await _save_asset(
+        pending["user_id"], pending["filename"], pending["content_type"], storage.object_url(key)
+    )
+
+
+
+@router.get(
+    "/assets",
+    response_model=list[AssetResponse],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}, "headers": {
+        NEXT_CURSOR_HEADER: {"description": "Pass as 'cursor' to get the next page of a user's assets"},
+    }}},
+)
 async def get_assets(
+    request: Request,
+    response: Response,
     user_id: str = Query(None),
-    asset_id: str = Query(None)
+    asset_id: str = Query(None),
+    limit: int = Query(Config.ASSET_PAGE_SIZE, ge=1, le=Config.ASSET_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Next-page cursor from the previous response"),
 ):
+    """
+    Fetch one asset by ``asset_id``, or a user's assets newest first.
+
+    User listings are paginated: when more assets exist, the
+    ``X-Next-Cursor`` response header holds the cursor for the next page.
+    Requesting ``Accept: application/x-ndjson`` instead streams every asset
+    of the user, one JSON object per line, for full exports.
+    """
     if asset_id:
         # Validate asset_id as a valid ObjectId
         try:
             ObjectId(asset_id)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid asset_id format")
-        asset = await AssetCRUD.get_by_id(asset_id)
+        asset = await asset_cache.get_or_load(asset_id, AssetCRUD.get_by_id)
         if not asset:
             raise HTTPException(status_code=404, detail="Asset not found")
         return [asset]
     elif user_id:
         if not user_id.strip():
             raise HTTPException(status_code=400, detail="user_id cannot be empty")
-        assets = await AssetCRUD.get_by_user_id(user_id)
+        if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            return StreamingResponse(_export_ndjson(user_id), media_type=NDJSON_MEDIA_TYPE)
+        if cursor is not None:
+            try:
+                ObjectId(cursor)
+            except Exception:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        # one extra row tells whether another page exists
+        assets = await AssetCRUD.get_by_user_id(user_id, limit + 1, after=cursor)
+        if len(assets) > limit:
+            assets = assets[:limit]
+            response.headers[NEXT_CURSOR_HEADER] = assets[-1]["id"]
         return assets
     else:
         raise HTTPException(status_code=400, detail="Either user_id or asset_id must be provided")
+
+
+async def _export_ndjson(user_id: str) -> AsyncIterator[bytes]:
+    async for asset in AssetCRUD.iter_by_user_id(user_id, Config.ASSET_EXPORT_BATCH_SIZE):
+        yield json.dumps(AssetResponse(**asset).dict(), ensure_ascii=False).encode() + b"\n"
+
+
+@router.get("/outbox/stats")
+async def outbox_stats():
+    """
+    Upload events not yet published (and the age of the oldest one), plus
+    the relay's throughput counters.
+    """
+    return await outbox_relay.stats()
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters and size of the asset read cache."""
+    return asset_cache.stats()
+
+
+@router.get("/derivatives/stats")
+async def derivative_stats():
+    """Progress of the thumbnail/rendition worker of this replica."""
+    return derivative_worker.stats()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class MetaData(BaseModel):
     """Additional metadata for an asset, e.g., generated description."""
@@ -18,3 +18,48 @@ class AssetResponse(AssetCreate):
         default_factory=MetaData,
         description="Additional metadata (e.g., description)"
     )
+    thumbnail_url: Optional[str] = Field(None, description="Small preview image (images and videos)")
+    rendition_url: Optional[str] = Field(None, description="Web-sized version of an image")
+    poster_url: Optional[str] = Field(None, description="Still frame of a video")
+
+
+class UploadInit(BaseModel):
+    """Request for a direct-to-S3 upload."""
+    user_id: str = Field(..., description="ID of the uploading user")
+    filename: str = Field(..., description="Original file name")
+    content_type: str = Field(..., description="MIME type of the file")
+    size: Optional[int] = Field(None, gt=0, description="File size in bytes; large files get a multipart upload")
+
+class PresignedPart(BaseModel):
+    part_number: int
+    url: str
+
+class UploadTicket(BaseModel):
+    """Where and how to send the bytes of a direct-to-S3 upload."""
+    upload_id: str = Field(..., description="ID to pass to POST /assets/{upload_id}/complete")
+    method: str = Field(..., description="'PUT' for a single request, 'multipart' for parts")
+    url: Optional[str] = Field(None, description="Presigned PUT URL (single request uploads)")
+    headers: dict = Field(default_factory=dict, description="Headers the PUT request must carry")
+    part_size: Optional[int] = Field(None, description="Bytes per part (multipart uploads)")
+    parts: List[PresignedPart] = Field(default_factory=list, description="Presigned URL per part")
+    expires_in: int = Field(..., description="Seconds the URLs stay valid")
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class UploadComplete(BaseModel):
+    # ETags returned by S3 for each part; listed from S3 when omitted
+    parts: Optional[List[UploadedPart]] = None
+
+
+class BulkUploadResult(BaseModel):
+    """Outcome of one file of a bulk upload."""
+    filename: str
+    status: str = Field(..., description="'created', 'existing' (same bytes already stored for the user), "
+                                         "'rejected' (unsupported type) or 'failed' (storage error)")
+    asset: Optional[AssetResponse] = None
+    error: Optional[str] = None
+
+class BulkUploadResponse(BaseModel):
+    results: List[BulkUploadResult] = Field(..., description="One entry per file, in request order")
@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+import aio_pika
+from aio_pika.abc import AbstractIncomingMessage, AbstractRobustConnection
+from shared.events import QueueEventNames
+
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # the shared tier is optional
+    aioredis = None
+
+REDIS_KEY_PREFIX = "asset_service:asset:"
+
+
+class AssetCache:
+    """
+    Two-tier read cache for single asset documents.
+
+    The first tier is an in-process LRU of ``ASSET_CACHE_MAX_ENTRIES``
+    assets; the optional second tier is Redis, shared by every replica.
+    Assets only change once uploaded when metadata_service stores their
+    description, and it then announces the asset id on the
+    ``asset_updated`` fanout exchange: every replica listens on its own
+    queue and drops the asset from its LRU and from Redis. Entries also
+    expire after ``ASSET_CACHE_TTL`` seconds, which bounds staleness if an
+    announcement is missed. Reads bypass the cache until the listener is
+    connected.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._redis = None
+        self._connection: Optional[AbstractRobustConnection] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def active(self) -> bool:
+        return Config.ASSET_CACHE_ENABLED and self._connection is not None
+
+    async def startup(self) -> None:
+        if not Config.ASSET_CACHE_ENABLED:
+            return
+        try:
+            connection = await aio_pika.connect_robust(Config.RABBITMQ_URL)
+            channel = await connection.channel()
+            exchange = await channel.declare_exchange(
+                QueueEventNames.asset_updated, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+            # server-named queue, removed when this replica disconnects
+            queue = await channel.declare_queue(exclusive=True)
+            await queue.bind(exchange)
+            await queue.consume(self._on_update, no_ack=True)
+        except Exception as e:
+            logger.error(f"Asset cache disabled, cannot listen for asset updates: {e}")
+            return
+        self._connection = connection
+        if Config.ASSET_CACHE_REDIS_URL:
+            if aioredis is None:
+                logger.warning("ASSET_CACHE_REDIS_URL is set but the 'redis' package is not installed")
+            else:
+                self._redis = aioredis.from_url(Config.ASSET_CACHE_REDIS_URL)
+                logger.info("Asset cache Redis tier enabled")
+
+    async def shutdown(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+        self.clear()
+
+    async def get_or_load(self, asset_id: str, load: Callable[[str], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """The asset from the cache, or from ``load`` (and then cached)."""
+        if not self.active:
+            return await load(asset_id)
+        asset = await self.get(asset_id)
+        if asset is None:
+            asset = await load(asset_id)
+            if asset is not None:
+                await self.set(asset_id, asset)
+        return asset
+
+    async def get(self, asset_id: str) -> Optional[dict]:
+        entry = self._entries.get(asset_id)
+        if entry is not None:
+            expires_at, asset = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(asset_id)
+                self.hits += 1
+                return asset
+            del self._entries[asset_id]
+
+        if self._redis is not None:
+            try:
+                data = await self._redis.get(REDIS_KEY_PREFIX + asset_id)
+            except Exception as e:
+                logger.error(f"Redis cache read failed: {e}")
+                data = None
+            if data:
+                asset = json.loads(data)
+                self._store_local(asset_id, asset)
+                self.hits += 1
+                return asset
+
+        self.misses += 1
+        return None
+
+    async def set(self, asset_id: str, asset: dict) -> None:
+        self._store_local(asset_id, asset)
+        if self._redis is not None:
+            try:
+                await self._redis.set(
+                    REDIS_KEY_PREFIX + asset_id, json.dumps(asset, ensure_ascii=False), ex=max(int(self.ttl), 1)
+                )
+            except Exception as e:
+                logger.error(f"Redis cache write failed: {e}")
+
+    async def invalidate(self, asset_id: str) -> None:
+        self._entries.pop(asset_id, None)
+        self.invalidations += 1
+        if self._redis is not None:
+            try:
+                await self._redis.delete(REDIS_KEY_PREFIX + asset_id)
+            except Exception as e:
+                logger.error(f"Redis cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        """Drop every entry of the local tier."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "redis": self._redis is not None,
+        }
+
+    async def _on_update(self, message: AbstractIncomingMessage) -> None:
+        try:
+            asset_id = json.loads(message.body)["asset_id"]
+        except (ValueError, KeyError, TypeError):
+            logger.error(f"Ignoring malformed asset update: {message.body!r}")
+            return
+        await self.invalidate(asset_id)
+
+    def _store_local(self, asset_id: str, asset: dict) -> None:
+        self._entries.pop(asset_id, None)
+        self._entries[asset_id] = (time.time() + self.ttl, asset)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+asset_cache = AssetCache(Config.ASSET_CACHE_MAX_ENTRIES, Config.ASSET_CACHE_TTL)
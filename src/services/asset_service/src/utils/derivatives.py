@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
+
+import aio_pika
+from aio_pika.abc import AbstractExchange, AbstractIncomingMessage, AbstractRobustConnection
+from PIL import Image, ImageOps
+from shared.events import QueueEventNames
+
+from src.core.config import Config
+from src.database.crud.asset_service_crud import AssetCRUD
+from src.utils.asset_cache import asset_cache
+from src.utils.storage import storage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/webp"}
+VIDEO_TYPES = {"video/mp4", "video/mpeg"}
+
+DERIVATIVE_CONTENT_TYPE = "image/webp"
+
+
+def wants_derivatives(content_type: Optional[str]) -> bool:
+    return content_type in IMAGE_TYPES or content_type in VIDEO_TYPES
+
+
+def derivative_key(key: str, name: str) -> str:
+    """Derivatives sit next to their original: ``<key>.<name>.webp``."""
+    return f"{key}.{name}.webp"
+
+
+def render_image(data: bytes, large_name: str) -> dict[str, bytes]:
+    """
+    Encode a web-sized rendition (stored as ``large_name``) and a thumbnail
+    of an image as WebP. The thumbnail is cut from the rendition, so the
+    full-size picture is only resampled once.
+    """
+    with Image.open(BytesIO(data)) as original:
+        # JPEG can decode straight at a reduced scale
+        original.draft("RGB", (Config.DERIVATIVE_RENDITION_SIZE, Config.DERIVATIVE_RENDITION_SIZE))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        rendered = {}
+        for name, size in (
+            (large_name, Config.DERIVATIVE_RENDITION_SIZE),
+            ("thumbnail", Config.DERIVATIVE_THUMBNAIL_SIZE),
+        ):
+            image.thumbnail((size, size))
+            out = BytesIO()
+            image.save(out, "WEBP", quality=Config.DERIVATIVE_QUALITY)
+            rendered[name] = out.getvalue()
+        return rendered
+
+
+class DerivativeWorker:
+    """
+    Background consumer of the ``asset_derivatives`` queue.
+
+    For images it stores a web rendition and a thumbnail; for videos, a
+    poster frame grabbed with ffmpeg (which reads only what it needs of the
+    original over a presigned URL) and a thumbnail of it. The URLs are then
+    recorded on the asset and cached copies of it are invalidated.
+    Image work runs on ``DERIVATIVE_WORKERS`` threads, and at most
+    ``DERIVATIVE_PREFETCH`` jobs are in progress per replica.
+    """
+
+    def __init__(self):
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._updates: Optional[AbstractExchange] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.processed = 0
+        self.failures = 0
+
+    async def startup(self) -> None:
+        if not Config.DERIVATIVES_ENABLED:
+            return
+        try:
+            connection = await aio_pika.connect_robust(Config.RABBITMQ_URL)
+            channel = await connection.channel()
+            await channel.set_qos(prefetch_count=Config.DERIVATIVE_PREFETCH)
+            queue = await channel.declare_queue(QueueEventNames.asset_derivatives, durable=True)
+            self._updates = await channel.declare_exchange(
+                QueueEventNames.asset_updated, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+        except Exception as e:
+            logger.error(f"Derivative worker not started: {e}")
+            return
+        self._connection = connection
+        self._executor = ThreadPoolExecutor(max_workers=Config.DERIVATIVE_WORKERS, thread_name_prefix="derivatives")
+        await queue.consume(self._on_job)
+
+    async def shutdown(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _on_job(self, message: AbstractIncomingMessage) -> None:
+        async with message.process():
+            try:
+                asset_id = json.loads(message.body)["asset_id"]
+                await self.process(asset_id)
+                self.processed += 1
+            except Exception as e:
+                # derivatives are optional; the original stays usable
+                self.failures += 1
+                logger.error(f"Could not render derivatives of {message.body!r}: {e}")
+
+    async def process(self, asset_id: str) -> Optional[dict]:
+        """Render, store and record the derivatives of one asset."""
+        asset = await AssetCRUD.get_by_id(asset_id)
+        if asset is None or not wants_derivatives(asset["content_type"]):
+            return None
+        key = storage.object_key(asset["url"])
+
+        if asset["content_type"] in IMAGE_TYPES:
+            head = await storage.head(key)
+            if head is None or head.get("ContentLength", 0) > Config.DERIVATIVE_MAX_SOURCE_BYTES:
+                return None
+            source, large_name = await storage.get(key), "rendition"
+        else:
+            source, large_name = await self._poster_frame(key), "poster"
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(self._executor, render_image, source, large_name)
+
+        await asyncio.gather(*(
+            storage.put(derivative_key(key, name), body, DERIVATIVE_CONTENT_TYPE)
+            for name, body in rendered.items()
+        ))
+        derivatives = {name: storage.object_url(derivative_key(key, name)) for name in rendered}
+        await AssetCRUD.set_derivatives(asset_id, derivatives)
+        await asset_cache.invalidate(asset_id)
+        await self._announce(asset_id)
+        return derivatives
+
+    async def _poster_frame(self, key: str) -> bytes:
+        url = await storage.presign_get(key)
+        frame = await self._grab_frame(url, Config.DERIVATIVE_POSTER_OFFSET)
+        if not frame and Config.DERIVATIVE_POSTER_OFFSET > 0:
+            # the video is shorter than the offset
+            frame = await self._grab_frame(url, 0)
+        if not frame:
+            raise ValueError(f"No frame could be read from {key}")
+        return frame
+
+    @staticmethod
+    async def _grab_frame(url: str, offset: float) -> bytes:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-v", "error", "-ss", str(offset), "-i", url,
+            "-frames:v", "1", "-f", "image2pipe", "-vcodec", "png", "-",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            frame, errors = await asyncio.wait_for(process.communicate(), Config.DERIVATIVE_FFMPEG_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {errors.decode(errors='replace').strip()}")
+        return frame
+
+    async def _announce(self, asset_id: str) -> None:
+        """Let the other replicas drop their cached copy of the asset."""
+        if self._updates is None:
+            return
+        try:
+            await self._updates.publish(
+                aio_pika.Message(body=json.dumps({"asset_id": asset_id}).encode(), content_type="application/json"),
+                routing_key="",
+            )
+        except Exception as e:
+            logger.error(f"Failed to announce update of asset {asset_id}: {e}")
+
+    def stats(self) -> dict:
+        return {"running": self._connection is not None, "processed": self.processed, "failures": self.failures}
+
+
+derivative_worker = DerivativeWorker()
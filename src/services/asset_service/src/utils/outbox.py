@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+
+from src.core.config import Config
+from src.database.crud.asset_service_crud import OutboxCRUD
+from src.utils.derivatives import wants_derivatives
+from src.utils.publisher import publish_assets, publish_derivative_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """
+    Background task draining pending asset-upload events to RabbitMQ.
+
+    Events are claimed in batches of ``OUTBOX_BATCH_SIZE``, published with
+    broker confirms (image and video assets also to the derivative queue)
+    and only then removed, so an event is never lost; it may
+    be delivered twice if the relay dies between the confirm and the removal.
+    The relay wakes up on ``notify()`` after each upload and otherwise polls
+    every ``OUTBOX_POLL_INTERVAL`` seconds, backing off while the broker is
+    unreachable.
+    """
+
+    def __init__(self):
+        self.owner = uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.published = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_batch_at: Optional[float] = None
+
+    async def startup(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        """Ask the relay to drain now rather than at its next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def drain_once(self) -> int:
+        """Publish one batch of pending events; returns how many were sent."""
+        records = await OutboxCRUD.claim(self.owner, Config.OUTBOX_BATCH_SIZE, Config.OUTBOX_LEASE_SECONDS)
+        if not records:
+            return 0
+        events = [event for record in records for event in record["outbox"]["events"]]
+        await publish_assets(events)
+        jobs = [event for event in events if wants_derivatives(event.get("content_type"))]
+        if jobs:
+            await publish_derivative_jobs(jobs)
+        await OutboxCRUD.complete(self.owner, [record["_id"] for record in records])
+        self.published += len(events)
+        self.batches += 1
+        self.last_batch_at = time.time()
+        return len(records)
+
+    async def _run(self) -> None:
+        backoff = Config.OUTBOX_POLL_INTERVAL
+        while True:
+            # cleared before draining, so a notify() during the drain is not lost
+            self._wakeup.clear()
+            try:
+                drained = await self.drain_once()
+                backoff = Config.OUTBOX_POLL_INTERVAL
+                self.last_error = None
+            except Exception as e:
+                drained = 0
+                self.failures += 1
+                self.last_error = str(e)
+                logger.error(f"Outbox relay failed, retrying in {backoff}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, Config.OUTBOX_MAX_BACKOFF)
+                continue
+            if drained >= Config.OUTBOX_BATCH_SIZE:
+                # more is waiting; keep going
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), Config.OUTBOX_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stats(self) -> dict:
+        pending, oldest = await OutboxCRUD.backlog()
+        return {
+            "pending": pending,
+            "lag_seconds": round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0,
+            "published": self.published,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_batch_at": self.last_batch_at,
+        }
+
+
+outbox_relay = OutboxRelay()
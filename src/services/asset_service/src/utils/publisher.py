@@ -1,29 +1,97 @@
+import asyncio
 import aio_pika
-from shared.events import QueueEventNames
-from tenacity import retry, wait_fixed, stop_after_attempt
+from aio_pika.abc import AbstractChannel, AbstractRobustConnection
+from aio_pika.pool import Pool
+from shared.events import QueueEventNames, declare_asset_upload_queue
 import json
 import logging
+from typing import Optional
 from src.core.config import Config
 logging.basicConfig(level=logging.INFO)
 
-@retry(wait=wait_fixed(2), stop=stop_after_attempt(5))
-async def publish_asset(message):
-    """Publishes a message to RabbitMQ with retry handling."""
-    try:
-        connection = await aio_pika.connect_robust(Config.RABBITMQ_URL)
-        async with connection:
-            channel = await connection.channel()
-            await channel.declare_queue(QueueEventNames.asset_upload, durable=True)
-            
-            await channel.default_exchange.publish(
-                aio_pika.Message(
-                    body=json.dumps(message, ensure_ascii=False).encode(),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key=QueueEventNames.asset_upload
+
+class AssetEventPublisher:
+    """
+    Long-lived RabbitMQ publisher.
+
+    One robust connection is opened for the life of the service and the queues
+    are declared once. Publishes go through a pool of channels in confirm mode:
+    each publish awaits its own broker confirm, while many of them can be in
+    flight on the same channel at once. The outbox relay publishes every
+    event in batches through ``publish_many``.
+    """
+
+    def __init__(self):
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channels: Optional[Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def startup(self) -> None:
+        async with self._lock:
+            if self._connection is not None:
+                return
+            connection = await aio_pika.connect_robust(Config.RABBITMQ_URL)
+            try:
+                async with connection.channel() as channel:
+                    await declare_asset_upload_queue(channel)
+                    await channel.declare_queue(QueueEventNames.asset_derivatives, durable=True)
+            except Exception:
+                await connection.close()
+                raise
+            self._connection = connection
+            self._channels = Pool(self._open_channel, max_size=Config.RABBITMQ_CHANNEL_POOL_SIZE)
+            logging.info("RabbitMQ publisher connected")
+
+    async def shutdown(self) -> None:
+        if self._channels is not None:
+            await self._channels.close()
+            self._channels = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def _open_channel(self) -> AbstractChannel:
+        return await self._connection.channel(publisher_confirms=True)
+
+    @staticmethod
+    def _message(payload: dict) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=json.dumps(payload, ensure_ascii=False).encode(),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
+
+    async def publish_many(self, payloads: list[dict], queue: str = QueueEventNames.asset_upload) -> None:
+        """
+        Publish several events to ``queue`` on one channel without waiting
+        for each confirm in turn; returns once all of them are confirmed.
+        """
+        if not payloads:
+            return
+        if self._connection is None:
+            await self.startup()
+        async with self._channels.acquire() as channel:
+            await asyncio.wait_for(
+                asyncio.gather(*(
+                    channel.default_exchange.publish(
+                        self._message(payload), routing_key=queue
+                    )
+                    for payload in payloads
+                )),
+                Config.RABBITMQ_CONFIRM_TIMEOUT,
             )
-        logging.info(f"Message sent successfully for asset_id_id:  {message.get('asset_id')}")
-    except Exception as e:
-        logging.error(f"Failed to send message: {e}")
-        raise  # Re-raise to trigger retry
 
+
+publisher = AssetEventPublisher()
+
+
+async def publish_assets(messages: list[dict]):
+    """Publishes several messages at once, e.g. for bulk uploads."""
+    await publisher.publish_many(messages)
+    logging.info(f"{len(messages)} messages sent successfully")
+
+
+async def publish_derivative_jobs(messages: list[dict]):
+    """Queues image/video assets for the derivative worker."""
+    await publisher.publish_many(messages, QueueEventNames.asset_derivatives)
+    logging.info(f"{len(messages)} derivative jobs queued")
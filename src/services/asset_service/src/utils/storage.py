@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+from src.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class S3Storage:
+    """
+    Async facade over a shared boto3 S3 client.
+
+    boto3 is blocking, so every call runs on a dedicated, bounded thread pool
+    instead of the event loop. The client is thread-safe and its connection
+    pool is sized to the pool, so concurrent uploads and reads proceed in
+    parallel without waiting on each other or stalling the loop.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._presign_client = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = boto3.client(
+                "s3",
+                endpoint_url=Config.S3_ENDPOINT,
+                aws_access_key_id=Config.S3_ACCESS_KEY,
+                aws_secret_access_key=Config.S3_SECRET_KEY,
+                config=BotoConfig(
+                    max_pool_connections=Config.S3_MAX_POOL_CONNECTIONS,
+                    retries={"max_attempts": 3, "mode": "adaptive"},
+                ),
+            )
+        return self._client
+
+    @property
+    def presign_client(self):
+        """Client signing URLs for the endpoint clients use (``S3_PUBLIC_ENDPOINT``)."""
+        if self._presign_client is None:
+            self._presign_client = boto3.client(
+                "s3",
+                endpoint_url=Config.S3_PUBLIC_ENDPOINT,
+                aws_access_key_id=Config.S3_ACCESS_KEY,
+                aws_secret_access_key=Config.S3_SECRET_KEY,
+                config=BotoConfig(signature_version="s3v4"),
+            )
+        return self._presign_client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.S3_MAX_WORKERS, thread_name_prefix="s3"
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking boto3 call on the S3 thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+
+    async def startup(self) -> None:
+        await self.ensure_bucket()
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def ensure_bucket(self) -> None:
+        """Create the target bucket if needed (idempotent)."""
+        try:
+            await self.run(self.client.create_bucket, Bucket=Config.S3_BUCKET)
+        except ClientError:
+            # ignore if bucket already exists or access issues
+            pass
+        except Exception as e:
+            logger.error(f"Could not reach S3 to create bucket {Config.S3_BUCKET}: {e}")
+
+    async def run_creating_bucket(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Like ``run``, but create the bucket and retry once if it does not
+        exist yet.
+        """
+        try:
+            return await self.run(fn, *args, **kwargs)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchBucket":
+                raise
+            await self.ensure_bucket()
+            return await self.run(fn, *args, **kwargs)
+
+    async def delete(self, key: str) -> None:
+        await self.run(self.client.delete_object, Bucket=Config.S3_BUCKET, Key=key)
+
+    async def get(self, key: str) -> bytes:
+        response = await self.run(self.client.get_object, Bucket=Config.S3_BUCKET, Key=key)
+        return await self.run(response["Body"].read)
+
+    async def put(self, key: str, body: bytes, content_type: str) -> None:
+        await self.run(
+            self.client.put_object, Bucket=Config.S3_BUCKET, Key=key, Body=body, ContentType=content_type
+        )
+
+    async def presign_get(self, key: str) -> str:
+        """GET URL for services inside the deployment (signed for ``S3_ENDPOINT``)."""
+        return await self.run(
+            self.client.generate_presigned_url,
+            "get_object",
+            Params={"Bucket": Config.S3_BUCKET, "Key": key},
+            ExpiresIn=Config.PRESIGNED_URL_EXPIRES,
+        )
+
+    async def head(self, key: str) -> Optional[dict]:
+        """Object metadata, or None when it does not exist."""
+        try:
+            return await self.run(self.client.head_object, Bucket=Config.S3_BUCKET, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    async def presign_put(self, key: str, content_type: str) -> str:
+        return await self.run(
+            self.presign_client.generate_presigned_url,
+            "put_object",
+            Params={"Bucket": Config.S3_BUCKET, "Key": key, "ContentType": content_type},
+            ExpiresIn=Config.PRESIGNED_URL_EXPIRES,
+        )
+
+    async def create_multipart(self, key: str, content_type: str) -> str:
+        created = await self.run_creating_bucket(
+            self.client.create_multipart_upload,
+            Bucket=Config.S3_BUCKET,
+            Key=key,
+            ContentType=content_type,
+        )
+        return created["UploadId"]
+
+    async def presign_part(self, key: str, upload_id: str, part_number: int) -> str:
+        return await self.run(
+            self.presign_client.generate_presigned_url,
+            "upload_part",
+            Params={
+                "Bucket": Config.S3_BUCKET,
+                "Key": key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=Config.PRESIGNED_URL_EXPIRES,
+        )
+
+    async def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        parts = []
+        marker = 0
+        while True:
+            page = await self.run(
+                self.client.list_parts,
+                Bucket=Config.S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+                PartNumberMarker=marker,
+            )
+            parts += [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in page.get("Parts", [])]
+            if not page.get("IsTruncated"):
+                return parts
+            marker = page["NextPartNumberMarker"]
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: list[dict]) -> None:
+        await self.run(
+            self.client.complete_multipart_upload,
+            Bucket=Config.S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
+        )
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        try:
+            await self.run(
+                self.client.abort_multipart_upload,
+                Bucket=Config.S3_BUCKET,
+                Key=key,
+                UploadId=upload_id,
+            )
+        except Exception as e:
+            logger.error(f"Could not abort multipart upload of {key}: {e}")
+
+    def upload(self, key: str, content_type: str) -> "StreamingUpload":
+        return StreamingUpload(self, key, content_type)
+
+    @staticmethod
+    def object_url(key: str) -> str:
+        return f"{Config.S3_ENDPOINT}/{Config.S3_BUCKET}/{key}"
+
+    @staticmethod
+    def object_key(url: str) -> str:
+        """Inverse of ``object_url``."""
+        return url.split(f"/{Config.S3_BUCKET}/", 1)[1]
+
+
+class StreamingUpload:
+    """
+    Upload an object to S3 from data that arrives in pieces.
+
+    Data is cut into ``S3_PART_SIZE`` parts which are uploaded as an S3
+    multipart upload, up to ``S3_PART_CONCURRENCY`` at a time. ``write`` waits
+    while all slots are busy, so memory stays bounded by roughly
+    ``S3_PART_SIZE * (S3_PART_CONCURRENCY + 1)`` whatever the object size.
+    Objects smaller than one part are stored with a single PUT. A SHA-256 of
+    the content is computed on the way through.
+    """
+
+    def __init__(self, storage: S3Storage, key: str, content_type: str):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer = bytearray()
+        self._upload_id: Optional[str] = None
+        self._tasks: list[asyncio.Task] = []
+        self._slots = asyncio.Semaphore(Config.S3_PART_CONCURRENCY)
+        self._completing = False
+        self._completed = False
+
+    @property
+    def content_hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def write(self, data: bytes) -> None:
+        self._buffer += data
+        self.size += len(data)
+        self._sha256.update(data)
+        while len(self._buffer) >= Config.S3_PART_SIZE:
+            part = bytes(self._buffer[:Config.S3_PART_SIZE])
+            del self._buffer[:Config.S3_PART_SIZE]
+            await self._submit(part)
+
+    async def complete(self) -> None:
+        self._completing = True
+        client = self.storage.client
+        if self._upload_id is None:
+            await self.storage.run_creating_bucket(
+                client.put_object,
+                Bucket=Config.S3_BUCKET,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type,
+            )
+            self._buffer.clear()
+            self._completed = True
+            return
+        if self._buffer:
+            await self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        parts = await asyncio.gather(*self._tasks)
+        await self.storage.complete_multipart(self.key, self._upload_id, list(parts))
+        self._completed = True
+
+    async def abort(self) -> None:
+        """
+        Drop everything uploaded so far. Once ``complete`` has run, aborting
+        the multipart upload is a no-op, so the stored object is deleted.
+        """
+        self._buffer.clear()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._upload_id is not None and not self._completed:
+            await self.storage.abort_multipart(self.key, self._upload_id)
+        if self._completing:
+            # also when complete() was interrupted: the object may exist
+            await self.storage.delete(self.key)
+
+    async def _submit(self, part: bytes) -> None:
+        if self._upload_id is None:
+            self._upload_id = await self.storage.create_multipart(self.key, self.content_type)
+        for task in self._tasks:
+            # fail fast instead of streaming the rest of a doomed upload
+            if task.done() and task.exception() is not None:
+                raise task.exception()
+        await self._slots.acquire()
+        self._tasks.append(asyncio.create_task(self._upload_part(len(self._tasks) + 1, part)))
+
+    async def _upload_part(self, number: int, body: bytes) -> dict:
+        try:
+            uploaded = await self.storage.run(
+                self.storage.client.upload_part,
+                Bucket=Config.S3_BUCKET,
+                Key=self.key,
+                UploadId=self._upload_id,
+                PartNumber=number,
+                Body=body,
+            )
+            return {"PartNumber": number, "ETag": uploaded["ETag"]}
+        finally:
+            self._slots.release()
+
+
+storage = S3Storage()
@@ -0,0 +1,145 @@
+from dataclasses import dataclass
+from typing import AsyncIterator, Union
+
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from src.core.config import Config
+
+
+@dataclass
+class FormField:
+    name: str
+    value: str
+
+
+@dataclass
+class FileStart:
+    name: str
+    filename: str
+    content_type: str
+
+
+@dataclass
+class FileChunk:
+    data: bytes
+
+
+@dataclass
+class FileEnd:
+    pass
+
+
+FormEvent = Union[FormField, FileStart, FileChunk, FileEnd]
+
+
+class _PartCollector:
+    """
+    python-multipart callbacks turning the parsed request into ``FormEvent``s.
+    Plain fields are kept whole, up to ``max_field_size`` bytes each; file
+    data is handed out as it arrives and never accumulated.
+    """
+
+    def __init__(self, charset: str, max_field_size: int):
+        self.charset = charset
+        self.max_field_size = max_field_size
+        self.events: list[FormEvent] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._field_name = ""
+        self._field_data = bytearray()
+        self._is_file = False
+        # set once the closing boundary is parsed
+        self.finished = False
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._field_data = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise HTTPException(status_code=400, detail="Multipart part without a name")
+        self._field_name = options[b"name"].decode(self.charset, "replace")
+        self._is_file = b"filename" in options
+        if self._is_file:
+            self.events.append(FileStart(
+                name=self._field_name,
+                filename=options[b"filename"].decode(self.charset, "replace"),
+                content_type=self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1"),
+            ))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._is_file:
+            self.events.append(FileChunk(data[start:end]))
+        else:
+            if len(self._field_data) + end - start > self.max_field_size:
+                raise HTTPException(
+                    status_code=413, detail=f"Form field '{self._field_name}' exceeds {self.max_field_size} bytes"
+                )
+            self._field_data += data[start:end]
+
+    def on_part_end(self) -> None:
+        if self._is_file:
+            self.events.append(FileEnd())
+        else:
+            self.events.append(FormField(self._field_name, self._field_data.decode(self.charset, "replace")))
+
+    def on_end(self) -> None:
+        self.finished = True
+
+    def callbacks(self) -> dict:
+        return {
+            name: getattr(self, name)
+            for name in (
+                "on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                "on_headers_finished", "on_part_data", "on_part_end", "on_end",
+            )
+        }
+
+
+async def iter_form(request: Request) -> AsyncIterator[FormEvent]:
+    """
+    Parse a multipart/form-data request body while it streams in.
+
+    Unlike ``request.form()``, nothing is spooled: events are yielded for each
+    received chunk and the next chunk is only read once the caller has dealt
+    with them, so a slow consumer (e.g. an S3 upload) throttles the client.
+    A malformed body, or one cut off before its closing boundary, raises 400
+    after the events parsed so far.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+
+    collector = _PartCollector(charset, Config.MAX_FORM_FIELD_BYTES)
+    parser = MultipartParser(params[b"boundary"], collector.callbacks())
+    async for chunk in request.stream():
+        try:
+            parser.write(chunk)
+        except MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}") from e
+        for event in collector.events:
+            yield event
+        collector.events.clear()
+    parser.finalize()
+    for event in collector.events:
+        yield event
+    # finalize() does not check the body was complete; a truncated one
+    # must not pass for a file that ended
+    if not collector.finished:
+        raise HTTPException(status_code=400, detail="Incomplete multipart body")
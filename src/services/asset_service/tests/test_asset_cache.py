@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from src.utils.asset_cache import REDIS_KEY_PREFIX, AssetCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class FakeMessage:
+    def __init__(self, payload):
+        self.body = json.dumps(payload).encode()
+
+
+def active_cache(max_entries=10, ttl=60, redis=None):
+    cache = AssetCache(max_entries, ttl)
+    cache._connection = object()  # as if listening for updates
+    cache._redis = redis
+    return cache
+
+
+def loader(calls):
+    async def load(asset_id):
+        calls.append(asset_id)
+        return {"id": asset_id, "meta_data": {"description": None}}
+    return load
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_the_lru():
+    cache, calls = active_cache(max_entries=2), []
+    for asset_id in ("a", "a", "b", "a", "c", "b"):
+        await cache.get_or_load(asset_id, loader(calls))
+    # "b" was the least recently used when "c" came in
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_update_event_invalidates_both_tiers():
+    redis = FakeRedis()
+    cache, calls = active_cache(redis=redis), []
+    await cache.get_or_load("a", loader(calls))
+    assert REDIS_KEY_PREFIX + "a" in redis.data
+
+    await cache._on_update(FakeMessage({"asset_id": "a"}))
+    assert not redis.data
+    await cache.get_or_load("a", loader(calls))
+    assert calls == ["a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared_between_replicas():
+    redis = FakeRedis()
+    first, second, calls = active_cache(redis=redis), active_cache(redis=redis), []
+    await first.get_or_load("a", loader(calls))
+    assert await second.get_or_load("a", loader(calls)) == {"id": "a", "meta_data": {"description": None}}
+    assert calls == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bypassed_without_update_listener():
+    cache, calls = AssetCache(10, 60), []
+    await cache.get_or_load("a", loader(calls))
+    await cache.get_or_load("a", loader(calls))
+    assert calls == ["a", "a"] and not cache.stats()["entries"]
@@ -35,3 +35,401 @@ async def test_get_asset_invalid_id_format(client):
     response = client.get("/assets?asset_id=invalid-id")
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client."""
+
+    def __init__(self):
+        import threading
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.parts = {}
+        self.threads = set()
+        self.aborted = []
+
+    def _seen(self):
+        import threading
+        self.threads.add(threading.current_thread().name)
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self._seen()
+        self.objects[Key] = (Body, ContentType)
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self._seen()
+        self.parts[Key] = {}
+        return {"UploadId": "up-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._seen()
+        with self.lock:
+            self.parts[Key][PartNumber] = Body
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        assert numbers == sorted(numbers)
+        self.objects[Key] = (b"".join(self.parts[Key][n] for n in numbers), None)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted.append(Key)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        part = f"&part={Params['PartNumber']}" if "PartNumber" in Params else ""
+        return f"https://s3.example/{Params['Key']}?op={operation}{part}"
+
+    def list_parts(self, Bucket, Key, UploadId, PartNumberMarker=0):
+        return {"Parts": [
+            {"PartNumber": n, "ETag": f'"{n}"'} for n in sorted(self.parts.get(Key, {}))
+        ]}
+
+    def head_object(self, Bucket, Key):
+        from botocore.exceptions import ClientError
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"ContentLength": len(self.objects[Key][0]), "ContentType": self.objects[Key][1]}
+
+
+@pytest.fixture
+def fake_upload_env(monkeypatch):
+    # patch the modules the app itself imported (as ``src.*``)
+    from bson import ObjectId
+    from src.database.crud.asset_service_crud import AssetCRUD as AppAssetCRUD
+    from src.database.models.asset_service import AssetModel
+    from src.utils.storage import storage
+
+    s3 = FakeS3()
+    saved = []
+
+    async def fake_create(asset_data):
+        document = {**asset_data, "_id": ObjectId()}
+        saved.append(document)
+        return AssetModel(document).to_dict()
+
+    async def fake_get_by_content_hash(content_hash, user_id):
+        return next((
+            doc for doc in saved if doc.get("content_hash") == content_hash and doc["user_id"] == user_id
+        ), None)
+
+    async def fake_create_many(assets):
+        return [await fake_create(data) for data in assets]
+
+    async def fake_get_by_content_hashes(content_hashes, user_id):
+        return {
+            doc["content_hash"]: doc for doc in saved
+            if doc.get("content_hash") in content_hashes and doc["user_id"] == user_id
+        }
+
+    monkeypatch.setattr(storage, "_client", s3)
+    monkeypatch.setattr(storage, "_presign_client", s3)
+    monkeypatch.setattr(AppAssetCRUD, "create", fake_create)
+    monkeypatch.setattr(AppAssetCRUD, "create_many", fake_create_many)
+    monkeypatch.setattr(AppAssetCRUD, "get_by_content_hash", fake_get_by_content_hash)
+    monkeypatch.setattr(AppAssetCRUD, "get_by_content_hashes", fake_get_by_content_hashes)
+    return s3, saved
+
+
+@pytest.fixture
+def pending_uploads(monkeypatch):
+    from bson import ObjectId
+    from src.database.crud.asset_service_crud import UploadCRUD
+
+    pending = {}
+
+    async def create(upload_data):
+        upload_id = str(ObjectId())
+        pending[upload_id] = upload_data
+        return upload_id
+
+    async def get_by_id(upload_id):
+        return pending.get(upload_id)
+
+    async def delete(upload_id):
+        return pending.pop(upload_id, None) is not None
+
+    monkeypatch.setattr(UploadCRUD, "create", create)
+    monkeypatch.setattr(UploadCRUD, "get_by_id", get_by_id)
+    monkeypatch.setattr(UploadCRUD, "delete", delete)
+    return pending
+
+
+def test_upload_runs_s3_off_event_loop(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    response = client.post(
+        "/assets",
+        files={"file": ("notes.txt", b"hello", "text/plain")},
+        data={"user_id": "u1"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert all(name.startswith("s3") for name in s3.threads)
+    (key, (body, content_type)), = s3.objects.items()
+    assert key.endswith("-notes.txt")
+    assert (body, content_type) == (b"hello", "text/plain")
+    assert saved[0]["user_id"] == "u1"
+    assert saved[0]["url"].endswith(key)
+
+
+def test_large_upload_streams_as_multipart(monkeypatch, fake_upload_env, client):
+    from src.core.config import Config
+
+    s3, _ = fake_upload_env
+    monkeypatch.setattr(Config, "S3_PART_SIZE", 1024)
+    payload = bytes(range(256)) * 40  # 10 KiB -> 10 full parts
+
+    response = client.post(
+        "/assets",
+        files={"file": ("scan.pdf", payload, "application/pdf")},
+        data={"user_id": "u1"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    (key, parts), = s3.parts.items()
+    assert len(parts) == 10
+    assert s3.objects[key][0] == payload
+
+
+def test_upload_rejects_unsupported_type_before_storing(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    response = client.post(
+        "/assets",
+        files={"file": ("run.exe", b"MZ", "application/x-msdownload")},
+        data={"user_id": "u1"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not s3.objects and not saved
+
+
+def test_upload_without_user_id_removes_object(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    response = client.post("/assets", files={"file": ("notes.txt", b"hello", "text/plain")})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not s3.objects and not saved
+
+
+
+def test_upload_rejects_oversized_form_field(monkeypatch, fake_upload_env, client):
+    from src.core.config import Config
+
+    s3, saved = fake_upload_env
+    monkeypatch.setattr(Config, "MAX_FORM_FIELD_BYTES", 16)
+    response = client.post(
+        "/assets",
+        files={"file": ("notes.txt", b"hello", "text/plain")},
+        data={"user_id": "u" * 17},
+    )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert not s3.objects and not saved
+
+
+def test_failure_after_file_end_deletes_completed_object(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    response = client.post(
+        "/assets",
+        files=[("file", ("a.txt", b"alpha", "text/plain")), ("file", ("b.txt", b"beta", "text/plain"))],
+        data={"user_id": "u1"},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not s3.objects and not saved
+
+
+def _truncated_multipart(*parts):
+    """A multipart body whose last part is cut off before its closing boundary."""
+    body = b""
+    for name, filename, data in parts:
+        body += (
+            b"--b0undary\r\n"
+            b'Content-Disposition: form-data; name="' + name + b'"'
+            + (b'; filename="' + filename + b'"\r\nContent-Type: text/plain' if filename else b"")
+            + b"\r\n\r\n" + data + b"\r\n"
+        )
+    return body[:-2], {"content-type": "multipart/form-data; boundary=b0undary"}
+
+
+def test_truncated_upload_is_rejected_and_aborted(monkeypatch, fake_upload_env, client):
+    from src.core.config import Config
+
+    s3, saved = fake_upload_env
+    monkeypatch.setattr(Config, "S3_PART_SIZE", 8)
+    body, headers = _truncated_multipart((b"user_id", None, b"u1"), (b"file", b"notes.txt", b"x" * 37))
+    response = client.post("/assets", content=body, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not s3.objects and not saved
+    assert len(s3.aborted) == 1
+
+
+def test_truncated_bulk_upload_is_rejected_and_aborted(monkeypatch, fake_upload_env, client):
+    from src.core.config import Config
+
+    s3, saved = fake_upload_env
+    monkeypatch.setattr(Config, "S3_PART_SIZE", 8)
+    body, headers = _truncated_multipart(
+        (b"user_id", None, b"u1"), (b"files", b"a.txt", b"alpha"), (b"files", b"b.txt", b"y" * 37)
+    )
+    response = client.post("/assets/bulk", content=body, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not s3.objects and not saved
+    assert len(s3.aborted) == 1
+
+def test_presigned_put_upload_flow(fake_upload_env, pending_uploads, client):
+    s3, saved = fake_upload_env
+    ticket = client.post("/assets/uploads", json={
+        "user_id": "u1", "filename": "grade.pdf", "content_type": "application/pdf", "size": 3,
+    }).json()
+    assert ticket["method"] == "PUT"
+    assert ticket["headers"] == {"Content-Type": "application/pdf"}
+
+    # nothing uploaded yet
+    response = client.post(f"/assets/{ticket['upload_id']}/complete")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    key = next(iter(pending_uploads.values()))["key"]
+    s3.objects[key] = (b"pdf", "application/pdf")
+    response = client.post(f"/assets/{ticket['upload_id']}/complete")
+    assert response.status_code == status.HTTP_200_OK
+    assert saved[0]["url"].endswith(key)
+    assert not pending_uploads
+
+    # completing twice does not record the asset twice
+    response = client.post(f"/assets/{ticket['upload_id']}/complete")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert len(saved) == 1
+
+
+def test_presigned_multipart_upload_flow(monkeypatch, fake_upload_env, pending_uploads, client):
+    from src.core.config import Config
+
+    s3, saved = fake_upload_env
+    monkeypatch.setattr(Config, "PRESIGNED_MULTIPART_THRESHOLD", 1000)
+    monkeypatch.setattr(Config, "S3_PART_SIZE", 400)
+    ticket = client.post("/assets/uploads", json={
+        "user_id": "u1", "filename": "harvest.mp4", "content_type": "video/mp4", "size": 1000,
+    }).json()
+    assert ticket["method"] == "multipart"
+    assert ticket["part_size"] == 400
+    assert [part["part_number"] for part in ticket["parts"]] == [1, 2, 3]
+
+    key = next(iter(pending_uploads.values()))["key"]
+    for number, size in ((1, 400), (2, 400), (3, 200)):
+        s3.parts[key][number] = b"v" * size
+    response = client.post(f"/assets/{ticket['upload_id']}/complete")
+    assert response.status_code == status.HTTP_200_OK
+    assert s3.objects[key][0] == b"v" * 1000
+    assert saved[0]["file_type"] == "video"
+
+
+def test_duplicate_upload_is_deduplicated_per_user(fake_upload_env, client):
+    import hashlib
+
+    s3, saved = fake_upload_env
+    body = b"grade certificate"
+    files = {"file": ("cert.txt", body, "text/plain")}
+
+    first = client.post("/assets", files=files, data={"user_id": "u1"}).json()
+    assert saved[0]["content_hash"] == hashlib.sha256(body).hexdigest()
+
+    # the same user uploading again gets their existing asset back
+    again = client.post("/assets", files=files, data={"user_id": "u1"}).json()
+    assert again["id"] == first["id"]
+    assert len(saved) == 1
+
+    # another user gets a copy of their own, without learning of the first
+    other = client.post("/assets", files=files, data={"user_id": "u2"}).json()
+    assert other["id"] != first["id"]
+    assert other["url"] != first["url"]
+    assert len(saved) == 2 and len(s3.objects) == 2
+
+
+def test_bulk_upload_reports_status_per_file(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    client.post("/assets", files={"file": ("old.txt", b"already here", "text/plain")}, data={"user_id": "u1"})
+
+    response = client.post(
+        "/assets/bulk",
+        files=[
+            ("files", ("a.txt", b"alpha", "text/plain")),
+            ("files", ("run.exe", b"MZ", "application/x-msdownload")),
+            ("files", ("b.pdf", b"%PDF-beta", "application/pdf")),
+            ("files", ("again.txt", b"already here", "text/plain")),
+            ("files", ("a-copy.txt", b"alpha", "text/plain")),
+        ],
+        data={"user_id": "u1"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [(r["filename"], r["status"]) for r in results] == [
+        ("a.txt", "created"),
+        ("run.exe", "rejected"),
+        ("b.pdf", "created"),
+        ("again.txt", "existing"),
+        ("a-copy.txt", "existing"),
+    ]
+    assert results[1]["error"] == "Unsupported file type: application/x-msdownload"
+    assert results[3]["asset"]["id"] == str(saved[0]["_id"])
+    assert results[4]["asset"]["id"] == results[0]["asset"]["id"]
+    # duplicates are dropped from S3
+    assert sorted(body for body, _ in s3.objects.values()) == [b"%PDF-beta", b"alpha", b"already here"]
+    assert len(saved) == 3
+
+
+def test_bulk_upload_without_user_id_removes_objects(fake_upload_env, client):
+    s3, saved = fake_upload_env
+    response = client.post(
+        "/assets/bulk",
+        files=[("files", ("a.txt", b"alpha", "text/plain")), ("files", ("b.txt", b"beta", "text/plain"))],
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not s3.objects and not saved
+
+
+def _user_assets(n):
+    return [
+        {**VALID_ASSET, "id": "65f0000000000000000000%02d" % i, "meta_data": {"description": None}}
+        for i in range(n, 0, -1)
+    ]
+
+
+def test_user_listing_is_paginated_by_cursor(monkeypatch, client):
+    from src.database.crud.asset_service_crud import AssetCRUD as AppAssetCRUD
+
+    assets = _user_assets(5)
+    calls = []
+
+    async def fake_get_by_user_id(user_id, limit, after=None):
+        calls.append((limit, after))
+        start = 0 if after is None else [a["id"] for a in assets].index(after) + 1
+        return assets[start:start + limit]
+
+    monkeypatch.setattr(AppAssetCRUD, "get_by_user_id", fake_get_by_user_id)
+
+    first = client.get("/assets?user_id=u1&limit=2")
+    assert [a["id"] for a in first.json()] == [assets[0]["id"], assets[1]["id"]]
+    cursor = first.headers["x-next-cursor"]
+    assert cursor == assets[1]["id"]
+
+    last = client.get(f"/assets?user_id=u1&limit=3&cursor={cursor}")
+    assert [a["id"] for a in last.json()] == [a["id"] for a in assets[2:]]
+    assert "x-next-cursor" not in last.headers
+    assert calls == [(3, None), (4, cursor)]
+
+    assert client.get("/assets?user_id=u1&cursor=bogus").status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_user_listing_streams_ndjson_export(monkeypatch, client):
+    import json
+    from src.database.crud.asset_service_crud import AssetCRUD as AppAssetCRUD
+
+    assets = _user_assets(3)
+
+    async def fake_iter_by_user_id(user_id, batch_size):
+        for asset in assets:
+            yield asset
+
+    monkeypatch.setattr(AppAssetCRUD, "iter_by_user_id", fake_iter_by_user_id)
+
+    response = client.get("/assets?user_id=u1", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == [a["id"] for a in assets]
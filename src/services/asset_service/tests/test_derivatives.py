@@ -0,0 +1,118 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from src.core.config import Config
+from src.database.crud.asset_service_crud import AssetCRUD
+from src.utils import outbox
+from src.utils.derivatives import DerivativeWorker, render_image, wants_derivatives
+from src.utils.outbox import OutboxRelay
+from src.utils.storage import storage
+
+
+def png(width, height):
+    out = BytesIO()
+    Image.new("RGB", (width, height), "green").save(out, "PNG")
+    return out.getvalue()
+
+
+def size_of(data):
+    with Image.open(BytesIO(data)) as image:
+        return image.format, image.size
+
+
+def test_render_image_makes_rendition_and_thumbnail(monkeypatch):
+    monkeypatch.setattr(Config, "DERIVATIVE_RENDITION_SIZE", 400)
+    monkeypatch.setattr(Config, "DERIVATIVE_THUMBNAIL_SIZE", 100)
+    rendered = render_image(png(1600, 800), "rendition")
+    assert size_of(rendered["rendition"]) == ("WEBP", (400, 200))
+    assert size_of(rendered["thumbnail"]) == ("WEBP", (100, 50))
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    objects, recorded = {}, {}
+
+    async def get_by_id(asset_id):
+        return {"id": asset_id, "content_type": objects["type"], "url": storage.object_url("abc-photo")}
+
+    async def set_derivatives(asset_id, derivatives):
+        recorded[asset_id] = derivatives
+
+    async def head(key):
+        return {"ContentLength": len(objects[key])} if key in objects else None
+
+    async def get(key):
+        return objects[key]
+
+    async def put(key, body, content_type):
+        objects[key] = body
+
+    async def presign_get(key):
+        return f"http://s3/{key}?signed"
+
+    monkeypatch.setattr(AssetCRUD, "get_by_id", get_by_id)
+    monkeypatch.setattr(AssetCRUD, "set_derivatives", set_derivatives)
+    for name, fn in (("head", head), ("get", get), ("put", put), ("presign_get", presign_get)):
+        monkeypatch.setattr(storage, name, fn)
+    return objects, recorded
+
+
+@pytest.mark.asyncio
+async def test_worker_stores_image_derivatives_next_to_original(stored):
+    objects, recorded = stored
+    objects.update({"type": "image/png", "abc-photo": png(2000, 2000)})
+
+    derivatives = await DerivativeWorker().process("a1")
+    assert set(derivatives) == {"rendition", "thumbnail"}
+    assert recorded["a1"] == derivatives
+    assert derivatives["thumbnail"] == storage.object_url("abc-photo.thumbnail.webp")
+    assert size_of(objects["abc-photo.thumbnail.webp"])[1] == (Config.DERIVATIVE_THUMBNAIL_SIZE,) * 2
+
+
+@pytest.mark.asyncio
+async def test_worker_falls_back_to_first_frame_for_short_videos(monkeypatch, stored):
+    objects, recorded = stored
+    objects["type"] = "video/mp4"
+    offsets = []
+
+    async def grab_frame(url, offset):
+        offsets.append(offset)
+        return png(640, 360) if offset == 0 else b""
+
+    monkeypatch.setattr(DerivativeWorker, "_grab_frame", staticmethod(grab_frame))
+    derivatives = await DerivativeWorker().process("v1")
+    assert set(derivatives) == {"poster", "thumbnail"}
+    assert offsets == [Config.DERIVATIVE_POSTER_OFFSET, 0]
+
+
+@pytest.mark.asyncio
+async def test_relay_queues_derivative_jobs_for_images_and_videos(monkeypatch):
+    records = [
+        {"_id": i, "outbox": {"events": [{"asset_id": str(i), "content_type": content_type}]}}
+        for i, content_type in enumerate(["image/jpeg", "application/pdf", "video/mp4"])
+    ]
+    published, jobs = [], []
+
+    async def claim(owner, limit, lease_seconds):
+        return records
+
+    async def complete(owner, ids):
+        pass
+
+    async def fake_publish_assets(messages):
+        published.extend(messages)
+
+    async def fake_publish_derivative_jobs(messages):
+        jobs.extend(messages)
+
+    monkeypatch.setattr(outbox.OutboxCRUD, "claim", claim)
+    monkeypatch.setattr(outbox.OutboxCRUD, "complete", complete)
+    monkeypatch.setattr(outbox, "publish_assets", fake_publish_assets)
+    monkeypatch.setattr(outbox, "publish_derivative_jobs", fake_publish_derivative_jobs)
+
+    await OutboxRelay().drain_once()
+    assert len(published) == 3
+    assert [job["asset_id"] for job in jobs] == ["0", "2"]
+    assert not wants_derivatives(None)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.database.crud.asset_service_crud import OutboxCRUD
+from src.utils import outbox
+from src.utils.outbox import OutboxRelay
+
+
+@pytest.fixture
+def pending(monkeypatch):
+    records = {
+        i: {"_id": i, "outbox": {"events": [{"asset_id": str(i)}]}} for i in range(3)
+    }
+
+    async def claim(owner, limit, lease_seconds):
+        return list(records.values())[:limit]
+
+    async def complete(owner, ids):
+        for i in ids:
+            records.pop(i)
+
+    monkeypatch.setattr(OutboxCRUD, "claim", claim)
+    monkeypatch.setattr(OutboxCRUD, "complete", complete)
+    return records
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_batch_then_clears_it(monkeypatch, pending):
+    published = []
+
+    async def fake_publish_assets(messages):
+        published.extend(messages)
+
+    monkeypatch.setattr(outbox, "publish_assets", fake_publish_assets)
+    relay = OutboxRelay()
+    assert await relay.drain_once() == 3
+    assert [m["asset_id"] for m in published] == ["0", "1", "2"]
+    assert not pending
+    assert relay.published == 3 and relay.batches == 1
+
+
+@pytest.mark.asyncio
+async def test_relay_keeps_events_when_broker_fails(monkeypatch, pending):
+    async def failing_publish_assets(messages):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(outbox, "publish_assets", failing_publish_assets)
+    relay = OutboxRelay()
+    with pytest.raises(ConnectionError):
+        await relay.drain_once()
+    assert len(pending) == 3
+
+
+@pytest.mark.asyncio
+async def test_notify_during_drain_is_not_lost(monkeypatch, pending):
+    from src.core.config import Config
+
+    monkeypatch.setattr(Config, "OUTBOX_POLL_INTERVAL", 10)
+    relay = OutboxRelay()
+    published = []
+    drained_again = asyncio.Event()
+
+    async def fake_publish_assets(messages):
+        published.extend(messages)
+        if len(published) == 3:
+            # a new upload is committed and notifies while this batch is sent
+            pending[3] = {"_id": 3, "outbox": {"events": [{"asset_id": "3"}]}}
+            relay.notify()
+        else:
+            drained_again.set()
+
+    monkeypatch.setattr(outbox, "publish_assets", fake_publish_assets)
+    await relay.startup()
+    try:
+        await asyncio.wait_for(drained_again.wait(), 1)
+    finally:
+        await relay.shutdown()
+    assert [m["asset_id"] for m in published] == ["0", "1", "2", "3"]
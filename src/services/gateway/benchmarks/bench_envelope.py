@@ -0,0 +1,78 @@
+"""
+CPU cost of wrapping upstream JSON in the gateway envelope.
+
+Compares the original reparse path (json.loads + JSONResponse re-encoding),
+the reparse fallback (orjson when installed) and the passthrough path that
+only concatenates the envelope around the raw bytes.
+
+Run from the gateway service directory:
+    PYTHONPATH=src python benchmarks/bench_envelope.py [--mb 8] [--rounds 5]
+"""
+import argparse
+import json
+import time
+
+from starlette.responses import JSONResponse
+
+from utils.envelope import loads, render_envelope, wrap_raw
+
+
+def make_asset_listing(target_bytes: int) -> bytes:
+    """Build a realistic asset listing response of roughly ``target_bytes``."""
+    asset = {
+        "id": "665f1c2ab3e4d5f6a7b8c9d0",
+        "user_id": "user-42",
+        "filename": "grain-inspection-report-2024.pdf",
+        "content_type": "application/pdf",
+        "url": "http://s3-server:9000/assets/3f2a9c1e-grain-inspection-report-2024.pdf",
+        "file_type": "application",
+        "meta_data": {"description": "Canadian Grain Commission grade report, No. 1 CWRS, protein 13.5%"},
+    }
+    per_item = len(json.dumps(asset).encode())
+    return json.dumps([asset] * max(target_bytes // per_item, 1)).encode()
+
+
+def cpu_seconds(fn, body: bytes, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.process_time()
+        fn(body)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def original(body: bytes) -> bytes:
+    return JSONResponse(content={"status_code": 200, "content": json.loads(body)}).body
+
+
+def reparse(body: bytes) -> bytes:
+    return render_envelope(200, loads(body))
+
+
+def passthrough(body: bytes) -> bytes:
+    return wrap_raw(200, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mb", type=float, default=8.0, help="response size in MB")
+    parser.add_argument("--rounds", type=int, default=5, help="repetitions; best is reported")
+    args = parser.parse_args()
+
+    body = make_asset_listing(int(args.mb * 1024 * 1024))
+    mb = len(body) / (1024 * 1024)
+    print(f"response size: {mb:.2f} MB")
+
+    results = {
+        name: cpu_seconds(fn, body, args.rounds) / mb
+        for name, fn in (("original (json + JSONResponse)", original),
+                         ("reparse fallback", reparse),
+                         ("passthrough", passthrough))
+    }
+    baseline = results["original (json + JSONResponse)"]
+    for name, per_mb in results.items():
+        print(f"{name:32s} {per_mb * 1000:8.3f} ms CPU/MB   saved vs original: {(baseline - per_mb) * 1000:8.3f} ms/MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,168 @@
-from pydantic import BaseSettings, AnyHttpUrl
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, BaseSettings, AnyHttpUrl
+
+
+class UpstreamPoolSettings(BaseModel):
+    """
+    Connection pool, timeout and load-shedding tuning for one upstream service.
+    """
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 30.0
+    pool_timeout: float = 5.0
+    http2: bool = True
+    # Adaptive concurrency limit bounds and starting point
+    min_concurrency: int = 1
+    initial_concurrency: int = 20
+    max_concurrency: int = 200
+    # Time to first byte above which the AIMD limiter backs off
+    latency_threshold: float = 2.0
+
+
+class CacheRule(BaseModel):
+    """
+    Cache GET responses of ``service`` whose path fully matches the ``path`` regex.
+    """
+    service: str
+    path: str
+    ttl: float
 
 
 class Settings(BaseSettings):
-    admin_service_url: AnyHttpUrl
-    asset_service_url: AnyHttpUrl
-    industry_context_service_url: AnyHttpUrl
-    llm_orchestration_service_url: AnyHttpUrl
-    metadata_service_url: AnyHttpUrl
-    profile_generation_service_url: AnyHttpUrl
-    profile_management_service_url: AnyHttpUrl
-    search_service_url: AnyHttpUrl
-    translation_service_url: AnyHttpUrl
-    user_management_service_url: AnyHttpUrl
+    # Each service accepts one or more replica URLs, comma separated, e.g.
+    # ASSET_SERVICE_URL=http://asset-1:8002,http://asset-2:8002
+    admin_service_url: List[AnyHttpUrl]
+    asset_service_url: List[AnyHttpUrl]
+    industry_context_service_url: List[AnyHttpUrl]
+    llm_orchestration_service_url: List[AnyHttpUrl]
+    metadata_service_url: List[AnyHttpUrl]
+    profile_generation_service_url: List[AnyHttpUrl]
+    profile_management_service_url: List[AnyHttpUrl]
+    search_service_url: List[AnyHttpUrl]
+    translation_service_url: List[AnyHttpUrl]
+    user_management_service_url: List[AnyHttpUrl]
+
+    # Pool settings applied to every upstream unless overridden below.
+    upstream_defaults: UpstreamPoolSettings = UpstreamPoolSettings()
+    # Per-service overrides keyed by service identifier, e.g.
+    # UPSTREAM_OVERRIDES='{"llm_orchestration": {"read_timeout": 120}}'
+    upstream_overrides: Dict[str, Dict] = {
+        # LLM calls routinely take longer than the default read timeout
+        "llm_orchestration": {"read_timeout": 120.0, "latency_threshold": 60.0},
+        # large uploads need a generous write window
+        "assets": {"write_timeout": 300.0},
+    }
+
+    # Wrap JSON responses in the {"status_code", "content"} envelope by default;
+    # clients can opt out per request with the X-Gateway-Envelope header.
+    json_envelope: bool = True
+    # "passthrough" embeds raw upstream JSON bytes in the envelope without
+    # parsing them; "reparse" decodes and re-serializes every body.
+    envelope_mode: Literal["passthrough", "reparse"] = "passthrough"
+    # Read size used when relaying streamed upstream bodies
+    stream_chunk_size: int = 64 * 1024
+
+    # Response cache for idempotent GETs, e.g.
+    # CACHE_RULES='[{"service": "assets", "path": "assets", "ttl": 30}]'
+    cache_enabled: bool = True
+    cache_rules: List[CacheRule] = [
+        CacheRule(service="assets", path="assets", ttl=30),
+        CacheRule(service="llm_orchestration", path="config", ttl=60),
+    ]
+    # Upper bound on the in-process LRU tier and on any single cached body
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_max_entry_bytes: int = 1024 * 1024
+    # Request headers that produce distinct cache entries for the same URL
+    cache_vary_headers: List[str] = ["authorization", "cookie", "accept-language"]
+    # Optional shared tier, e.g. redis://redis:6379/0
+    cache_redis_url: Optional[str] = None
+    # Shared secret that POST /gateway/cache/invalidate requires in the
+    # X-Admin-Token header; the hook is disabled while it is unset
+    cache_admin_token: Optional[str] = None
+
+    # Coalesce identical concurrent GETs into a single upstream call
+    singleflight_enabled: bool = True
+    # Request headers that make otherwise identical GETs distinct
+    singleflight_vary_headers: List[str] = [
+        "authorization", "cookie", "accept", "accept-language",
+        "range", "if-none-match", "if-modified-since",
+    ]
+    # Only responses up to this size are buffered and shared with waiters
+    singleflight_max_bytes: int = 4 * 1024 * 1024
+
+    # Replica selection: power-of-two-choices or least outstanding requests
+    load_balancing: Literal["p2c", "least_outstanding"] = "p2c"
+    # Active health checks; any non-5xx answer counts as alive
+    health_check_path: str = "/health"
+    health_check_interval: float = 10.0
+    health_check_timeout: float = 2.0
+    health_check_unhealthy_threshold: int = 2
+    # Passive outlier ejection after consecutive connect errors / 502-504s
+    outlier_consecutive_failures: int = 5
+    outlier_ejection_seconds: float = 30.0
+
+    # Per-service adaptive concurrency limit: "gradient" tracks the no-load
+    # latency by itself, "aimd" backs off above each service's latency_threshold
+    concurrency_limit_algorithm: Literal["gradient", "aimd"] = "gradient"
+    # Circuit breaker: open when the failure ratio over the last
+    # breaker_window calls reaches breaker_failure_ratio
+    breaker_window: int = 20
+    breaker_min_calls: int = 10
+    breaker_failure_ratio: float = 0.5
+    breaker_open_seconds: float = 30.0
+    breaker_half_open_calls: int = 3
+
+    # POST /api/batch: sub-requests per batch, default per-sub-request timeout
+    # in seconds, and the largest sub-response body embedded in the result
+    batch_max_requests: int = 20
+    batch_timeout: float = 10.0
+    batch_max_response_bytes: int = 4 * 1024 * 1024
+
+    # Response compression negotiated from Accept-Encoding; encodings are
+    # listed in server preference order (br/zstd need brotli/zstandard)
+    compression_enabled: bool = True
+    compression_encodings: List[str] = ["zstd", "br", "gzip"]
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    # Content types that are already compressed and are never re-encoded
+    compression_skip_types: List[str] = [
+        "image/", "video/", "audio/", "font/woff",
+        "application/zip", "application/gzip", "application/x-gzip",
+        "application/x-7z-compressed", "application/x-rar-compressed",
+        "application/x-bzip2", "application/x-xz", "application/zstd",
+        "application/pdf", "application/octet-stream",
+    ]
+
+    # Prometheus metrics at /metrics; histogram bucket bounds in seconds and
+    # the number of recent samples kept per series for /gateway/latency
+    metrics_enabled: bool = True
+    metrics_latency_buckets: List[float] = [
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+    ]
+    metrics_sample_size: int = 2048
 
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
-    def get_service_url(self, service_name: str) -> AnyHttpUrl | None:
+        @classmethod
+        def parse_env_var(cls, field_name: str, raw_val: str):
+            # service URLs may be a JSON list or a plain comma separated string
+            if field_name.endswith("_service_url") and not raw_val.lstrip().startswith("["):
+                return [url.strip() for url in raw_val.split(",") if url.strip()]
+            return cls.json_loads(raw_val)
+
+    def get_service_urls(self) -> Dict[str, List[AnyHttpUrl]]:
         """
-        Map service identifier to its base URL.
+        Map every service identifier to its replica base URLs.
         """
-        mapping = {
+        return {
             "admin": self.admin_service_url,
             "assets": self.asset_service_url,
             "industry_context": self.industry_context_service_url,
@@ -33,7 +174,22 @@ class Settings(BaseSettings):
             "translation": self.translation_service_url,
             "user_management": self.user_management_service_url,
         }
-        return mapping.get(service_name)
+
+    def get_service_url(self, service_name: str) -> AnyHttpUrl | None:
+        """
+        Map service identifier to its (first) base URL.
+        """
+        urls = self.get_service_urls().get(service_name)
+        return urls[0] if urls else None
+
+    def get_upstream_settings(self, service_name: str) -> UpstreamPoolSettings:
+        """
+        Resolve pool settings for a service: defaults merged with its overrides.
+        """
+        overrides: Optional[Dict] = self.upstream_overrides.get(service_name)
+        if not overrides:
+            return self.upstream_defaults
+        return UpstreamPoolSettings(**{**self.upstream_defaults.dict(), **overrides})
 
 
 # Initialize settings
@@ -0,0 +1,12 @@
+class GatewayException(Exception):
+    """Base exception for the API gateway."""
+    pass
+
+
+class UpstreamUnavailableException(GatewayException):
+    """Raised when a request is shed instead of being sent to an upstream."""
+    def __init__(self, service: str, reason: str, retry_after: int):
+        super().__init__(f"Service '{service}' unavailable: {reason}")
+        self.service = service
+        self.reason = reason
+        self.retry_after = retry_after
@@ -2,7 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.config import settings
+from routes.batch import router as batch_router
 from routes.gateway import router as gateway_router
+from routes.gateway_admin import router as gateway_admin_router
+from routes.metrics import router as metrics_router
+from utils.balancer import load_balancer
+from utils.cache import response_cache
+from utils.compression import CompressionMiddleware
+from utils.metrics import MetricsMiddleware
+from utils.upstream import upstream_clients
 
 app = FastAPI(title="API Gateway")
 
@@ -14,5 +22,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated gzip/br/zstd compression of (streamed) responses
+app.add_middleware(CompressionMiddleware)
+
+# Outermost, so byte counts and durations match what clients see
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+async def startup():
+    # Open one pooled client per upstream service
+    await upstream_clients.startup()
+    # Track replicas and start active health checks
+    await load_balancer.startup()
+    await response_cache.startup()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await load_balancer.shutdown()
+    await upstream_clients.shutdown()
+    await response_cache.shutdown()
+
+
+# Prometheus scrape endpoint
+app.include_router(metrics_router)
+
+# Gateway introspection endpoints (pool stats, cache, ...)
+app.include_router(gateway_admin_router, prefix="/gateway")
+
+# Composite requests; registered before the catch-all proxy route
+app.include_router(batch_router, prefix="/api")
+
 # Mount the gateway proxy under /api
-app.include_router(gateway_router, prefix="/api")
\ No newline at end of file
+app.include_router(gateway_router, prefix="/api")
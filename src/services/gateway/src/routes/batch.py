@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import Response
+import httpx
+
+from core.config import settings
+from routes.gateway import HOP_BY_HOP_HEADERS, SAFE_METHODS, forward_headers, send_upstream
+from schemas.gateway_schema import BatchRequest, BatchResponse, BatchSubRequest
+from utils.cache import response_cache
+from utils.envelope import charset, dumps, is_utf8_json, loads
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Headers of the batch request itself that describe its own body and must not
+# leak into the sub-requests
+BATCH_BODY_HEADERS = {b"content-type", b"content-length", b"content-encoding"}
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+def _sub_headers(request: Request, sub: BatchSubRequest) -> list[tuple[bytes, bytes]]:
+    """
+    Headers of the batch request (auth, cookies, language, ...) overridden by
+    the sub-request's own headers.
+    """
+    own = {
+        name.lower().encode("latin-1"): value.encode("latin-1")
+        for name, value in sub.headers.items()
+        if name.lower().encode("latin-1") not in HOP_BY_HOP_HEADERS
+    }
+    if sub.body is not None:
+        own[b"content-type"] = b"application/json"
+    inherited = [
+        (name, value) for name, value in forward_headers(request, BATCH_BODY_HEADERS)
+        if name.lower() not in own
+    ]
+    return inherited + list(own.items())
+
+
+async def _read_limited(resp: httpx.Response, limit: int) -> bytes:
+    try:
+        content_length = resp.headers.get("content-length")
+        if content_length is not None and int(content_length) > limit:
+            raise _BodyTooLarge()
+        body = bytearray()
+        async for chunk in resp.aiter_bytes():
+            body += chunk
+            if len(body) > limit:
+                raise _BodyTooLarge()
+        return bytes(body)
+    finally:
+        await resp.aclose()
+
+
+async def _call(request: Request, sub: BatchSubRequest) -> tuple[int, str, bytes]:
+    if not sub.path.strip("/"):
+        raise HTTPException(status_code=404, detail="Path not specified")
+    if not settings.get_service_url(sub.service):
+        raise HTTPException(status_code=404, detail="Service not found")
+
+    path = sub.path.lstrip("/")
+    resp = await send_upstream(
+        sub.service,
+        sub.method,
+        path,
+        _sub_headers(request, sub),
+        params=sub.query or None,
+        content=dumps(sub.body) if sub.body is not None else None,
+    )
+    try:
+        body = await _read_limited(resp, settings.batch_max_response_bytes)
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Bad gateway: {exc}") from exc
+    if sub.method not in SAFE_METHODS and resp.status_code < 400:
+        await response_cache.invalidate(sub.service, path.split("/", 1)[0])
+    return resp.status_code, resp.headers.get("content-type", ""), body
+
+
+def _render(
+    sub_id: str, status_code: int, elapsed: float, content_type: Optional[str] = None,
+    body: bytes = b"", error: Optional[str] = None,
+) -> bytes:
+    """
+    Serialize one ``BatchSubResponse``. UTF-8 JSON bodies are embedded
+    verbatim rather than re-encoded; a body that is not valid JSON becomes
+    a 502 entry.
+    """
+    item = {
+        "id": sub_id,
+        "status_code": status_code,
+        "content_type": content_type,
+        "error": error,
+        "elapsed_ms": round(elapsed * 1000, 2),
+    }
+    if not body or status_code in (204, 304):
+        return dumps({**item, "content": None})
+    if "application/json" in content_type:
+        try:
+            if settings.envelope_mode == "passthrough" and is_utf8_json(content_type):
+                # parsed only to check it: one malformed body must not break
+                # the JSON of the whole batch
+                loads(body)
+                return dumps(item)[:-1] + b',"content":' + body + b"}"
+            return dumps({**item, "content": loads(body.decode(charset(content_type)))})
+        except (ValueError, LookupError):
+            return dumps({**item, "status_code": 502, "error": "invalid JSON from upstream", "content": None})
+    text = body.decode(charset(content_type) if "charset=" in content_type else "utf-8", "replace")
+    return dumps({**item, "content": text})
+
+
+async def _run(request: Request, sub: BatchSubRequest, sub_id: str, timeout: float) -> bytes:
+    """Run one sub-request, turning every failure into its own result."""
+    started = time.monotonic()
+    try:
+        status_code, content_type, body = await asyncio.wait_for(_call(request, sub), timeout)
+    except asyncio.TimeoutError:
+        return _render(sub_id, 504, time.monotonic() - started, error=f"timed out after {timeout}s")
+    except HTTPException as exc:
+        return _render(sub_id, exc.status_code, time.monotonic() - started, error=str(exc.detail))
+    except _BodyTooLarge:
+        return _render(sub_id, 502, time.monotonic() - started, error="response too large for a batch")
+    except Exception as exc:
+        logger.error(f"Batch sub-request {sub_id} failed: {exc}")
+        return _render(sub_id, 500, time.monotonic() - started, error="internal gateway error")
+    return _render(sub_id, status_code, time.monotonic() - started, content_type, body)
+
+
+@router.post(
+    "/batch",
+    response_model=BatchResponse,
+    responses={400: {"description": "Too many sub-requests"}},
+)
+async def batch(payload: BatchRequest, request: Request):
+    """
+    Run several proxied calls concurrently and return all their results at once.
+
+    Sub-requests share the pooled upstream clients, breakers and replica
+    balancing of the proxy, and inherit the batch request's headers
+    (e.g. Authorization). Each one has its own status and timeout, so a slow or
+    failing call only affects its own entry; the batch itself always answers
+    200 with results in request order.
+    """
+    if len(payload.requests) > settings.batch_max_requests:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.batch_max_requests} sub-requests per batch",
+        )
+    default_timeout = payload.timeout or settings.batch_timeout
+    results = await asyncio.gather(*(
+        _run(request, sub, sub.id if sub.id is not None else str(index), sub.timeout or default_timeout)
+        for index, sub in enumerate(payload.requests)
+    ))
+    return Response(
+        content=b'{"responses":[' + b",".join(results) + b"]}",
+        media_type="application/json",
+    )
@@ -1,59 +1,444 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional, Union
+
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import Response, StreamingResponse
 import httpx
+from starlette.background import BackgroundTask
 
-from core.config import settings
+from core.config import settings, CacheRule
 from schemas.gateway_schema import ProxyResponse
+from utils.balancer import load_balancer
+from utils.cache import CachedResponse, compute_etag, etag_matches, response_cache
+from core.exceptions import UpstreamUnavailableException
+from utils.envelope import (
+    charset, envelope_length, is_utf8_json, loads, render_envelope, stream_envelope, wrap_raw,
+)
+from utils.metrics import ConnectTimer, metrics
+from utils.resilience import resilience
+from utils.singleflight import singleflight
+from utils.upstream import BufferedResponse, upstream_clients
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Connection-specific headers that must not be forwarded to the upstream
+# (RFC 9110 section 7.6.1); HTTP/2 upstreams reject them outright.
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"host",
+}
+
+# Conditional headers answered by the gateway cache itself; the upstream must
+# always return a full body so it can be cached.
+CONDITIONAL_HEADERS = {b"if-none-match", b"if-modified-since"}
+
+# Upstream response headers relayed to the client when the body is passed through as-is
+PASSTHROUGH_RESPONSE_HEADERS = ("content-type", "content-length", "content-encoding")
+
+# Request header a client can send to receive raw upstream JSON instead of the envelope
+ENVELOPE_HEADER = "x-gateway-envelope"
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def forward_headers(request: Request, exclude: set[bytes] = frozenset()) -> list[tuple[bytes, bytes]]:
+    return [
+        (name, value) for name, value in request.headers.raw
+        if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in exclude
+    ]
+
+
+def _has_body(request: Request) -> bool:
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        return content_length != "0"
+    return "chunked" in request.headers.get("transfer-encoding", "").lower()
+
+
+def _wants_envelope(request: Request) -> bool:
+    requested = request.headers.get(ENVELOPE_HEADER)
+    if requested is None:
+        return settings.json_envelope
+    return requested.lower() not in ("0", "false", "off", "no")
+
+
+def _is_json(content_type: str) -> bool:
+    return "application/json" in content_type
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """
+    Wraps an upstream body stream to run ``on_close`` exactly once, when the
+    body has been fully relayed or abandoned.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+async def send_upstream(
+    service: str,
+    method: str,
+    path: str,
+    headers: list[tuple[bytes, bytes]],
+    params=None,
+    content: Union[bytes, AsyncIterator[bytes], None] = None,
+) -> httpx.Response:
+    """
+    Send one request to a replica of ``service`` over its pooled client and
+    return the upstream response with its body still unread.
+
+    Requests whose body can be replayed (none, or bytes) that cannot connect
+    are retried once on another replica; streamed bodies are never retried.
+    Requests are rejected with 503 without touching the upstream while its
+    circuit breaker is open or its concurrency limit is reached.
+    """
+    guard = resilience.get(service)
+    try:
+        guard.admit()
+    except UpstreamUnavailableException as exc:
+        raise HTTPException(
+            status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)}
+        ) from exc
+
+    balancer = load_balancer.get(service)
+    client = upstream_clients.get(service)
+    replayable = content is None or isinstance(content, bytes)
+    attempts = min(len(balancer.endpoints), 2) if replayable else 1
+    endpoint = None
+    started = time.monotonic()
+    for attempt in range(attempts):
+        endpoint = balancer.pick(exclude=endpoint)
+        balancer.acquire(endpoint)
+        attempt_started = time.monotonic()
+        connect_timer = ConnectTimer()
+        try:
+            forwarded = client.build_request(
+                method=method,
+                url=f"{endpoint.url}/{path}",
+                headers=headers,
+                content=content,
+                params=params,
+                extensions={"trace": connect_timer},
+            )
+            resp = await client.send(forwarded, stream=True)
+        except httpx.RequestError as exc:
+            connect_timer.observe(service)
+            balancer.record(endpoint, time.monotonic() - attempt_started, failed=True)
+            balancer.release(endpoint)
+            if isinstance(exc, httpx.ConnectError) and attempt + 1 < attempts:
+                logger.warning(f"Retrying {service} on another replica: {exc}")
+                continue
+            guard.record(time.monotonic() - started, failed=True)
+            guard.release()
+            # upstream is unreachable, bubble as 502
+            raise HTTPException(status_code=502, detail=f"Bad gateway: {exc}") from exc
+        except BaseException:
+            # cancelled (client gone, batch timeout): no outcome to record,
+            # but a half-open probe slot must not stay taken forever
+            balancer.release(endpoint)
+            guard.breaker.cancel_probe()
+            guard.release()
+            raise
+
+        failed = resp.status_code in (502, 503, 504)
+        now = time.monotonic()
+        balancer.record(endpoint, now - attempt_started, failed=failed)
+        guard.record(now - started, failed=failed)
+        connect_timer.observe(service)
+        metrics.upstream_ttfb.observe((service,), now - attempt_started)
+
+        def release(endpoint=endpoint, attempt_started=attempt_started) -> None:
+            balancer.release(endpoint)
+            guard.release()
+            metrics.upstream_duration.observe((service,), time.monotonic() - attempt_started)
+
+        resp.stream = _TrackedStream(resp.stream, release)
+        return resp
+
+
+async def _send_upstream(
+    service: str, path: str, request: Request, exclude_headers: set[bytes] = frozenset()
+) -> httpx.Response:
+    """
+    Forward the incoming request to ``service``, streaming its body if any.
+    """
+    return await send_upstream(
+        service,
+        request.method,
+        path,
+        forward_headers(request, exclude_headers),
+        params=request.query_params,
+        content=request.stream() if _has_body(request) else None,
+    )
+
+
+async def read_upstream(resp: httpx.Response) -> bytes:
+    try:
+        return await resp.aread()
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"Bad gateway: {exc}") from exc
+    finally:
+        await resp.aclose()
+
+
+async def _relay_body(resp: httpx.Response, decode: bool = False) -> AsyncIterator[bytes]:
+    """
+    Yield the upstream body chunk by chunk, releasing the connection afterwards
+    even if the client goes away mid-stream. With ``decode`` any upstream
+    Content-Encoding is removed first.
+    """
+    chunks = resp.aiter_bytes if decode else resp.aiter_raw
+    try:
+        async for chunk in chunks(settings.stream_chunk_size):
+            yield chunk
+    except httpx.HTTPError as exc:
+        logger.error(f"Upstream stream interrupted: {exc}")
+    finally:
+        await resp.aclose()
+
+
+@asynccontextmanager
+async def _closing_on_error(resp: httpx.Response):
+    """
+    Close ``resp``, releasing its connection and upstream slots, if turning
+    it into the gateway response fails before the body is handed over.
+    """
+    try:
+        yield
+    except BaseException:
+        await resp.aclose()
+        raise
+
+
+def _streaming_response(resp: httpx.Response, body: AsyncIterator[bytes], **kwargs) -> StreamingResponse:
+    # _relay_body only closes ``resp`` once it is iterated; the background
+    # task also closes it when the client leaves before the first chunk
+    return StreamingResponse(body, background=BackgroundTask(resp.aclose), **kwargs)
+
+
+def _envelope_bytes(status_code: int, content_type: str, body: bytes) -> bytes:
+    """
+    Wrap a buffered JSON body in the ``ProxyResponse`` envelope, embedding the
+    raw bytes when possible and re-serializing only when it must.
+    """
+    if settings.envelope_mode == "passthrough" and is_utf8_json(content_type):
+        return wrap_raw(status_code, body)
+    try:
+        content = loads(body.decode(charset(content_type))) if body else None
+    except (ValueError, LookupError) as exc:
+        raise HTTPException(status_code=502, detail="Bad gateway: invalid JSON from upstream") from exc
+    return render_envelope(status_code, content)
+
+
+def _buffered_response(
+    request: Request, status_code: int, content_type: str, body: bytes, headers: dict
+) -> Response:
+    if status_code in (204, 304):
+        return Response(status_code=status_code, headers=headers)
+    if _is_json(content_type) and _wants_envelope(request):
+        headers["x-upstream-content-type"] = content_type
+        return Response(
+            content=_envelope_bytes(status_code, content_type, body),
+            status_code=status_code,
+            headers=headers,
+            media_type="application/json",
+        )
+    return Response(content=body, status_code=status_code, headers=headers, media_type=content_type or None)
+
+
+async def _client_response(request: Request, resp: httpx.Response) -> Response:
+    """
+    Turn a streamed upstream response into the gateway response.
+
+    JSON is wrapped in the ``ProxyResponse`` envelope unless the client opted
+    out. In passthrough mode the raw upstream bytes are streamed between the
+    envelope prefix and suffix without being decoded; the body is only
+    buffered and re-serialized when it cannot be embedded verbatim (non UTF-8
+    charset) or when ``envelope_mode`` is ``reparse``. Everything else is
+    relayed as-is.
+    """
+    async with _closing_on_error(resp):
+        content_type = resp.headers.get("content-type", "")
+        # Statuses that never carry a body (RFC 9110 section 6.4.1)
+        if resp.status_code in (204, 304):
+            await resp.aclose()
+            return Response(status_code=resp.status_code)
+
+        if _is_json(content_type) and _wants_envelope(request):
+            if settings.envelope_mode == "passthrough" and is_utf8_json(content_type):
+                headers = {"x-upstream-content-type": content_type}
+                if "content-encoding" not in resp.headers and "content-length" in resp.headers:
+                    length = envelope_length(resp.status_code, int(resp.headers["content-length"]))
+                    headers["content-length"] = str(length)
+                return _streaming_response(
+                    resp,
+                    stream_envelope(resp.status_code, _relay_body(resp, decode=True)),
+                    status_code=resp.status_code,
+                    headers=headers,
+                    media_type="application/json",
+                )
+            body = await read_upstream(resp)
+            return _buffered_response(request, resp.status_code, content_type, body, {})
+
+        # Otherwise relay the raw upstream bytes as they arrive
+        headers = {
+            name: resp.headers[name]
+            for name in PASSTHROUGH_RESPONSE_HEADERS
+            if name in resp.headers
+        }
+        return _streaming_response(
+            resp,
+            _relay_body(resp),
+            status_code=resp.status_code,
+            headers=headers,
+            media_type=content_type or None,
+        )
+
+
+def _cache_response(request: Request, entry: CachedResponse, cache_status: str) -> Response:
+    headers = {
+        "etag": entry.etag,
+        "x-cache": cache_status,
+        # clients may keep the body but must revalidate, which yields cheap 304s
+        "cache-control": "no-cache",
+    }
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return _buffered_response(request, entry.status_code, entry.content_type, entry.body, headers)
+
+
+def _is_storable(result: BufferedResponse) -> bool:
+    cache_control = result.cache_control.lower()
+    if "no-store" in cache_control or "private" in cache_control:
+        return False
+    return result.status_code == 200 and len(result.body) <= settings.cache_max_entry_bytes
+
+
+async def _fetch_buffered(
+    service: str, path: str, request: Request, max_bytes: int,
+    exclude_headers: set[bytes] = frozenset(),
+) -> Union[BufferedResponse, httpx.Response]:
+    """
+    Fetch a GET from the upstream, buffering responses of up to ``max_bytes``
+    so they can be shared. Identical concurrent GETs are coalesced into a
+    single upstream call. Larger responses come back unread for streaming.
+    """
+    unshared: list[httpx.Response] = []
+
+    async def fetch() -> Optional[BufferedResponse]:
+        resp = await _send_upstream(service, path, request, exclude_headers)
+        content_length = resp.headers.get("content-length")
+        if content_length is None or not content_length.isdigit() or int(content_length) > max_bytes:
+            unshared.append(resp)
+            return None
+        return BufferedResponse(
+            status_code=resp.status_code,
+            content_type=resp.headers.get("content-type", ""),
+            body=await read_upstream(resp),
+            cache_control=resp.headers.get("cache-control", ""),
+        )
+
+    if settings.singleflight_enabled:
+        key = singleflight.make_key(request.method, service, path, request.url.query, request.headers)
+        result = await singleflight.do(key, fetch)
+    else:
+        result = await fetch()
+
+    if result is not None:
+        return result
+    if unshared:
+        return unshared[0]
+    # the leader's response could not be shared; fetch our own
+    return await _send_upstream(service, path, request, exclude_headers)
+
+
+async def _cached_proxy(service: str, path: str, request: Request, rule: CacheRule) -> Response:
+    """
+    Serve a cacheable GET from the response cache, filling it on a miss.
+    """
+    key = response_cache.make_key(service, path, request.url.query, request.headers)
+    if "no-cache" not in request.headers.get("cache-control", "").lower():
+        entry = await response_cache.get(key)
+        if entry is not None:
+            return _cache_response(request, entry, "HIT")
+
+    max_bytes = max(settings.cache_max_entry_bytes, settings.singleflight_max_bytes)
+    result = await _fetch_buffered(service, path, request, max_bytes, CONDITIONAL_HEADERS)
+    if isinstance(result, httpx.Response):
+        return await _client_response(request, result)
+    if not _is_storable(result):
+        return _buffered_response(request, result.status_code, result.content_type, result.body, {})
+
+    entry = CachedResponse(
+        status_code=result.status_code,
+        content_type=result.content_type,
+        body=result.body,
+        etag=compute_etag(result.body),
+        expires_at=time.time() + rule.ttl,
+    )
+    await response_cache.set(key, entry)
+    return _cache_response(request, entry, "MISS")
+
+
 @router.api_route(
     "/{service}/{path:path}",
     methods=["GET", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"],
     response_model=ProxyResponse,
-    responses={502: {"description": "Bad Gateway"}}
+    responses={
+        502: {"description": "Bad Gateway"},
+        503: {"description": "Upstream circuit open or overloaded"},
+    }
 )
 async def proxy(service: str, path: str, request: Request):
     """
     Proxy any incoming request /{service}/{path} to the corresponding backend URL.
+
+    Request and response bodies are streamed, so memory use does not grow with
+    the payload size. JSON responses are wrapped in the ``ProxyResponse``
+    envelope unless the client opts out with ``X-Gateway-Envelope: off``.
+    GETs matching a configured cache rule are served from the response cache,
+    and identical concurrent GETs share a single upstream call. Each upstream
+    sits behind a circuit breaker and an adaptive concurrency limit.
     """
-    # empty sub-path 
+    # empty sub-path
     if not path:
         raise HTTPException(status_code=404, detail="Path not specified")
 
-    base_url = settings.get_service_url(service)
-    if not base_url:
+    if not settings.get_service_url(service):
         raise HTTPException(status_code=404, detail="Service not found")
 
-    target_url = f"{base_url.rstrip('/')}/{path}"
+    rule = response_cache.rule_for(service, path) if request.method == "GET" else None
+    if rule is not None:
+        return await _cached_proxy(service, path, request, rule)
 
-    try:
-        async with httpx.AsyncClient() as client:
-            forwarded = client.build_request(
-                method=request.method,
-                url=target_url,
-                headers=request.headers.raw,
-                content=await request.body(),
-                params=request.query_params,
-            )
-            resp = await client.send(forwarded, stream=False)
-    except httpx.RequestError as exc:
-        # upstream is unreachable, bubble as 502
-        raise HTTPException(status_code=502, detail=f"Bad gateway: {exc}") from exc
+    if request.method == "GET" and settings.singleflight_enabled:
+        result = await _fetch_buffered(service, path, request, settings.singleflight_max_bytes)
+        if isinstance(result, httpx.Response):
+            return await _client_response(request, result)
+        return _buffered_response(request, result.status_code, result.content_type, result.body, {})
 
-    content_type = resp.headers.get("content-type", "")
-    # If response is JSON, use envelope JSONResponse
-    if "application/json" in content_type:
-        body = resp.json()
-        return JSONResponse(
-            status_code=resp.status_code,
-            content={"status_code": resp.status_code, "content": body},
-            headers={"x-upstream-content-type": content_type},
-        )
-    # For non-JSON, return raw response with correct Content-Type
-    return Response(
-        content=resp.content,
-        status_code=resp.status_code,
-        headers={"content-type": content_type},
-        media_type=content_type,
-    )
+    resp = await _send_upstream(service, path, request)
+    if request.method not in SAFE_METHODS and resp.status_code < 400:
+        async with _closing_on_error(resp):
+            # a successful write may change anything cached under the same resource
+            await response_cache.invalidate(service, path.split("/", 1)[0])
+    return await _client_response(request, resp)
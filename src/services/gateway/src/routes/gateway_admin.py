@@ -0,0 +1,92 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from core.config import settings
+from schemas.gateway_schema import CacheInvalidation, CacheInvalidationResult
+from utils.balancer import load_balancer
+from utils.cache import response_cache
+from utils.metrics import metrics
+from utils.resilience import resilience
+from utils.singleflight import singleflight
+from utils.upstream import upstream_clients
+
+router = APIRouter()
+
+
+@router.get("/pools")
+async def pool_stats():
+    """
+    Connection pool statistics for every upstream client.
+    """
+    return upstream_clients.stats()
+
+
+@router.get("/upstreams")
+async def upstream_stats():
+    """
+    Per-replica routing state: health, ejection, outstanding requests, latency.
+    """
+    return load_balancer.stats()
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Size and hit/miss counters of the response cache.
+    """
+    return response_cache.stats()
+
+
+def require_cache_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    Only callers holding ``cache_admin_token`` may flush the shared cache;
+    anyone else could force a stampede on the upstreams.
+    """
+    if not settings.cache_admin_token:
+        raise HTTPException(status_code=403, detail="Cache invalidation is disabled")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, settings.cache_admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@router.post(
+    "/cache/invalidate",
+    response_model=CacheInvalidationResult,
+    dependencies=[Depends(require_cache_admin)],
+)
+async def invalidate_cache(payload: CacheInvalidation):
+    """
+    Hook for upstream services: drop cached responses of ``service`` whose
+    path starts with ``path_prefix`` (all of them when it is empty).
+    Requires the ``X-Admin-Token`` header.
+    """
+    if not settings.get_service_url(payload.service):
+        raise HTTPException(status_code=404, detail="Service not found")
+    invalidated = await response_cache.invalidate(payload.service, payload.path_prefix)
+    return CacheInvalidationResult(invalidated=invalidated)
+
+
+@router.get("/singleflight")
+async def singleflight_stats():
+    """
+    Upstream calls made for coalescable GETs versus requests that shared them.
+    """
+    return singleflight.stats()
+
+
+@router.get("/breakers")
+async def breaker_stats():
+    """
+    Circuit breaker state and adaptive concurrency limit of every upstream.
+    """
+    return resilience.stats()
+
+
+@router.get("/latency")
+async def latency_summary():
+    """
+    p50/p95/p99 of recent request and upstream latencies, per service.
+    Meant for local profiling; scrape /metrics for monitoring.
+    """
+    return metrics.latency_summary()
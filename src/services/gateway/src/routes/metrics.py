@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from utils.metrics import CONTENT_TYPE_LATEST, metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    Gateway metrics in the Prometheus text exposition format.
+    """
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE_LATEST)
@@ -1,9 +1,57 @@
-from pydantic import BaseModel
-from typing import Any
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 
 class ProxyResponse(BaseModel):
     """
     Envelope model for proxied responses.
     """
     status_code: int
-    content: Any
\ No newline at end of file
+    content: Any
+
+class CacheInvalidation(BaseModel):
+    """
+    Invalidation request sent by upstream services after they change data.
+    """
+    service: str
+    path_prefix: str = ""
+
+
+class CacheInvalidationResult(BaseModel):
+    invalidated: int
+
+
+class BatchSubRequest(BaseModel):
+    """
+    One call inside a batch, addressed like /api/{service}/{path}.
+    """
+    id: Optional[str] = None
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    service: str
+    path: str
+    query: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    body: Any = None
+    timeout: Optional[float] = Field(None, gt=0)
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_items=1)
+    # default timeout for sub-requests that do not set their own
+    timeout: Optional[float] = Field(None, gt=0)
+
+
+class BatchSubResponse(BaseModel):
+    """
+    Outcome of one sub-request. ``content`` is the decoded JSON body, the
+    text of other bodies, or null when the call failed (see ``error``).
+    """
+    id: str
+    status_code: int
+    content: Any = None
+    content_type: Optional[str] = None
+    error: Optional[str] = None
+    elapsed_ms: float
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
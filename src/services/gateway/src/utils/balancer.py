@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+from utils.upstream import upstream_clients
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest sample in the per-endpoint latency average
+LATENCY_EWMA_ALPHA = 0.3
+
+
+@dataclass
+class Endpoint:
+    """One replica of an upstream service and its routing state."""
+    url: str
+    outstanding: int = 0
+    latency_ewma: float = 0.0
+    healthy: bool = True
+    health_failures: int = 0
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    requests: int = 0
+    failures: int = 0
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def load(self) -> float:
+        # Outstanding work weighted by observed latency (peak-EWMA style);
+        # unmeasured endpoints score by outstanding count alone.
+        return (self.outstanding + 1) * max(self.latency_ewma, 1e-3)
+
+    def to_dict(self, now: float) -> dict:
+        return {
+            "url": self.url,
+            "available": self.is_available(now),
+            "healthy": self.healthy,
+            "ejected_for": max(self.ejected_until - now, 0.0),
+            "outstanding": self.outstanding,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 2),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class ServiceBalancer:
+    """
+    Picks a replica of one service for each request and tracks its outcome.
+    """
+
+    def __init__(self, service: str, urls: list[str]):
+        self.service = service
+        self.endpoints = [Endpoint(url=url.rstrip("/")) for url in urls]
+
+    def pick(self, exclude: Optional[Endpoint] = None) -> Endpoint:
+        now = time.monotonic()
+        candidates = [ep for ep in self.endpoints if ep.is_available(now) and ep is not exclude]
+        if not candidates:
+            # every replica is down or ejected: spread load over all of them
+            # rather than failing outright (panic routing)
+            candidates = [ep for ep in self.endpoints if ep is not exclude] or self.endpoints
+        if len(candidates) == 1:
+            return candidates[0]
+        if settings.load_balancing == "least_outstanding":
+            return min(candidates, key=lambda ep: (ep.outstanding, ep.latency_ewma))
+        first, second = random.sample(candidates, 2)
+        return first if first.load() <= second.load() else second
+
+    @staticmethod
+    def acquire(endpoint: Endpoint) -> None:
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+
+    @staticmethod
+    def release(endpoint: Endpoint) -> None:
+        endpoint.outstanding = max(endpoint.outstanding - 1, 0)
+
+    def record(self, endpoint: Endpoint, latency: float, failed: bool) -> None:
+        """
+        Feed a request outcome back: update the latency average and eject the
+        replica for a while after too many consecutive failures.
+        """
+        if endpoint.latency_ewma == 0.0:
+            endpoint.latency_ewma = latency
+        else:
+            endpoint.latency_ewma += LATENCY_EWMA_ALPHA * (latency - endpoint.latency_ewma)
+        if not failed:
+            endpoint.consecutive_failures = 0
+            return
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if endpoint.consecutive_failures >= settings.outlier_consecutive_failures:
+            endpoint.consecutive_failures = 0
+            endpoint.ejected_until = time.monotonic() + settings.outlier_ejection_seconds
+            logger.warning(
+                f"Ejecting {self.service} replica {endpoint.url} "
+                f"for {settings.outlier_ejection_seconds}s"
+            )
+
+    async def check_health(self) -> None:
+        client = upstream_clients.get(self.service)
+        await asyncio.gather(*(self._probe(client, ep) for ep in self.endpoints))
+
+    async def _probe(self, client: httpx.AsyncClient, endpoint: Endpoint) -> None:
+        try:
+            resp = await client.get(
+                f"{endpoint.url}{settings.health_check_path}",
+                timeout=settings.health_check_timeout,
+            )
+            alive = resp.status_code < 500
+        except httpx.HTTPError:
+            alive = False
+
+        if alive:
+            if not endpoint.healthy:
+                logger.info(f"{self.service} replica {endpoint.url} is healthy again")
+            endpoint.healthy = True
+            endpoint.health_failures = 0
+            # an explicit successful probe ends any passive ejection early
+            endpoint.ejected_until = 0.0
+            return
+        endpoint.health_failures += 1
+        if endpoint.healthy and endpoint.health_failures >= settings.health_check_unhealthy_threshold:
+            logger.warning(f"{self.service} replica {endpoint.url} failed health checks")
+            endpoint.healthy = False
+
+
+class LoadBalancer:
+    """
+    Registry of per-service balancers plus the background health checker.
+    """
+
+    def __init__(self):
+        self._balancers: dict[str, ServiceBalancer] = {}
+        self._health_task: Optional[asyncio.Task] = None
+
+    def get(self, service_name: str) -> ServiceBalancer:
+        balancer = self._balancers.get(service_name)
+        if balancer is None:
+            urls = settings.get_service_urls().get(service_name) or []
+            balancer = ServiceBalancer(service_name, [str(url) for url in urls])
+            self._balancers[service_name] = balancer
+        return balancer
+
+    async def startup(self) -> None:
+        for service_name in settings.get_service_urls():
+            self.get(service_name)
+        if settings.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def shutdown(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.health_check_interval)
+            try:
+                await asyncio.gather(*(b.check_health() for b in self._balancers.values()))
+            except Exception as e:
+                logger.error(f"Health check round failed: {e}")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            name: [ep.to_dict(now) for ep in self.get(name).endpoints]
+            for name in settings.get_service_urls()
+        }
+
+
+load_balancer = LoadBalancer()
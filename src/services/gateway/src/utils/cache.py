@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from core.config import settings, CacheRule
+from utils.envelope import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # the shared tier is optional
+    aioredis = None
+
+REDIS_KEY_PREFIX = "gateway:cache:"
+
+
+@dataclass
+class CachedResponse:
+    """Decoded upstream response kept by the gateway cache."""
+    status_code: int
+    content_type: str
+    body: bytes
+    etag: str
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def to_bytes(self) -> bytes:
+        meta = dumps({
+            "status_code": self.status_code,
+            "content_type": self.content_type,
+            "etag": self.etag,
+            "expires_at": self.expires_at,
+        })
+        return meta + b"\n" + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        return cls(body=body, **loads(meta))
+
+
+def compute_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == bare
+        for candidate in if_none_match.split(",")
+    )
+
+
+class ResponseCache:
+    """
+    Two-tier cache for idempotent GET responses.
+
+    The first tier is an in-process LRU bounded by total body size; the
+    optional second tier is Redis, shared by every gateway replica. Which
+    routes are cached and for how long is driven by ``settings.cache_rules``.
+    Invalidations clear the local tier and Redis; other replicas' local tiers
+    drop stale entries when their TTL runs out.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._size = 0
+        self._redis = None
+        self._rules = self._compile(settings.cache_rules)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _compile(rules: Iterable[CacheRule]) -> list[tuple[CacheRule, re.Pattern]]:
+        return [(rule, re.compile(rule.path)) for rule in rules]
+
+    async def startup(self) -> None:
+        if not settings.cache_admin_token:
+            logger.warning("CACHE_ADMIN_TOKEN is not set; POST /gateway/cache/invalidate is disabled")
+        if not settings.cache_redis_url:
+            return
+        if aioredis is None:
+            logger.warning("CACHE_REDIS_URL is set but the 'redis' package is not installed")
+            return
+        self._redis = aioredis.from_url(settings.cache_redis_url)
+        logger.info("Response cache Redis tier enabled")
+
+    async def shutdown(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def rule_for(self, service: str, path: str) -> Optional[CacheRule]:
+        if not settings.cache_enabled:
+            return None
+        for rule, pattern in self._rules:
+            if rule.service == service and pattern.fullmatch(path):
+                return rule
+        return None
+
+    @staticmethod
+    def make_key(service: str, path: str, query: str, headers) -> str:
+        params = "&".join(sorted(query.split("&"))) if query else ""
+        vary = "|".join(headers.get(name, "") for name in settings.cache_vary_headers)
+        vary_hash = hashlib.blake2b(vary.encode(), digest_size=8).hexdigest()
+        return f"{service}/{path}?{params}#{vary_hash}"
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.is_fresh():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self._evict(key)
+
+        if self._redis is not None:
+            try:
+                data = await self._redis.get(REDIS_KEY_PREFIX + key)
+            except Exception as e:
+                logger.error(f"Redis cache read failed: {e}")
+                data = None
+            if data:
+                entry = CachedResponse.from_bytes(data)
+                if entry.is_fresh():
+                    self._store_local(key, entry)
+                    self.hits += 1
+                    return entry
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, entry: CachedResponse) -> None:
+        if entry.size > self.max_entry_bytes:
+            return
+        self._store_local(key, entry)
+        if self._redis is not None:
+            ttl = max(int(entry.expires_at - time.time()), 1)
+            try:
+                await self._redis.set(REDIS_KEY_PREFIX + key, entry.to_bytes(), ex=ttl)
+            except Exception as e:
+                logger.error(f"Redis cache write failed: {e}")
+
+    async def invalidate(self, service: str, path_prefix: str = "") -> int:
+        """
+        Drop every entry of ``service`` whose path starts with ``path_prefix``.
+        Returns the number of local entries removed.
+        """
+        prefix = f"{service}/{path_prefix.lstrip('/')}"
+        stale = [key for key in self._entries if key.startswith(prefix)]
+        for key in stale:
+            self._evict(key)
+
+        if self._redis is not None:
+            pattern = REDIS_KEY_PREFIX + re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+            try:
+                keys = [key async for key in self._redis.scan_iter(match=pattern, count=500)]
+                if keys:
+                    await self._redis.delete(*keys)
+            except Exception as e:
+                logger.error(f"Redis cache invalidation failed: {e}")
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every entry of the local tier."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "redis": self._redis is not None,
+        }
+
+    def _store_local(self, key: str, entry: CachedResponse) -> None:
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes and self._entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+
+response_cache = ResponseCache(settings.cache_max_bytes, settings.cache_max_entry_bytes)
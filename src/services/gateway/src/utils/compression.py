@@ -0,0 +1,193 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+
+try:
+    import brotli
+except ImportError:  # br is only offered when brotli is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd is only offered when zstandard is installed
+    zstandard = None
+
+
+class _GzipCompressor:
+    def __init__(self):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._obj = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliCompressor:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=settings.compression_brotli_quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._obj.process(data)
+        return out + (self._obj.finish() if final else self._obj.flush())
+
+
+class _ZstdCompressor:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._obj.compress(data)
+        if final:
+            return out + self._obj.flush()
+        return out + self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+
+COMPRESSORS = {"gzip": _GzipCompressor, "br": _BrotliCompressor, "zstd": _ZstdCompressor}
+
+
+def available_encodings() -> list[str]:
+    """Configured encodings in server preference order, minus missing libraries."""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [name for name in settings.compression_encodings if installed.get(name)]
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header (RFC 9110 12.5.3):
+    the highest q-value wins, ties go to the server's preference order.
+    """
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in available_encodings():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(status_code: int, headers: Headers) -> bool:
+    if status_code < 200 or status_code in (204, 206, 304):
+        return False
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return not any(content_type.startswith(prefix) for prefix in settings.compression_skip_types)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    Bodies are compressed chunk by chunk and flushed after each one, so
+    streamed proxy responses keep flowing instead of being buffered. Small
+    bodies, already-encoded responses and media types that are compressed
+    already (images, video, archives, ...) are sent as-is.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.compression_enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(encoding, send).run(self.app, scope, receive)
+
+
+class _CompressingResponder:
+    """
+    Holds back the response start until enough of the body has been seen to
+    decide whether compressing it is worthwhile.
+    """
+
+    def __init__(self, encoding: str, send: Send):
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.pending: list[bytes] = []
+        self.pending_size = 0
+        self.compressor = None
+        self.decided = False
+
+    async def run(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.decided:
+            await self._send_body(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not is_compressible(self.start["status"], headers):
+            await self._identity(message)
+            return
+        content_length = headers.get("content-length")
+        if content_length is not None and int(content_length) < settings.compression_min_size:
+            await self._identity(message)
+            return
+
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if more_body and self.pending_size < settings.compression_min_size:
+            # wait for more of a streamed body before deciding
+            return
+        buffered = b"".join(self.pending)
+        self.pending.clear()
+        if not more_body and self.pending_size < settings.compression_min_size:
+            headers.add_vary_header("Accept-Encoding")
+            await self._identity({"type": "http.response.body", "body": buffered})
+            return
+
+        self.decided = True
+        self.compressor = COMPRESSORS[self.encoding]()
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # the compressed bytes differ, so only a weak validator still holds
+            headers["etag"] = "W/" + etag
+        await self.send(self.start)
+        await self._send_body({"type": "http.response.body", "body": buffered, "more_body": more_body})
+
+    async def _identity(self, message: Message) -> None:
+        self.decided = True
+        await self.send(self.start)
+        await self.send(message)
+
+    async def _send_body(self, message: Message) -> None:
+        if self.compressor is None or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        more_body = message.get("more_body", False)
+        chunk = self.compressor.compress(message.get("body", b""), final=not more_body)
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
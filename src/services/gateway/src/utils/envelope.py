@@ -0,0 +1,76 @@
+import json
+from typing import Any, AsyncIterator, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+ENVELOPE_SUFFIX = b"}"
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def envelope_prefix(status_code: int) -> bytes:
+    return b'{"status_code":%d,"content":' % status_code
+
+
+def render_envelope(status_code: int, content: Any) -> bytes:
+    """Serialize an already-decoded body into the ``ProxyResponse`` envelope."""
+    return dumps({"status_code": status_code, "content": content})
+
+
+def wrap_raw(status_code: int, body: bytes) -> bytes:
+    """Build the envelope around raw JSON bytes without decoding them."""
+    return envelope_prefix(status_code) + (body or b"null") + ENVELOPE_SUFFIX
+
+
+def envelope_length(status_code: int, body_length: Optional[int]) -> Optional[int]:
+    """Size of the passthrough envelope for a body of known length, if any."""
+    if body_length is None:
+        return None
+    return len(envelope_prefix(status_code)) + (body_length or len(b"null")) + len(ENVELOPE_SUFFIX)
+
+
+async def stream_envelope(status_code: int, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Stream the envelope around raw upstream JSON chunks. The body is never
+    parsed; an empty upstream body becomes ``null``.
+    """
+    yield envelope_prefix(status_code)
+    empty = True
+    async for chunk in chunks:
+        if chunk:
+            empty = False
+            yield chunk
+    if empty:
+        yield b"null"
+    yield ENVELOPE_SUFFIX
+
+
+def charset(content_type: str) -> str:
+    """Charset declared in a Content-Type header; JSON defaults to UTF-8."""
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "charset":
+            return value.strip('"')
+    return "utf-8"
+
+
+def is_utf8_json(content_type: str) -> bool:
+    """
+    True when the raw bytes can be embedded as-is: JSON is UTF-8 unless the
+    upstream explicitly declares another charset.
+    """
+    return charset(content_type).lower().replace("_", "-") in ("utf-8", "utf8", "us-ascii")
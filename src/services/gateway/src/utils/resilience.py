@@ -0,0 +1,223 @@
+import logging
+import math
+import time
+from collections import deque
+from enum import Enum
+
+from core.config import settings, UpstreamPoolSettings
+from core.exceptions import UpstreamUnavailableException
+
+logger = logging.getLogger(__name__)
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Failure-ratio circuit breaker over a sliding window of recent calls.
+
+    CLOSED lets everything through. Once enough recent calls fail it turns
+    OPEN and rejects calls for ``breaker_open_seconds``. It then goes
+    HALF_OPEN and lets a few probe calls through. If they all succeed it
+    closes again; any failure re-opens it.
+    """
+
+    def __init__(self):
+        self.state = BreakerState.CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=settings.breaker_window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened = 0
+
+    def retry_after(self) -> float:
+        return max(self._opened_at + settings.breaker_open_seconds - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        if self.state == BreakerState.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if self.state == BreakerState.HALF_OPEN:
+            if self._probes_in_flight >= settings.breaker_half_open_calls:
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def cancel_probe(self) -> None:
+        """Return a half-open probe slot that ended up unused."""
+        if self.state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def record(self, success: bool) -> None:
+        if self.state == BreakerState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if not success:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= settings.breaker_half_open_calls:
+                self.state = BreakerState.CLOSED
+                self._outcomes.clear()
+            return
+        if self.state == BreakerState.OPEN:
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if (
+            len(self._outcomes) >= settings.breaker_min_calls
+            and failures / len(self._outcomes) >= settings.breaker_failure_ratio
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = BreakerState.OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.times_opened += 1
+
+    def to_dict(self) -> dict:
+        failures = self._outcomes.count(False)
+        return {
+            "state": self.state.value,
+            "retry_after": round(self.retry_after(), 2) if self.state == BreakerState.OPEN else 0.0,
+            "window_calls": len(self._outcomes),
+            "window_failures": failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class ConcurrencyLimiter:
+    """
+    Adaptive cap on requests in flight to one upstream.
+
+    ``aimd`` adds one slot when the limit is being used and latency is below
+    the service's threshold, and cuts the limit by 10% on slow or failed
+    calls. ``gradient`` compares the recent latency with the long-term
+    no-load latency and shrinks the limit as queueing builds up, leaving
+    sqrt(limit) headroom for growth.
+    """
+
+    BACKOFF_RATIO = 0.9
+    SMOOTHING = 0.2
+    # how much slower than the baseline latency is tolerated before shrinking
+    RTT_TOLERANCE = 1.5
+
+    def __init__(self, pool: UpstreamPoolSettings):
+        self.min_limit = pool.min_concurrency
+        self.max_limit = pool.max_concurrency
+        self.latency_threshold = pool.latency_threshold
+        self.limit = float(pool.initial_concurrency)
+        self.in_flight = 0
+        self.shed = 0
+        self._short_rtt = 0.0
+        self._long_rtt = 0.0
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            self.shed += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight = max(self.in_flight - 1, 0)
+
+    def on_sample(self, rtt: float, dropped: bool) -> None:
+        if settings.concurrency_limit_algorithm == "aimd":
+            self._aimd(rtt, dropped)
+        else:
+            self._gradient(rtt, dropped)
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+
+    def _aimd(self, rtt: float, dropped: bool) -> None:
+        if dropped or rtt > self.latency_threshold:
+            self.limit *= self.BACKOFF_RATIO
+        elif self.in_flight * 2 >= self.limit:
+            self.limit += 1
+
+    def _gradient(self, rtt: float, dropped: bool) -> None:
+        if dropped:
+            self.limit *= self.BACKOFF_RATIO
+            return
+        if self._long_rtt == 0.0:
+            self._short_rtt = self._long_rtt = rtt
+        # fast average tracks current latency, slow average the no-load baseline
+        self._short_rtt += 0.5 * (rtt - self._short_rtt)
+        self._long_rtt += 0.01 * (rtt - self._long_rtt)
+        # never let the baseline drift above what we observe right now
+        self._long_rtt = min(self._long_rtt, self._short_rtt)
+        if self.in_flight * 2 < self.limit:
+            # not enough load to learn anything about the limit
+            return
+        gradient = max(0.5, min(1.0, self.RTT_TOLERANCE * self._long_rtt / self._short_rtt))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self.limit * (1 - self.SMOOTHING) + target * self.SMOOTHING
+
+    def to_dict(self) -> dict:
+        return {
+            "algorithm": settings.concurrency_limit_algorithm,
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "shed": self.shed,
+        }
+
+
+class ServiceGuard:
+    """
+    Breaker and concurrency limiter in front of one upstream service.
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self.breaker = CircuitBreaker()
+        self.limiter = ConcurrencyLimiter(settings.get_upstream_settings(service))
+
+    def admit(self) -> None:
+        """
+        Take a slot for one request, or raise ``UpstreamUnavailableException``
+        straight away when the breaker is open or the limit is reached.
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailableException(
+                self.service, "circuit open", math.ceil(self.breaker.retry_after()) or 1
+            )
+        if not self.limiter.try_acquire():
+            self.breaker.cancel_probe()
+            raise UpstreamUnavailableException(self.service, "concurrency limit reached", 1)
+
+    def record(self, rtt: float, failed: bool) -> None:
+        self.breaker.record(not failed)
+        self.limiter.on_sample(rtt, dropped=failed)
+
+    def release(self) -> None:
+        self.limiter.release()
+
+    def to_dict(self) -> dict:
+        return {"breaker": self.breaker.to_dict(), "concurrency": self.limiter.to_dict()}
+
+
+class Resilience:
+    """Registry of per-service guards."""
+
+    def __init__(self):
+        self._guards: dict[str, ServiceGuard] = {}
+
+    def get(self, service_name: str) -> ServiceGuard:
+        guard = self._guards.get(service_name)
+        if guard is None:
+            guard = ServiceGuard(service_name)
+            self._guards[service_name] = guard
+        return guard
+
+    def stats(self) -> dict:
+        return {name: self.get(name).to_dict() for name in settings.get_service_urls()}
+
+
+resilience = Resilience()
@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, Optional
+
+from core.config import settings
+from utils.upstream import BufferedResponse
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls: the first caller for a key (the
+    leader) runs the call, every concurrent caller with the same key awaits
+    the leader's result instead of issuing its own.
+
+    Results are fully buffered so they can be handed to several callers. A
+    ``None`` result tells waiters the leader could not share its response
+    (e.g. too large to buffer) and they should fetch their own.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(method: str, service: str, path: str, query: str, headers) -> str:
+        params = "&".join(sorted(query.split("&"))) if query else ""
+        vary = "|".join(headers.get(name, "") for name in settings.singleflight_vary_headers)
+        vary_hash = hashlib.blake2b(vary.encode(), digest_size=8).hexdigest()
+        return f"{method} {service}/{path}?{params}#{vary_hash}"
+
+    async def do(
+        self, key: str, fn: Callable[[], Awaitable[Optional[BufferedResponse]]]
+    ) -> Optional[BufferedResponse]:
+        future = self._inflight.get(key)
+        if future is not None:
+            result = await asyncio.shield(future)
+            if result is not None:
+                self.coalesced += 1
+                self.bytes_saved += len(result.body)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # the leader's client went away; let the waiters fetch on their own
+            future.set_result(None)
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # waiters re-raise it; mark it retrieved in case there are none
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.leaders,
+            "coalesced_requests": self.coalesced,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+singleflight = SingleFlight()
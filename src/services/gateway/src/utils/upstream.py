@@ -0,0 +1,114 @@
+import logging
+from dataclasses import dataclass
+
+import httpx
+
+from core.config import settings, UpstreamPoolSettings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class BufferedResponse:
+    """Fully read (and content-decoded) upstream response."""
+    status_code: int
+    content_type: str
+    body: bytes
+    cache_control: str = ""
+
+
+class UpstreamClients:
+    """
+    Registry of long-lived ``httpx.AsyncClient`` instances, one per upstream service.
+
+    Each client owns its own connection pool so keep-alive connections are reused
+    across proxied requests instead of being set up and torn down every call.
+    """
+
+    def __init__(self):
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    @staticmethod
+    def _build_client(pool: UpstreamPoolSettings) -> httpx.AsyncClient:
+        http2 = pool.http2 and HTTP2_AVAILABLE
+        if pool.http2 and not HTTP2_AVAILABLE:
+            logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=pool.max_connections,
+                max_keepalive_connections=pool.max_keepalive_connections,
+                keepalive_expiry=pool.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=pool.connect_timeout,
+                read=pool.read_timeout,
+                write=pool.write_timeout,
+                pool=pool.pool_timeout,
+            ),
+            # the gateway forwards redirects to the caller untouched
+            follow_redirects=False,
+        )
+
+    async def startup(self) -> None:
+        """Create a client for every configured service."""
+        for service_name in settings.get_service_urls():
+            self.get(service_name)
+        logger.info(f"Upstream clients ready for: {', '.join(self._clients)}")
+
+    async def shutdown(self) -> None:
+        """Close every client and release its pooled connections."""
+        clients, self._clients = self._clients, {}
+        for service_name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Failed to close upstream client for {service_name}: {e}")
+
+    def get(self, service_name: str) -> httpx.AsyncClient:
+        """
+        Return the pooled client for a service, creating it on first use.
+        """
+        client = self._clients.get(service_name)
+        if client is None or client.is_closed:
+            client = self._build_client(settings.get_upstream_settings(service_name))
+            self._clients[service_name] = client
+        return client
+
+    def stats(self) -> dict:
+        """
+        Snapshot of per-service pool usage: open, idle and active connections,
+        requests waiting for a connection, and the configured limits.
+        """
+        result = {}
+        for service_name in settings.get_service_urls():
+            pool_settings = settings.get_upstream_settings(service_name)
+            client = self._clients.get(service_name)
+            # httpx does not expose pool counters publicly; read them from httpcore
+            pool = getattr(client._transport, "_pool", None) if client else None
+            connections = list(getattr(pool, "connections", []))
+            idle = sum(1 for conn in connections if conn.is_idle())
+            result[service_name] = {
+                "open_connections": len(connections),
+                "idle_connections": idle,
+                "active_connections": len(connections) - idle,
+                "http2_connections": sum(
+                    1 for conn in connections if "HTTP/2" in conn.info()
+                ),
+                "queued_requests": sum(
+                    1 for req in getattr(pool, "_requests", []) if req.is_queued()
+                ),
+                "max_connections": pool_settings.max_connections,
+                "max_keepalive_connections": pool_settings.max_keepalive_connections,
+                "http2_enabled": pool_settings.http2 and HTTP2_AVAILABLE,
+            }
+        return result
+
+
+upstream_clients = UpstreamClients()
@@ -1,7 +1,21 @@
 import pytest
 from fastapi.testclient import TestClient
 from services.gateway.src.main import app
+from utils.cache import response_cache
+from utils.resilience import resilience
 
 @pytest.fixture
 def client():
-    return TestClient(app)
\ No newline at end of file
+    return TestClient(app)
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+@pytest.fixture(autouse=True)
+def reset_resilience():
+    resilience._guards.clear()
+    yield
+    resilience._guards.clear()
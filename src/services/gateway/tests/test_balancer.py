@@ -0,0 +1,85 @@
+import httpx
+import pytest
+
+from core.config import Settings, settings
+from utils.balancer import ServiceBalancer, load_balancer
+
+
+def test_service_url_accepts_comma_separated_replicas(monkeypatch):
+    monkeypatch.setenv("ASSET_SERVICE_URL", "http://asset-1:8002, http://asset-2:8002")
+    configured = Settings()
+    assert [str(url) for url in configured.get_service_urls()["assets"]] == [
+        "http://asset-1:8002", "http://asset-2:8002",
+    ]
+    assert configured.get_service_url("assets") == "http://asset-1:8002"
+
+
+def test_p2c_prefers_less_loaded_replica():
+    balancer = ServiceBalancer("assets", ["http://a", "http://b"])
+    busy, idle = balancer.endpoints
+    busy.outstanding = 10
+    busy.latency_ewma = idle.latency_ewma = 0.05
+    assert all(balancer.pick() is idle for _ in range(20))
+
+
+def test_least_outstanding_strategy(monkeypatch):
+    monkeypatch.setattr(settings, "load_balancing", "least_outstanding")
+    balancer = ServiceBalancer("assets", ["http://a", "http://b", "http://c"])
+    for endpoint, outstanding in zip(balancer.endpoints, (3, 1, 2)):
+        endpoint.outstanding = outstanding
+    assert balancer.pick().url == "http://b"
+
+
+def test_consecutive_failures_eject_replica(monkeypatch):
+    monkeypatch.setattr(settings, "outlier_consecutive_failures", 3)
+    balancer = ServiceBalancer("assets", ["http://a", "http://b"])
+    bad, good = balancer.endpoints
+    for _ in range(3):
+        balancer.record(bad, 0.01, failed=True)
+    assert all(balancer.pick() is good for _ in range(20))
+
+
+def test_panic_routing_when_all_replicas_unavailable():
+    balancer = ServiceBalancer("assets", ["http://a", "http://b"])
+    for endpoint in balancer.endpoints:
+        endpoint.healthy = False
+    assert balancer.pick() in balancer.endpoints
+
+
+@pytest.mark.asyncio
+async def test_health_check_marks_dead_replica(monkeypatch):
+    monkeypatch.setattr(settings, "health_check_unhealthy_threshold", 1)
+    balancer = ServiceBalancer("assets", ["http://a", "http://b"])
+
+    async def fake_get(self, url, **kwargs):
+        if url.startswith("http://a"):
+            raise httpx.ConnectError("refused")
+        return httpx.Response(404)
+
+    monkeypatch.setattr(httpx.AsyncClient, "get", fake_get)
+    await balancer.check_health()
+    dead, alive = balancer.endpoints
+    assert not dead.healthy
+    assert alive.healthy
+
+
+def test_proxy_retries_connect_error_on_other_replica(monkeypatch, client):
+    balancer = ServiceBalancer("search", ["http://search-1:8009", "http://search-2:8009"])
+    monkeypatch.setitem(load_balancer._balancers, "search", balancer)
+    hosts = []
+
+    async def body():
+        yield b"ok"
+
+    async def fake_send(self, req, **kwargs):
+        hosts.append(req.url.host)
+        if len(hosts) == 1:
+            raise httpx.ConnectError("refused")
+        return httpx.Response(200, headers={"content-type": "text/plain"}, content=body())
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/search/query", headers={"X-Gateway-Envelope": "off"})
+    assert res.status_code == 200
+    assert len(set(hosts)) == 2
+    assert all(endpoint.outstanding == 0 for endpoint in balancer.endpoints)
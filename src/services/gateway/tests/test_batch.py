@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import httpx
+
+from core.config import settings
+
+
+async def _aiter(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _json(status_code: int, payload) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        headers={"content-type": "application/json"},
+        content=_aiter(json.dumps(payload).encode()),
+    )
+
+
+def test_batch_fans_out_and_keeps_order(monkeypatch, client):
+    seen = []
+
+    async def fake_send(self, req, **kwargs):
+        seen.append((req.method, req.url.host, req.url.path, req.headers.get("authorization")))
+        if req.url.host == "metadata":
+            await asyncio.sleep(0.01)
+            return _json(200, {"description": "a cat"})
+        if req.url.host == "translation":
+            return _json(201, {"echo": json.loads(await req.aread())})
+        return httpx.Response(
+            200, headers={"content-type": "text/plain"}, content=_aiter(b"plain")
+        )
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.post(
+        "/api/batch",
+        headers={"Authorization": "Bearer t"},
+        json={"requests": [
+            {"id": "meta", "service": "metadata", "path": "assets/1"},
+            {"service": "translation", "method": "POST", "path": "/translate", "body": {"q": "hi"}},
+            {"service": "assets", "path": "health"},
+        ]},
+    )
+    assert res.status_code == 200
+    responses = res.json()["responses"]
+    assert [r["id"] for r in responses] == ["meta", "1", "2"]
+    assert responses[0]["content"] == {"description": "a cat"}
+    assert responses[1]["status_code"] == 201
+    assert responses[1]["content"] == {"echo": {"q": "hi"}}
+    assert responses[2]["content"] == "plain"
+    assert all(error is None for error in (r["error"] for r in responses))
+    assert {auth for *_, auth in seen} == {"Bearer t"}
+
+
+def test_batch_isolates_slow_and_failing_sub_requests(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        if req.url.host == "search":
+            await asyncio.sleep(1)
+        if req.url.host == "translation":
+            raise httpx.ConnectError("refused")
+        return _json(200, {"ok": True})
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.post("/api/batch", json={"requests": [
+        {"service": "search", "path": "query", "timeout": 0.05},
+        {"service": "translation", "path": "languages"},
+        {"service": "unknown", "path": "x"},
+        {"service": "assets", "path": "1"},
+    ]})
+    assert res.status_code == 200
+    slow, failing, unknown, ok = res.json()["responses"]
+    assert slow["status_code"] == 504 and "timed out" in slow["error"]
+    assert failing["status_code"] == 502
+    assert unknown["status_code"] == 404
+    assert ok["status_code"] == 200 and ok["content"] == {"ok": True}
+
+
+
+def test_batch_maps_malformed_json_body_to_502_entry(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        if req.url.host == "search":
+            return httpx.Response(
+                200, headers={"content-type": "application/json"}, content=_aiter(b'{"hits": [1, 2')
+            )
+        return _json(200, {"ok": True})
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.post("/api/batch", json={"requests": [
+        {"service": "search", "path": "query"},
+        {"service": "metadata", "path": "assets/1"},
+    ]})
+    assert res.status_code == 200
+    broken, ok = res.json()["responses"]
+    assert (broken["status_code"], broken["error"], broken["content"]) == (502, "invalid JSON from upstream", None)
+    assert ok["content"] == {"ok": True}
+
+def test_batch_rejects_too_many_sub_requests(monkeypatch, client):
+    monkeypatch.setattr(settings, "batch_max_requests", 2)
+    res = client.post("/api/batch", json={"requests": [
+        {"service": "assets", "path": "1"} for _ in range(3)
+    ]})
+    assert res.status_code == 400
@@ -0,0 +1,97 @@
+import json
+
+import httpx
+import pytest
+
+from core.config import settings
+from utils.compression import negotiate
+
+zstandard = pytest.importorskip("zstandard")
+
+
+async def _aiter(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _upstream(content_type: str, *chunks: bytes) -> httpx.Response:
+    return httpx.Response(200, headers={"content-type": content_type}, content=_aiter(*chunks))
+
+
+def test_negotiate_honours_q_values_and_server_preference():
+    assert negotiate("gzip, br, zstd") == "zstd"
+    assert negotiate("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate("br;q=0, gzip;q=0.1") == "gzip"
+    assert negotiate("*;q=0.2") == "zstd"
+    assert negotiate("identity") is None
+    assert negotiate("") is None
+
+
+def test_negotiate_skips_unconfigured_encodings(monkeypatch):
+    monkeypatch.setattr(settings, "compression_encodings", ["gzip"])
+    assert negotiate("zstd, br, gzip;q=0.5") == "gzip"
+
+
+def test_large_json_is_gzipped(monkeypatch, client):
+    payload = [{"id": i, "name": "wheat", "grade": "No. 1"} for i in range(200)]
+
+    async def fake_send(self, req, **kwargs):
+        return _upstream("application/json", json.dumps(payload).encode())
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/list", headers={"Accept-Encoding": "gzip", "X-Gateway-Envelope": "off"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in res.headers["vary"].lower()
+    assert res.json() == payload
+
+
+def test_streamed_body_is_compressed_chunk_by_chunk(monkeypatch, client):
+    monkeypatch.setattr(settings, "singleflight_enabled", False)
+    chunks = [b"x" * 2048, b"y" * 2048, b"z" * 2048]
+
+    async def fake_send(self, req, **kwargs):
+        return _upstream("text/plain", *chunks)
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    with client.stream("GET", "/api/assets/export", headers={"Accept-Encoding": "zstd"}) as res:
+        assert res.headers["content-encoding"] == "zstd"
+        raw = b"".join(res.iter_raw())
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(raw) == b"".join(chunks)
+
+
+def test_small_and_precompressed_bodies_are_not_compressed(monkeypatch, client):
+    bodies = {"small": ("text/plain", b"OK"), "image": ("image/png", b"\x89PNG" + b"\0" * 4096)}
+
+    async def fake_send(self, req, **kwargs):
+        return _upstream(*bodies[req.url.path.rsplit("/", 1)[-1]])
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    for name in bodies:
+        res = client.get(f"/api/assets/{name}", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in res.headers
+        assert res.content == bodies[name][1]
+
+
+def test_cached_etag_is_weakened_when_compressed(monkeypatch, client):
+    body = json.dumps({"config": "x" * 4096}).encode()
+
+    async def fake_send(self, req, **kwargs):
+        # only responses of known length are buffered into the cache
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json", "content-length": str(len(body))},
+            content=_aiter(body),
+        )
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/llm_orchestration/config", headers={"Accept-Encoding": "gzip"})
+    etag = res.headers["etag"]
+    assert etag.startswith("W/")
+    revalidated = client.get(
+        "/api/llm_orchestration/config", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
@@ -1,24 +1,35 @@
+import asyncio
+
 import pytest
 from fastapi import status
 import httpx
 import json
 
-def test_health_ok(monkeypatch, client):
-    # Mock downstream health check
-    class DummyResp:
-        status_code = 200
-        content = b"OK"
-        headers = {"content-type": "text/plain"}
 
-        @property
-        def text(self) -> str:
-            return self.content.decode()
+async def _aiter(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def upstream_response(status_code: int, content: bytes, content_type: str) -> httpx.Response:
+    # an unread, streamed response as returned by client.send(..., stream=True)
+    return httpx.Response(
+        status_code, headers={"content-type": content_type}, content=_aiter(content)
+    )
+
+
+def text_response(content: bytes) -> httpx.Response:
+    return upstream_response(200, content, "text/plain")
+
 
-        def json(self):
-            return json.loads(self.text)
+def json_response(status_code: int, payload) -> httpx.Response:
+    return upstream_response(status_code, json.dumps(payload).encode(), "application/json")
 
-    async def fake_send(req, **kwargs):
-        return DummyResp()
+
+def test_health_ok(monkeypatch, client):
+    # Mock downstream health check
+    async def fake_send(self, req, **kwargs):
+        return text_response(b"OK")
 
     monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
 
@@ -28,20 +39,8 @@ def test_health_ok(monkeypatch, client):
 
 def test_cors_headers_present(monkeypatch, client):
     # reuse health mock
-    class DummyResp:
-        status_code = 200
-        content = b"OK"
-        headers = {"content-type": "text/plain"}
-
-        @property
-        def text(self) -> str:
-            return self.content.decode()
-
-        def json(self):
-            return json.loads(self.text)
-
-    async def fake_send(req, **kwargs):
-        return DummyResp()
+    async def fake_send(self, req, **kwargs):
+        return text_response(b"OK")
 
     monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
 
@@ -52,3 +51,294 @@ def test_cors_headers_present(monkeypatch, client):
 def test_unknown_service_returns_404(client):
     res = client.get("/api/unknown/service")
     assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_proxy_reuses_pooled_client(monkeypatch, client):
+    seen_clients = []
+
+    async def fake_send(self, req, **kwargs):
+        seen_clients.append(self)
+        return text_response(b"OK")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    client.get("/api/assets/health")
+    client.get("/api/assets/health")
+    assert len(seen_clients) == 2
+    assert seen_clients[0] is seen_clients[1]
+    assert not seen_clients[0].is_closed
+
+
+def test_hop_by_hop_headers_not_forwarded(monkeypatch, client):
+    forwarded = {}
+
+    async def fake_send(self, req, **kwargs):
+        forwarded.update(req.headers)
+        return text_response(b"OK")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    client.get("/api/assets/health", headers={"TE": "trailers", "X-Trace": "abc"})
+    assert forwarded["x-trace"] == "abc"
+    assert forwarded["host"] == "assets:8000"
+    assert "te" not in forwarded
+
+
+def test_pool_stats_endpoint(client):
+    client.get("/api/unknown/service")
+    res = client.get("/gateway/pools")
+    assert res.status_code == 200
+    stats = res.json()
+    assert stats["llm_orchestration"]["max_connections"] > 0
+    assert stats["assets"]["open_connections"] >= 0
+
+
+def test_upstream_settings_overrides():
+    from core.config import settings
+
+    llm = settings.get_upstream_settings("llm_orchestration")
+    assert llm.read_timeout == 120.0
+    assert llm.max_connections == settings.upstream_defaults.max_connections
+    assert settings.get_upstream_settings("search") == settings.upstream_defaults
+
+
+def test_request_body_streamed_upstream(monkeypatch, client):
+    received = {}
+
+    async def fake_send(self, req, **kwargs):
+        # the gateway must hand over a stream, not a pre-read body
+        assert not hasattr(req, "_content")
+        received["body"] = b"".join([chunk async for chunk in req.stream])
+        received["content-length"] = req.headers.get("content-length")
+        received["stream"] = kwargs.get("stream")
+        return text_response(b"stored")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    payload = b"x" * (256 * 1024)
+    res = client.post("/api/assets/assets", content=payload)
+    assert res.status_code == 200
+    assert received["body"] == payload
+    assert received["content-length"] == str(len(payload))
+    assert received["stream"] is True
+
+
+def test_response_body_streamed_to_client(monkeypatch, client):
+    chunks = [b"a" * 1024, b"b" * 1024, b"c" * 10]
+
+    async def fake_send(self, req, **kwargs):
+        return httpx.Response(200, headers={"content-type": "video/mp4"}, content=_aiter(*chunks))
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/download/video.mp4")
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "video/mp4"
+    assert res.content == b"".join(chunks)
+
+
+
+@pytest.mark.asyncio
+async def test_upstream_released_when_client_leaves_before_body(monkeypatch):
+    from services.gateway.src.main import app
+    from utils.balancer import load_balancer
+    from utils.resilience import resilience
+
+    async def fake_send(self, req, **kwargs):
+        return text_response(b"never read")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # the client is gone by the time the response head is written
+        await asyncio.sleep(1)
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/search/query", "raw_path": b"/api/search/query", "root_path": "",
+        "query_string": b"", "headers": [(b"host", b"testserver")],
+        "client": ("testclient", 50000), "server": ("testserver", 80),
+    }
+    await app(scope, receive, send)
+    assert resilience.get("search").limiter.in_flight == 0
+    assert all(endpoint.outstanding == 0 for endpoint in load_balancer.get("search").endpoints)
+
+def test_json_response_enveloped_by_default(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        return json_response(201, {"id": "a1"})
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/assets?asset_id=a1")
+    assert res.status_code == 201
+    assert res.json() == {"status_code": 201, "content": {"id": "a1"}}
+    assert res.headers["x-upstream-content-type"] == "application/json"
+
+
+def test_json_envelope_opt_out_streams_raw(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        return json_response(200, [{"id": "a1"}])
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/assets?user_id=u1", headers={"X-Gateway-Envelope": "off"})
+    assert res.status_code == 200
+    assert res.json() == [{"id": "a1"}]
+
+
+def test_json_envelope_passthrough_keeps_raw_bytes(monkeypatch, client):
+    raw = b'{"id": "a1", "price": 1.10, "name": "caf\xc3\xa9"}'
+
+    async def fake_send(self, req, **kwargs):
+        resp = upstream_response(200, raw, "application/json")
+        resp.headers["content-length"] = str(len(raw))
+        return resp
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/assets?asset_id=a1")
+    # upstream bytes are embedded verbatim (number formatting and spacing untouched)
+    assert res.content == b'{"status_code":200,"content":' + raw + b"}"
+    assert res.headers["content-length"] == str(len(res.content))
+    assert res.json()["content"]["name"] == "café"
+
+
+def test_json_envelope_empty_body_is_null(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        return upstream_response(202, b"", "application/json")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.delete("/api/assets/assets/a1")
+    assert res.status_code == 202
+    assert res.json() == {"status_code": 202, "content": None}
+
+
+def test_json_envelope_reparses_non_utf8_charset(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        body = '{"name": "café"}'.encode("latin-1")
+        return upstream_response(200, body, "application/json; charset=iso-8859-1")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.get("/api/assets/assets?asset_id=a1")
+    assert res.json() == {"status_code": 200, "content": {"name": "café"}}
+
+
+def test_json_envelope_reparse_mode_rejects_invalid_json(monkeypatch, client):
+    from core.config import settings
+
+    async def fake_send(self, req, **kwargs):
+        return upstream_response(200, b"{not json", "application/json")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+    monkeypatch.setattr(settings, "envelope_mode", "reparse")
+
+    res = client.get("/api/assets/assets?asset_id=a1")
+    assert res.status_code == 502
+
+
+def _counting_upstream(monkeypatch, payload):
+    calls = []
+
+    async def fake_send(self, req, **kwargs):
+        calls.append(req)
+        body = json.dumps(payload).encode()
+        resp = upstream_response(200, body, "application/json")
+        resp.headers["content-length"] = str(len(body))
+        return resp
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+    return calls
+
+
+def test_cacheable_get_served_from_cache(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, [{"id": "a1"}])
+
+    first = client.get("/api/assets/assets?asset_id=a1")
+    second = client.get("/api/assets/assets?asset_id=a1")
+    assert len(calls) == 1
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == {"status_code": 200, "content": [{"id": "a1"}]}
+    assert first.headers["etag"] == second.headers["etag"]
+
+    # a different query is a different entry
+    client.get("/api/assets/assets?asset_id=a2")
+    assert len(calls) == 2
+
+
+
+def test_cookie_authenticated_responses_are_not_shared(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, [{"id": "a1"}])
+
+    client.get("/api/assets/assets?asset_id=a1", headers={"Cookie": "session=alice"})
+    res = client.get("/api/assets/assets?asset_id=a1", headers={"Cookie": "session=bob"})
+    assert len(calls) == 2
+    assert res.headers["x-cache"] == "MISS"
+
+def test_if_none_match_returns_304(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, {"providers": {}, "services": {}})
+
+    etag = client.get("/api/llm_orchestration/config").headers["etag"]
+    res = client.get("/api/llm_orchestration/config", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert len(calls) == 1
+
+
+def test_conditional_headers_not_forwarded_on_miss(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, [])
+
+    res = client.get("/api/assets/assets?user_id=u1", headers={"If-None-Match": '"stale"'})
+    assert res.status_code == 200
+    assert "if-none-match" not in calls[0].headers
+
+
+def test_write_invalidates_cached_resource(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, [{"id": "a1"}])
+
+    client.get("/api/assets/assets?user_id=u1")
+    client.post("/api/assets/assets", content=b"data")
+    client.get("/api/assets/assets?user_id=u1")
+    assert [req.method for req in calls] == ["GET", "POST", "GET"]
+
+
+def test_invalidation_hook(monkeypatch, client):
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "cache_admin_token", "s3cret")
+    calls = _counting_upstream(monkeypatch, {"providers": {}, "services": {}})
+
+    client.get("/api/llm_orchestration/config")
+    res = client.post(
+        "/gateway/cache/invalidate", json={"service": "llm_orchestration"}, headers={"X-Admin-Token": "s3cret"}
+    )
+    assert res.json() == {"invalidated": 1}
+    client.get("/api/llm_orchestration/config")
+    assert len(calls) == 2
+
+
+def test_invalidation_hook_requires_admin_token(monkeypatch, client):
+    from core.config import settings
+
+    payload = {"service": "llm_orchestration"}
+    # disabled until a token is configured
+    assert client.post("/gateway/cache/invalidate", json=payload).status_code == 403
+
+    monkeypatch.setattr(settings, "cache_admin_token", "s3cret")
+    assert client.post("/gateway/cache/invalidate", json=payload).status_code == 401
+    res = client.post("/gateway/cache/invalidate", json=payload, headers={"X-Admin-Token": "wrong"})
+    assert res.status_code == 401
+
+
+def test_uncached_route_not_stored(monkeypatch, client):
+    calls = _counting_upstream(monkeypatch, {"ok": True})
+
+    client.get("/api/search/query")
+    res = client.get("/api/search/query")
+    assert len(calls) == 2
+    assert "x-cache" not in res.headers
@@ -0,0 +1,53 @@
+import httpx
+
+from utils.metrics import Histogram, metrics, service_label
+
+
+async def _aiter(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram("test_seconds", "Test.", ("service",), [0.1, 1.0])
+    for value in (0.05, 0.2, 0.3, 2.0):
+        histogram.observe(("assets",), value)
+    lines = list(histogram.render())
+    assert 'test_seconds_bucket{service="assets",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{service="assets",le="1"} 3' in lines
+    assert 'test_seconds_bucket{service="assets",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{service="assets"} 4' in lines
+    summary = histogram.percentiles()["assets"]
+    assert summary["count"] == 4
+    assert summary["p50_ms"] == 300.0
+    assert summary["p99_ms"] == 2000.0
+
+
+def test_service_label_has_bounded_cardinality():
+    assert service_label("/api/assets/a1") == "assets"
+    assert service_label("/api/batch") == "batch"
+    assert service_label("/api/unknown/x") == "gateway"
+    assert service_label("/metrics") == "gateway"
+
+
+def test_proxy_requests_are_recorded(monkeypatch, client):
+    async def fake_send(self, req, **kwargs):
+        return httpx.Response(404, headers={"content-type": "text/plain"}, content=_aiter(b"missing"))
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+    before = metrics.requests.value(("profile_management", "POST", "404"))
+    sent_before = metrics.request_bytes.value(("profile_management",))
+
+    client.post("/api/profile_management/profiles", content=b"x" * 100)
+    assert metrics.requests.value(("profile_management", "POST", "404")) == before + 1
+    assert metrics.request_bytes.value(("profile_management",)) == sent_before + 100
+    assert metrics.in_flight.value(("profile_management",)) == 0
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'gateway_requests_total{service="profile_management",method="POST",status="404"}' in res.text
+    assert 'gateway_upstream_ttfb_seconds_count{service="profile_management"}' in res.text
+
+    latency = client.get("/gateway/latency").json()
+    assert set(latency["upstream_ttfb"]["profile_management"]) == {"count", "p50_ms", "p95_ms", "p99_ms"}
@@ -0,0 +1,153 @@
+import asyncio
+
+import httpx
+import pytest
+
+from core.config import UpstreamPoolSettings, settings
+from core.exceptions import UpstreamUnavailableException
+from routes.gateway import send_upstream
+from utils.resilience import BreakerState, CircuitBreaker, ConcurrencyLimiter, ServiceGuard, resilience
+
+
+def _pool(**overrides) -> UpstreamPoolSettings:
+    return UpstreamPoolSettings(**{"initial_concurrency": 10, **overrides})
+
+
+def test_breaker_opens_on_failure_ratio(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 4)
+    breaker = CircuitBreaker()
+    for success in (True, False, True, False):
+        breaker.record(success)
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() > 0
+
+
+def test_breaker_half_open_probes_close_it(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "breaker_open_seconds", 0)
+    monkeypatch.setattr(settings, "breaker_half_open_calls", 2)
+    breaker = CircuitBreaker()
+    breaker.record(False)
+    assert breaker.state == BreakerState.OPEN
+
+    assert breaker.allow() and breaker.allow()
+    assert breaker.state == BreakerState.HALF_OPEN
+    # only the configured number of probes is let through
+    assert not breaker.allow()
+    breaker.record(True)
+    breaker.record(True)
+    assert breaker.state == BreakerState.CLOSED
+
+
+def test_breaker_reopens_on_failed_probe(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "breaker_open_seconds", 0)
+    breaker = CircuitBreaker()
+    breaker.record(False)
+    assert breaker.allow()
+    breaker.record(False)
+    assert breaker.state == BreakerState.OPEN
+    assert breaker.times_opened == 2
+
+
+def test_aimd_backs_off_and_grows(monkeypatch):
+    monkeypatch.setattr(settings, "concurrency_limit_algorithm", "aimd")
+    limiter = ConcurrencyLimiter(_pool(latency_threshold=1.0))
+    limiter.on_sample(0.1, dropped=True)
+    assert limiter.limit == pytest.approx(9.0)
+    limiter.on_sample(5.0, dropped=False)
+    assert limiter.limit == pytest.approx(8.1)
+
+    limiter.in_flight = 5
+    limiter.on_sample(0.1, dropped=False)
+    assert limiter.limit == pytest.approx(9.1)
+
+
+def test_gradient_shrinks_limit_when_latency_rises(monkeypatch):
+    monkeypatch.setattr(settings, "concurrency_limit_algorithm", "gradient")
+    limiter = ConcurrencyLimiter(_pool(initial_concurrency=50))
+    limiter.in_flight = 50
+    for _ in range(20):
+        limiter.on_sample(0.01, dropped=False)
+    steady = limiter.limit
+    for _ in range(20):
+        limiter.on_sample(0.2, dropped=False)
+    assert limiter.limit < steady
+
+
+def test_limiter_sheds_over_limit():
+    limiter = ConcurrencyLimiter(_pool(initial_concurrency=2))
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.shed == 1
+    limiter.release()
+    assert limiter.try_acquire()
+
+
+def test_guard_rejection_returns_half_open_probe(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "breaker_open_seconds", 0)
+    monkeypatch.setattr(settings, "breaker_half_open_calls", 1)
+    guard = ServiceGuard("assets")
+    guard.breaker.record(False)
+    guard.limiter.limit = 0
+    with pytest.raises(UpstreamUnavailableException):
+        guard.admit()
+    guard.limiter.limit = 1
+    guard.admit()
+
+
+def test_proxy_opens_circuit_after_upstream_failures(monkeypatch, client):
+    monkeypatch.setattr(settings, "breaker_min_calls", 3)
+    calls = []
+
+    async def body():
+        yield b"down"
+
+    async def fake_send(self, req, **kwargs):
+        calls.append(req.url.path)
+        return httpx.Response(503, headers={"content-type": "text/plain"}, content=body())
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    for _ in range(3):
+        assert client.post("/api/search/query").status_code == 503
+    res = client.post("/api/search/query")
+    assert res.status_code == 503
+    assert int(res.headers["retry-after"]) >= 1
+    assert len(calls) == 3
+    assert resilience.get("search").limiter.in_flight == 0
+    assert client.get("/gateway/breakers").json()["search"]["breaker"]["state"] == "open"
+
+
+def test_proxy_sheds_when_concurrency_limit_reached(monkeypatch, client):
+    resilience.get("search").limiter.in_flight = resilience.get("search").limiter.limit
+
+    async def fake_send(self, req, **kwargs):
+        raise AssertionError("request should have been shed")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+
+    res = client.post("/api/search/query")
+    assert res.status_code == 503
+    assert res.headers["retry-after"] == "1"
+
+
+def test_cancelled_half_open_probe_is_returned(monkeypatch):
+    monkeypatch.setattr(settings, "breaker_min_calls", 1)
+    monkeypatch.setattr(settings, "breaker_open_seconds", 0)
+    monkeypatch.setattr(settings, "breaker_half_open_calls", 1)
+    guard = resilience.get("search")
+    guard.breaker.record(False)
+
+    async def fake_send(self, req, **kwargs):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", fake_send)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(send_upstream("search", "POST", "query", []))
+    assert guard.breaker.state == BreakerState.HALF_OPEN
+    assert guard.limiter.in_flight == 0
+    # the probe slot is free again for the next call
+    guard.admit()
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from utils.cache import CachedResponse, ResponseCache, etag_matches
+
+
+def _entry(body: bytes, ttl: float = 60) -> CachedResponse:
+    return CachedResponse(
+        status_code=200,
+        content_type="application/json",
+        body=body,
+        etag='"e"',
+        expires_at=time.time() + ttl,
+    )
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used_by_size():
+    cache = ResponseCache(max_bytes=10, max_entry_bytes=10)
+    await cache.set("assets/a", _entry(b"aaaa"))
+    await cache.set("assets/b", _entry(b"bbbb"))
+    await cache.get("assets/a")
+    await cache.set("assets/c", _entry(b"cccc"))
+
+    assert await cache.get("assets/b") is None
+    assert await cache.get("assets/a") is not None
+    assert cache.stats()["bytes"] == 8
+
+
+@pytest.mark.asyncio
+async def test_expired_and_oversized_entries_are_not_served():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=4)
+    await cache.set("assets/old", _entry(b"{}", ttl=-1))
+    await cache.set("assets/big", _entry(b"too big"))
+
+    assert await cache.get("assets/old") is None
+    assert await cache.get("assets/big") is None
+
+
+@pytest.mark.asyncio
+async def test_invalidate_by_service_and_prefix():
+    cache = ResponseCache(max_bytes=100, max_entry_bytes=100)
+    await cache.set("assets/assets?user_id=u1#0", _entry(b"1"))
+    await cache.set("assets/download/x#0", _entry(b"2"))
+    await cache.set("search/assets#0", _entry(b"3"))
+
+    assert await cache.invalidate("assets", "assets") == 1
+    assert await cache.get("assets/download/x#0") is not None
+    assert await cache.get("search/assets#0") is not None
+
+
+def test_serialization_round_trip():
+    entry = _entry(b'{"a": 1}\n{"b": 2}')
+    assert CachedResponse.from_bytes(entry.to_bytes()) == entry
+
+
+def test_etag_matching():
+    assert etag_matches('"x", W/"e"', '"e"')
+    assert etag_matches("*", '"e"')
+    assert not etag_matches('"x"', '"e"')
+    assert not etag_matches(None, '"e"')
+
+
+@pytest.mark.asyncio
+async def test_startup_warns_when_invalidation_hook_is_disabled(monkeypatch, caplog):
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "cache_admin_token", None)
+    monkeypatch.setattr(settings, "cache_redis_url", None)
+    await ResponseCache(max_bytes=1024, max_entry_bytes=1024).startup()
+    assert "POST /gateway/cache/invalidate is disabled" in caplog.text
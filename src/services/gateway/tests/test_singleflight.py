@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services.gateway.src.main import app
+from utils.singleflight import singleflight
+from utils.upstream import upstream_clients
+
+
+def _slow_upstream(monkeypatch, payload, delay=0.05):
+    calls = []
+
+    async def upstream_body(body: bytes):
+        yield body
+
+    async def fake_send(req, **kwargs):
+        calls.append(req)
+        await asyncio.sleep(delay)
+        body = json.dumps(payload).encode()
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json", "content-length": str(len(body))},
+            content=upstream_body(body),
+        )
+
+    # patch the gateway's upstream client only, not the test client
+    monkeypatch.setattr(upstream_clients.get("profile_management"), "send", fake_send)
+    return calls
+
+
+async def _fan_out(*requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+        return await asyncio.gather(*(client.get(url, headers=headers) for url, headers in requests))
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_gets_are_coalesced(monkeypatch):
+    calls = _slow_upstream(monkeypatch, {"profile": "p1"})
+    before = singleflight.stats()
+
+    responses = await _fan_out(*[("/api/profile_management/profiles/p1", {})] * 5)
+
+    assert len(calls) == 1
+    assert all(res.json() == {"status_code": 200, "content": {"profile": "p1"}} for res in responses)
+    after = singleflight.stats()
+    assert after["coalesced_requests"] - before["coalesced_requests"] == 4
+    assert after["bytes_saved"] > before["bytes_saved"]
+    assert after["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_distinct_requests_are_not_coalesced(monkeypatch):
+    calls = _slow_upstream(monkeypatch, {"profile": "p1"})
+
+    await _fan_out(
+        ("/api/profile_management/profiles/p1", {}),
+        ("/api/profile_management/profiles/p2", {}),
+        ("/api/profile_management/profiles/p1", {"Authorization": "Bearer other-user"}),
+    )
+
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_leader_failure_propagates_to_waiters():
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        singleflight.do("k", failing), singleflight.do("k", failing), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
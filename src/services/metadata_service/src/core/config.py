@@ -18,6 +18,37 @@ class Settings(BaseSettings):
         S3_BUCKET: str = os.getenv("ASSETS_BUCKET", os.getenv("S3_BUCKET", "assets"))
         S3_ACCESS_KEY: str = os.getenv("MINIO_ACCESS_KEY", "minioadmin")
         S3_SECRET_KEY: str = os.getenv("MINIO_SECRET_KEY", "minioadmin")
+        # Document parsing process pool: worker processes, CPU seconds and
+        # wall-clock seconds per document, address space per worker in MiB,
+        # and documents a worker parses before it is replaced
+        EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+        EXTRACTION_CPU_SECONDS: int = int(os.getenv("EXTRACTION_CPU_SECONDS", 120))
+        EXTRACTION_TIMEOUT: float = float(os.getenv("EXTRACTION_TIMEOUT", 180))
+        EXTRACTION_MEMORY_MB: int = int(os.getenv("EXTRACTION_MEMORY_MB", 1024))
+        EXTRACTION_MAX_TASKS_PER_CHILD: int = int(os.getenv("EXTRACTION_MAX_TASKS_PER_CHILD", 100))
+        # Downloads for parsing: objects larger than EXTRACTION_SPOOL_BYTES are
+        # streamed to a temporary file instead of memory; objects larger than
+        # EXTRACTION_MAX_FILE_BYTES are not parsed
+        EXTRACTION_SPOOL_BYTES: int = int(os.getenv("EXTRACTION_SPOOL_BYTES", 8 * 1024 * 1024))
+        EXTRACTION_MAX_FILE_BYTES: int = int(os.getenv("EXTRACTION_MAX_FILE_BYTES", 200 * 1024 * 1024))
+        # Text kept per document (0 for all of it; roughly 4 characters per
+        # LLM token), and pages per range when a PDF is split across workers
+        # (0 to parse PDFs in a single worker)
+        EXTRACTION_MAX_CHARS: int = int(os.getenv("EXTRACTION_MAX_CHARS", 20000))
+        EXTRACTION_PDF_RANGE_PAGES: int = int(os.getenv("EXTRACTION_PDF_RANGE_PAGES", 20))
+        # Extraction results cached by file content: total size of the cache
+        # (oldest entries are dropped beyond it) and largest text cached
+        EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        EXTRACTION_CACHE_MAX_BYTES: int = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+        EXTRACTION_CACHE_MAX_ENTRY_BYTES: int = int(os.getenv("EXTRACTION_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024))
+        # Asset consumer: messages prefetched from RabbitMQ, assets processed
+        # at once (enough to keep every extraction worker busy while others
+        # download), seconds one asset may take, and seconds running jobs get
+        # to finish on shutdown
+        CONSUMER_CONCURRENCY: int = int(os.getenv("CONSUMER_CONCURRENCY", 2 * EXTRACTION_WORKERS))
+        CONSUMER_PREFETCH: int = int(os.getenv("CONSUMER_PREFETCH", 2 * CONSUMER_CONCURRENCY))
+        CONSUMER_JOB_TIMEOUT: float = float(os.getenv("CONSUMER_JOB_TIMEOUT", 300))
+        CONSUMER_DRAIN_TIMEOUT: float = float(os.getenv("CONSUMER_DRAIN_TIMEOUT", 30))
 
 
 settings = Settings()
\ No newline at end of file
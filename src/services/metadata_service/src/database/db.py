@@ -6,5 +6,7 @@ class Database:
         self.client = AsyncIOMotorClient(Settings.Config.MONGO_URI)
         self.db = self.client[Settings.Config.DB_NAME]
         self.assets = self.db["assets"]
+        # Extracted text by file content, see ExtractionCache
+        self.extraction_cache = self.db["extraction_cache"]
 
 db = Database()
@@ -7,6 +7,8 @@ class AssetModel:
         self.url = asset.get("url")
         # include file_type if present
         self.file_type = asset.get("file_type", None)
+        # SHA-256 of the file, for uploads streamed through asset_service
+        self.content_hash = asset.get("content_hash")
 
     def to_dict(self) -> dict:
         return {
@@ -16,6 +18,7 @@ class AssetModel:
             "content_type": self.content_type,
             "url": self.url,
             "file_type": self.file_type,
+            "content_hash": self.content_hash,
             "metadata": {
                 "description": None  # Default value, can be updated later
             }
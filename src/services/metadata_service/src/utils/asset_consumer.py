@@ -3,12 +3,17 @@ start = time.time()
 import asyncio
 import json
 import logging
-from concurrent.futures import ThreadPoolExecutor  # retained if needed
+import signal
+from typing import Optional
 import aio_pika
+from aio_pika.abc import AbstractExchange
 from src.core.config import Settings
 from src.utils.asset_extration import AssetExtraction
+from src.utils.consumer import QueueConsumer
+from src.utils.extraction_cache import extraction_cache
+from src.utils.extraction_pool import extraction_pool
 from src.database.crud.metadata_service_crud import AssetCRUD
-from shared.events import QueueEventNames
+from shared.events import QueueEventNames, declare_asset_upload_queue
 
 
 import sys
@@ -19,47 +24,85 @@ handler.setLevel(logging.INFO)
 logging.basicConfig(level=logging.INFO, handlers=[handler])
 logger = logging.getLogger(__name__)
 
-# (No thread pool needed; all operations use async I/O)
-# executor = ThreadPoolExecutor()
+# Fanout exchange telling asset_service replicas to drop cached copies of an
+# asset whose description was just stored
+updates_exchange: Optional[AbstractExchange] = None
 
-async def process_asset(message: aio_pika.IncomingMessage):
-    async with message.process():
-        try:
-            logger.info("Processing asset...")
-            data = json.loads(message.body.decode())
-            # Extract job details and resume_path
-            asset_id = data.get("asset_id")
-            
 
-            # Extract description asynchronously
-            description = await AssetExtraction.read_asset_by_id(asset_id)
-            # make the description in one line
-            description = description.replace("\n", " ").strip()
-            await AssetCRUD.add_description(asset_id, description)
-            logger.info(f"Asset {asset_id} processed successfully with description: {description}")
+async def announce_update(asset_id: str):
+    """Best effort: cached copies also expire on their own."""
+    if updates_exchange is None:
+        return
+    try:
+        await updates_exchange.publish(
+            aio_pika.Message(body=json.dumps({"asset_id": asset_id}).encode(), content_type="application/json"),
+            routing_key="",
+        )
+    except Exception as e:
+        logger.error(f"Failed to announce update of asset {asset_id}: {e}")
+
+async def process_asset(message: aio_pika.IncomingMessage):
+    """
+    Describe one uploaded asset. Acking, timeouts and failures are handled
+    by the QueueConsumer running it.
+    """
+    logger.info("Processing asset...")
+    data = json.loads(message.body.decode())
+    asset_id = data.get("asset_id")
 
+    # Extract description asynchronously
+    description = await AssetExtraction.read_asset_by_id(asset_id, data.get("content_hash"))
+    if description is None:
+        logger.warning(f"Asset {asset_id} not found, skipping")
+        return
+    # make the description in one line
+    description = description.replace("\n", " ").strip()
+    if await AssetCRUD.add_description(asset_id, description):
+        await announce_update(asset_id)
+    logger.info(f"Asset {asset_id} processed successfully with description: {description}")
 
-        except json.JSONDecodeError:
-            logger.error("Failed to decode JSON from message body.")
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
 
 async def consume_messages():
-    """Consumes messages from RabbitMQ and processes them."""
+    """
+    Consumes asset-upload messages from RabbitMQ, CONSUMER_CONCURRENCY at a
+    time, until SIGINT/SIGTERM; running jobs are then drained.
+    """
+    global updates_exchange
     try:
         logger.info("Starting consumer...")
+        await extraction_pool.startup()
+        await extraction_cache.setup()
         connection = await aio_pika.connect_robust(Settings.Config.RABBITMQ_URL)
         async with connection:
             channel = await connection.channel()
-            queue = await channel.declare_queue(QueueEventNames.asset_upload, durable=True)
+            updates_exchange = await channel.declare_exchange(
+                QueueEventNames.asset_updated, aio_pika.ExchangeType.FANOUT, durable=True
+            )
+            consumer = QueueConsumer(
+                QueueEventNames.asset_upload,
+                process_asset,
+                prefetch=Settings.Config.CONSUMER_PREFETCH,
+                concurrency=Settings.Config.CONSUMER_CONCURRENCY,
+                job_timeout=Settings.Config.CONSUMER_JOB_TIMEOUT,
+                drain_timeout=Settings.Config.CONSUMER_DRAIN_TIMEOUT,
+                # failed and timed-out events go to asset_upload.failed
+                declare=declare_asset_upload_queue,
+            )
+            await consumer.start(connection)
 
             logger.info(" [*] Waiting for messages. To exit press CTRL+C")
-            await queue.consume(process_asset)
+            stopping = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stopping.set)
+            await stopping.wait()
 
-            # Keep running indefinitely
-            await asyncio.Future()
+            logger.info("Shutting down consumer...")
+            await consumer.stop()
     except Exception as e:
         logger.exception(f"Error in message consumption: {e}")
+    finally:
+        await extraction_pool.shutdown()
 
 if __name__ == "__main__":
     try:
@@ -1,31 +1,61 @@
 import httpx
 import asyncio
-from io import BytesIO
-from PyPDF2 import PdfReader
-from docx import Document
-import textract
-from typing import Optional
+import os
+import tempfile
+from typing import Optional, Union
 from bson import ObjectId
 from src.database.db import db
 from src.database.models.metadata_service import AssetModel
 from src.database.crud.metadata_service_crud import AssetCRUD
 from src.utils.mock_llm_extraction import ExtractUsingLLM
+from src.utils.extraction_cache import extraction_cache
+from src.utils.extraction_pool import extraction_pool
+from src.utils.parsers import PARSED_TYPES, join_within, parse_document, pdf_page_count, pdf_pages_text
 import boto3
+from botocore.config import Config as BotoConfig
 from src.core.config import Settings 
 from urllib.parse import urlparse
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One thread per concurrently processed asset for blocking S3 calls
+_executor = ThreadPoolExecutor(
+    max_workers=Settings.Config.CONSUMER_CONCURRENCY, thread_name_prefix="extraction"
+)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+_s3 = None
+
+
+def s3_client():
+    """
+    S3 client shared by every download. boto3 clients are thread-safe; its
+    connection pool matches the number of concurrent downloads.
+    """
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client(
+            "s3",
+            endpoint_url=Settings.Config.S3_ENDPOINT,
+            aws_access_key_id=Settings.Config.S3_ACCESS_KEY,
+            aws_secret_access_key=Settings.Config.S3_SECRET_KEY,
+            config=BotoConfig(max_pool_connections=Settings.Config.CONSUMER_CONCURRENCY),
+        )
+    return _s3
+
+def _max_chars() -> Optional[int]:
+    return Settings.Config.EXTRACTION_MAX_CHARS or None
 
 class AssetExtraction:
     """
     Service for reading asset contents from an S3-compatible URL.
     """
 
-    SUPPORTED_TYPES = {
-        "plain",
-        "pdf",
-        "msword",
-        "vnd.openxmlformats-officedocument.wordprocessingml.document",
-    }
+    SUPPORTED_TYPES = PARSED_TYPES
 
     @staticmethod
     async def read_from_s3(url: str, content_type: str) -> str:
@@ -43,42 +73,88 @@ class AssetExtraction:
         if len(parts) != 2:
             raise ValueError(f"Invalid S3 URL: {url}")
         bucket, key = parts
-        # Download object via S3 API
-        s3 = boto3.client(
-            "s3",
-            endpoint_url=Settings.Config.S3_ENDPOINT,
-            aws_access_key_id=Settings.Config.S3_ACCESS_KEY,
-            aws_secret_access_key=Settings.Config.S3_SECRET_KEY,
-        )
-        response = s3.get_object(Bucket=bucket, Key=key)
-        # Read body asynchronously
-        loop = asyncio.get_running_loop()
-        data = await loop.run_in_executor(None, response["Body"].read)
-
-        # Dispatch based on MIME type
-        content_type = content_type.split("/")[1]
-        if content_type == "plain":
-            return str(data.decode('utf-8'))
-
-        if content_type == "pdf":
-            reader = PdfReader(BytesIO(data))
-            return "\n\n".join((page.extract_text() or "") for page in reader.pages)
-        if content_type == "msword":
-            return str(textract.process(input_data=data, extension='doc').decode('utf-8'))
-
-        if content_type == "vnd.openxmlformats-officedocument.wordprocessingml.document":
-            with BytesIO(data) as bio:
-                doc = Document(bio)
-                return "\n\n".join(p.text for p in doc.paragraphs)
-        
-        else:
+        subtype = content_type.split("/")[1]
+        if subtype not in PARSED_TYPES:
             return ExtractUsingLLM(url , content_type).extract()
+
+        loop = asyncio.get_running_loop()
+        source = await loop.run_in_executor(_executor, AssetExtraction.download, bucket, key)
+        try:
+            # Parsing is CPU-bound; it runs in the process pool so documents
+            # are parsed on all cores and never stall the event loop
+            if subtype == "pdf":
+                return await AssetExtraction.extract_pdf(source)
+            return await extraction_pool.run(parse_document, source, subtype, _max_chars())
+        finally:
+            if isinstance(source, str):
+                os.unlink(source)
+
+    @staticmethod
+    async def extract_pdf(source: Union[bytes, str]) -> str:
+        """
+        Text of a PDF up to EXTRACTION_MAX_CHARS, extracted page by page.
+
+        Long PDFs are split into ranges of EXTRACTION_PDF_RANGE_PAGES pages
+        parsed by separate workers: the first range alone, then waves twice
+        as wide (up to one range per worker) until the budget is met, so a
+        short budget costs one range while a large one uses every core.
+        """
+        max_chars = _max_chars()
+        range_pages = Settings.Config.EXTRACTION_PDF_RANGE_PAGES
+        if not range_pages or Settings.Config.EXTRACTION_WORKERS < 2:
+            return await extraction_pool.run(parse_document, source, "pdf", max_chars)
+
+        pages = await extraction_pool.run(pdf_page_count, source)
+        texts: list[str] = []
+        start, wave = 0, 1
+        while start < pages:
+            firsts = range(start, min(start + wave * range_pages, pages), range_pages)
+            ranges = [(first, min(first + range_pages, pages)) for first in firsts]
+            texts += await asyncio.gather(*(
+                extraction_pool.run(pdf_pages_text, source, first, last, max_chars) for first, last in ranges
+            ))
+            text = join_within((t for t in texts if t), max_chars)
+            if max_chars and len(text) >= max_chars:
+                return text
+            start = ranges[-1][1]
+            wave = min(2 * wave, Settings.Config.EXTRACTION_WORKERS)
+        return join_within((t for t in texts if t), max_chars)
+
+    @staticmethod
+    def download(bucket: str, key: str) -> Union[bytes, str]:
+        """
+        Fetch an object for parsing (blocking). Objects up to
+        EXTRACTION_SPOOL_BYTES are returned as bytes; larger ones are
+        streamed to a temporary file whose path is returned, to be removed by
+        the caller. Objects over EXTRACTION_MAX_FILE_BYTES are refused.
+        """
+        response = s3_client().get_object(Bucket=bucket, Key=key)
+        body = response["Body"]
+        size = response["ContentLength"]
+        if size > Settings.Config.EXTRACTION_MAX_FILE_BYTES:
+            body.close()
+            raise ValueError(
+                f"{key} is {size} bytes, over the {Settings.Config.EXTRACTION_MAX_FILE_BYTES} bytes limit"
+            )
+        if size <= Settings.Config.EXTRACTION_SPOOL_BYTES:
+            return body.read()
+        with tempfile.NamedTemporaryFile(prefix="asset-", delete=False) as spool:
+            try:
+                for chunk in body.iter_chunks(DOWNLOAD_CHUNK_SIZE):
+                    spool.write(chunk)
+            except BaseException:
+                os.unlink(spool.name)
+                raise
+        return spool.name
+
     @staticmethod
-    async def read_asset_by_id(asset_id: str) -> Optional[str]:
+    async def read_asset_by_id(asset_id: str, content_hash: Optional[str] = None) -> Optional[str]:
         """
         Fetches asset metadata from the database, then reads its content from S3 if supported.
+        Content extracted before (same file bytes) is served from the extraction cache.
 
         :param asset_id: MongoDB ObjectId string
+        :param content_hash: SHA-256 of the file, if known from the upload event
         :returns: Extracted text or None if asset not found
         """
         raw = await AssetCRUD.get_by_id(asset_id)
@@ -87,4 +163,28 @@ class AssetExtraction:
 
         asset_url = raw["url"]
         file_type = raw["content_type"]
-        return await AssetExtraction.read_from_s3(asset_url,  file_type)
+        key = await AssetExtraction.cache_key(asset_url, file_type, content_hash or raw.get("content_hash"))
+        if key is not None:
+            cached = await extraction_cache.get(key)
+            if cached is not None:
+                return cached
+        text = await AssetExtraction.read_from_s3(asset_url,  file_type)
+        if key is not None:
+            await extraction_cache.put(key, text)
+        return text
+
+    @staticmethod
+    async def cache_key(url: str, content_type: str, content_hash: Optional[str]) -> Optional[str]:
+        """Extraction cache key of an asset; falls back to the object's ETag."""
+        if content_hash or not Settings.Config.EXTRACTION_CACHE_ENABLED:
+            return extraction_cache.key(content_type, content_hash=content_hash)
+        bucket, _, key = urlparse(url).path.lstrip("/").partition("/")
+        loop = asyncio.get_running_loop()
+        try:
+            head = await loop.run_in_executor(
+                _executor, partial(s3_client().head_object, Bucket=bucket, Key=key)
+            )
+        except Exception as e:
+            logger.warning(f"Could not read the ETag of {url}, extraction not cached: {e}")
+            return None
+        return extraction_cache.key(content_type, etag=head.get("ETag"))
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue, AbstractRobustConnection
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AbstractIncomingMessage], Awaitable[None]]
+QueueDeclarer = Callable[[AbstractChannel], Awaitable[AbstractQueue]]
+
+
+class QueueConsumer:
+    """
+    Consume a RabbitMQ queue with bounded concurrency.
+
+    The broker hands out at most ``prefetch`` unacknowledged messages, of
+    which ``concurrency`` are processed at once; the rest wait their turn
+    locally. A message is acked once ``handler`` returns and rejected (not
+    requeued, so a poison message cannot loop) when it raises or runs longer
+    than ``job_timeout`` seconds; ``declare`` sets up the queue, e.g. with a
+    dead-letter exchange that keeps rejected messages for replay.
+
+    ``stop`` drains gracefully: deliveries stop, messages not started yet go
+    back to the queue, and running jobs get ``drain_timeout`` seconds to
+    finish before they are cancelled and redelivered elsewhere.
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        handler: Handler,
+        prefetch: int,
+        concurrency: int,
+        job_timeout: float,
+        drain_timeout: float,
+        declare: Optional[QueueDeclarer] = None,
+    ):
+        self.queue_name = queue_name
+        self.declare = declare
+        self.handler = handler
+        self.prefetch = max(prefetch, concurrency)
+        self.concurrency = concurrency
+        self.job_timeout = job_timeout
+        self.drain_timeout = drain_timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._channel: Optional[AbstractChannel] = None
+        self._queue: Optional[AbstractQueue] = None
+        self._consumer_tag: Optional[str] = None
+        self._closing = False
+        self.processed = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    async def start(self, connection: AbstractRobustConnection) -> None:
+        self._channel = await connection.channel()
+        await self._channel.set_qos(prefetch_count=self.prefetch)
+        if self.declare is not None:
+            self._queue = await self.declare(self._channel)
+        else:
+            self._queue = await self._channel.declare_queue(self.queue_name, durable=True)
+        self._consumer_tag = await self._queue.consume(self._on_message)
+        logger.info(
+            f"Consuming {self.queue_name} (prefetch {self.prefetch}, {self.concurrency} concurrent jobs)"
+        )
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._queue is not None and self._consumer_tag is not None:
+            await self._queue.cancel(self._consumer_tag)
+            self._consumer_tag = None
+        if self._tasks:
+            logger.info(f"Draining {len(self._tasks)} in-flight messages")
+            _, pending = await asyncio.wait(set(self._tasks), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self._channel is not None:
+            # unacknowledged messages are redelivered by the broker
+            await self._channel.close()
+            self._channel = None
+
+    async def _on_message(self, message: AbstractIncomingMessage) -> None:
+        # return at once so the channel keeps delivering up to the prefetch
+        task = asyncio.create_task(self._run(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, message: AbstractIncomingMessage) -> None:
+        async with self._slots:
+            if self._closing:
+                await message.nack(requeue=True)
+                return
+            try:
+                await asyncio.wait_for(self.handler(message), self.job_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                logger.error(f"Message {message.message_id} timed out after {self.job_timeout}s")
+                await message.reject(requeue=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"Error processing message {message.message_id}: {e}")
+                await message.reject(requeue=False)
+            else:
+                self.processed += 1
+                await message.ack()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+
+from src.core.config import Settings
+from src.database.db import db
+from src.utils.parsers import EXTRACTOR_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Extracted text of assets, keyed by their content rather than their id.
+
+    Entries are addressed by the SHA-256 of the file (or its S3 ETag when the
+    upload was not hashed), its MIME type, the text budget and
+    ``EXTRACTOR_VERSION``, so redeliveries, reprocessing and the same file
+    uploaded again are served by one lookup, while a parser change simply
+    misses. Entries live in a capped Mongo collection of
+    EXTRACTION_CACHE_MAX_BYTES: it survives restarts, is shared by all
+    consumers, and drops its oldest entries once full.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def collection(self):
+        return db.extraction_cache
+
+    async def setup(self) -> None:
+        if not Settings.Config.EXTRACTION_CACHE_ENABLED:
+            return
+        try:
+            await db.db.create_collection(
+                "extraction_cache", capped=True, size=Settings.Config.EXTRACTION_CACHE_MAX_BYTES
+            )
+        except CollectionInvalid:
+            pass  # already created
+
+    @staticmethod
+    def key(content_type: str, content_hash: Optional[str] = None, etag: Optional[str] = None) -> Optional[str]:
+        if content_hash:
+            digest = f"sha256:{content_hash}"
+        elif etag:
+            digest = "etag:" + etag.strip('"')
+        else:
+            return None
+        budget = Settings.Config.EXTRACTION_MAX_CHARS
+        return f"v{EXTRACTOR_VERSION}:{budget}:{content_type}:{digest}"
+
+    async def get(self, key: str) -> Optional[str]:
+        if not Settings.Config.EXTRACTION_CACHE_ENABLED:
+            return None
+        entry = await self.collection.find_one({"_id": key}, {"text": 1})
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["text"]
+
+    async def put(self, key: str, text: str) -> None:
+        if not Settings.Config.EXTRACTION_CACHE_ENABLED:
+            return
+        if len(text.encode()) > Settings.Config.EXTRACTION_CACHE_MAX_ENTRY_BYTES:
+            return
+        try:
+            await self.collection.insert_one({"_id": key, "text": text, "created_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            pass  # cached concurrently by another consumer
+        except Exception as e:
+            # caching is an optimisation; never fail the asset over it
+            logger.error(f"Could not cache extraction {key}: {e}")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+extraction_cache = ExtractionCache()
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from src.core.config import Settings
+
+try:
+    import resource
+except ImportError:  # not available on Windows; limits are then not enforced
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class CpuLimitExceeded(Exception):
+    """A parsing job used more than EXTRACTION_CPU_SECONDS of CPU time."""
+
+
+class ExtractionTimeout(Exception):
+    """A parsing job did not finish within EXTRACTION_TIMEOUT seconds."""
+
+
+def _on_cpu_limit(signum, frame):
+    raise CpuLimitExceeded(f"CPU time limit of {Settings.Config.EXTRACTION_CPU_SECONDS}s exceeded")
+
+
+def _init_worker(memory_bytes: int) -> None:
+    # the parent handles Ctrl+C and shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is None:
+        return
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+
+def _run_limited(fn: Callable[..., Any], cpu_seconds: int, *args) -> Any:
+    """Run ``fn`` in a worker with a CPU-time budget of its own."""
+    if resource is None or not cpu_seconds:
+        return fn(*args)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    # RLIMIT_CPU counts the whole process life, so the budget starts from
+    # what earlier jobs used; only the soft limit moves, raising SIGXCPU
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    try:
+        return fn(*args)
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+class ExtractionPool:
+    """
+    Process pool running CPU-bound document parsing on every core.
+
+    Each worker process is capped at EXTRACTION_MEMORY_MB of address space
+    (an oversized document raises MemoryError instead of exhausting the
+    host) and every job at EXTRACTION_CPU_SECONDS of CPU time. Workers are
+    replaced after EXTRACTION_MAX_TASKS_PER_CHILD jobs to shed leaked
+    memory. A job still running after EXTRACTION_TIMEOUT seconds, or a
+    worker dying, gets the pool replaced by a fresh one; jobs that were
+    running on the old pool alongside are retried once.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.completed = 0
+        self.failed = 0
+        self.recycled = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=Settings.Config.EXTRACTION_WORKERS,
+                max_tasks_per_child=Settings.Config.EXTRACTION_MAX_TASKS_PER_CHILD,
+                initializer=_init_worker,
+                initargs=(Settings.Config.EXTRACTION_MEMORY_MB * 1024 * 1024,),
+            )
+        return self._executor
+
+    async def startup(self) -> None:
+        # start the workers now rather than on the first document
+        await self.run(os.getpid)
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(*args)`` in a worker process, within the job limits."""
+        for attempt in range(2):
+            executor = self.executor
+            future = asyncio.get_running_loop().run_in_executor(
+                executor, _run_limited, fn, Settings.Config.EXTRACTION_CPU_SECONDS, *args
+            )
+            try:
+                result = await asyncio.wait_for(future, Settings.Config.EXTRACTION_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.failed += 1
+                self._recycle(executor, "a job hung")
+                raise ExtractionTimeout(f"Parsing took longer than {Settings.Config.EXTRACTION_TIMEOUT}s")
+            except BrokenProcessPool:
+                self._recycle(executor, "a worker died")
+                if attempt == 0:
+                    continue
+                self.failed += 1
+                raise
+            except Exception:
+                self.failed += 1
+                raise
+            self.completed += 1
+            return result
+
+    def _recycle(self, executor: ProcessPoolExecutor, reason: str) -> None:
+        """Kill the workers of ``executor`` and start over with a new pool."""
+        if self._executor is not executor:
+            return  # already replaced by a concurrent job
+        logger.warning(f"Restarting the extraction pool: {reason}")
+        self._executor = None
+        self.recycled += 1
+        # ProcessPoolExecutor cannot cancel a running job; stop its process
+        for process in list((executor._processes or {}).values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": Settings.Config.EXTRACTION_WORKERS,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recycled": self.recycled,
+        }
+
+
+extraction_pool = ExtractionPool()
@@ -0,0 +1,99 @@
+from io import BytesIO
+from typing import BinaryIO, Iterable, Iterator, Optional, Union
+
+# MIME subtypes parsed locally; anything else goes to the LLM extraction
+PARSED_TYPES = {
+    "plain",
+    "pdf",
+    "msword",
+    "vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+SEPARATOR = "\n\n"
+
+# Bump whenever a parser change alters extracted text, so cached
+# extractions made by the previous parsers are no longer used
+EXTRACTOR_VERSION = 1
+
+
+def _open(source: Union[bytes, str]) -> BinaryIO:
+    return BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def join_within(pieces: Iterable[str], max_chars: Optional[int]) -> str:
+    """
+    Join ``pieces`` with blank lines, stopping as soon as ``max_chars``
+    characters are reached, so the remaining pieces are never produced.
+    """
+    out: list[str] = []
+    length = 0
+    for piece in pieces:
+        if out:
+            out.append(SEPARATOR)
+            length += len(SEPARATOR)
+        out.append(piece)
+        length += len(piece)
+        if max_chars and length >= max_chars:
+            break
+    text = "".join(out)
+    return text[:max_chars] if max_chars else text
+
+
+def pdf_page_count(source: Union[bytes, str]) -> int:
+    from PyPDF2 import PdfReader
+    with _open(source) as stream:
+        return len(PdfReader(stream).pages)
+
+
+def iter_pdf_pages(stream: BinaryIO, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Text of the pages ``start`` to ``stop`` of a PDF, one page at a time."""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(stream)
+    pages = reader.pages
+    for number in range(start, min(stop if stop is not None else len(pages), len(pages))):
+        yield pages[number].extract_text() or ""
+
+
+def pdf_pages_text(
+    source: Union[bytes, str], start: int, stop: Optional[int], max_chars: Optional[int] = None
+) -> str:
+    """Text of a range of pages, stopping early at ``max_chars``."""
+    with _open(source) as stream:
+        return join_within(iter_pdf_pages(stream, start, stop), max_chars)
+
+
+def parse_document(source: Union[bytes, str], subtype: str, max_chars: Optional[int] = None) -> str:
+    """
+    Text content of a document, dispatched on its MIME subtype. ``source``
+    is either the document itself or the path of a file holding it, which
+    parsers read and seek in without loading it whole. With ``max_chars``,
+    only the start of the document is extracted: PDF pages and DOCX
+    paragraphs are read until the budget is reached.
+
+    Runs in the extraction worker processes, so parser libraries are only
+    imported there.
+    """
+    if subtype == "plain":
+        with _open(source) as stream:
+            # a UTF-8 character is at most 4 bytes
+            data = stream.read(4 * max_chars) if max_chars else stream.read()
+        return data.decode('utf-8', errors='ignore' if max_chars else 'strict')[:max_chars]
+
+    if subtype == "pdf":
+        return pdf_pages_text(source, 0, None, max_chars)
+
+    if subtype == "msword":
+        import textract
+        if isinstance(source, bytes):
+            text = str(textract.process(input_data=source, extension='doc').decode('utf-8'))
+        else:
+            text = str(textract.process(source, extension='doc').decode('utf-8'))
+        return text[:max_chars] if max_chars else text
+
+    if subtype == "vnd.openxmlformats-officedocument.wordprocessingml.document":
+        from docx import Document
+        with _open(source) as stream:
+            doc = Document(stream)
+            return join_within((p.text for p in doc.paragraphs), max_chars)
+
+    raise ValueError(f"Unsupported document type: {subtype}")
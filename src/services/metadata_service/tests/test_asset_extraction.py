@@ -0,0 +1,103 @@
+import os
+from io import BytesIO
+
+import pytest
+
+from src.core.config import Settings
+from src.utils import asset_extration
+from src.utils.asset_extration import AssetExtraction
+from src.utils.parsers import join_within, parse_document, pdf_page_count
+
+
+class FakeBody(BytesIO):
+    def iter_chunks(self, chunk_size):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_object(self, Bucket, Key):
+        data = self.objects[Key]
+        return {"Body": FakeBody(data), "ContentLength": len(data)}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3({"small.txt": b"small", "large.txt": b"x" * 4096})
+    monkeypatch.setattr(asset_extration, "_s3", fake)
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_SPOOL_BYTES", 1024)
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MAX_FILE_BYTES", 8192)
+    return fake
+
+
+def test_small_objects_stay_in_memory(s3):
+    assert AssetExtraction.download("assets", "small.txt") == b"small"
+
+
+def test_large_objects_are_spooled_to_disk(s3):
+    path = AssetExtraction.download("assets", "large.txt")
+    try:
+        assert isinstance(path, str)
+        assert parse_document(path, "plain") == "x" * 4096
+    finally:
+        os.unlink(path)
+
+
+def test_oversized_objects_are_refused(monkeypatch, s3):
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MAX_FILE_BYTES", 100)
+    with pytest.raises(ValueError):
+        AssetExtraction.download("assets", "large.txt")
+
+
+def test_plain_text_is_cut_at_the_budget():
+    assert parse_document(("é" * 100).encode(), "plain", max_chars=10) == "é" * 10
+
+
+def test_join_within_stops_consuming_pieces_at_the_budget():
+    produced = []
+
+    def pieces():
+        for i in range(100):
+            produced.append(i)
+            yield "x" * 10
+
+    assert join_within(pieces(), 25) == "x" * 10 + "\n\n" + "x" * 10 + "\n\n" + "x"
+    assert produced == [0, 1, 2]
+
+
+@pytest.fixture
+def fake_pdf(monkeypatch):
+    """A 300-page PDF whose pages read 'p<n>', parsed by a fake pool."""
+    calls = []
+
+    async def run(fn, source, *args):
+        if fn is pdf_page_count:
+            return 300
+        first, last, max_chars = args
+        calls.append((first, last))
+        return join_within((f"p{n}" for n in range(first, last)), max_chars)
+
+    monkeypatch.setattr(asset_extration.extraction_pool, "run", run)
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_WORKERS", 4)
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_PDF_RANGE_PAGES", 20)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_pdf_with_small_budget_reads_only_the_first_range(monkeypatch, fake_pdf):
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MAX_CHARS", 30)
+    text = await AssetExtraction.extract_pdf(b"%PDF")
+    assert text.startswith("p0\n\np1") and len(text) == 30
+    assert fake_pdf == [(0, 20)]
+
+
+@pytest.mark.asyncio
+async def test_pdf_without_budget_is_split_in_widening_waves(monkeypatch, fake_pdf):
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MAX_CHARS", 0)
+    text = await AssetExtraction.extract_pdf(b"%PDF")
+    assert text.split("\n\n") == [f"p{n}" for n in range(300)]
+    assert fake_pdf[:3] == [(0, 20), (20, 40), (40, 60)]
+    assert fake_pdf[-1] == (280, 300) and len(fake_pdf) == 15
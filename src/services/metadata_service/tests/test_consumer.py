@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from src.utils.consumer import QueueConsumer
+
+
+class FakeMessage:
+    def __init__(self, body):
+        self.body = body
+        self.message_id = body
+        self.outcome = None
+
+    async def ack(self):
+        self.outcome = "ack"
+
+    async def reject(self, requeue=False):
+        self.outcome = "requeue" if requeue else "reject"
+
+    async def nack(self, requeue=True):
+        self.outcome = "requeue" if requeue else "reject"
+
+
+def consumer_for(handler, concurrency=2, job_timeout=1.0, drain_timeout=1.0):
+    return QueueConsumer(
+        "test", handler, prefetch=10, concurrency=concurrency,
+        job_timeout=job_timeout, drain_timeout=drain_timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_concurrently_up_to_the_limit():
+    running = peak = 0
+
+    async def handler(message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    consumer = consumer_for(handler, concurrency=3)
+    messages = [FakeMessage(str(i)) for i in range(10)]
+    for message in messages:
+        await consumer._on_message(message)
+    await asyncio.gather(*consumer._tasks)
+    assert peak == 3
+    assert all(m.outcome == "ack" for m in messages)
+    assert consumer.stats()["processed"] == 10
+
+
+@pytest.mark.asyncio
+async def test_failing_and_slow_jobs_are_rejected():
+    async def handler(message):
+        if message.body == "boom":
+            raise ValueError("bad document")
+        await asyncio.sleep(10)
+
+    consumer = consumer_for(handler, job_timeout=0.01)
+    failing, slow = FakeMessage("boom"), FakeMessage("slow")
+    for message in (failing, slow):
+        await consumer._on_message(message)
+    await asyncio.gather(*consumer._tasks)
+    assert (failing.outcome, slow.outcome) == ("reject", "reject")
+    assert consumer.stats()["failed"] == 1 and consumer.stats()["timed_out"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_requeues_messages_not_started_yet():
+    started = asyncio.Event()
+
+    async def handler(message):
+        started.set()
+        await asyncio.sleep(0.05)
+
+    consumer = consumer_for(handler, concurrency=1)
+    first, waiting = FakeMessage("1"), FakeMessage("2")
+    await consumer._on_message(first)
+    await consumer._on_message(waiting)
+    await started.wait()
+    await consumer.stop()
+    assert (first.outcome, waiting.outcome) == ("ack", "requeue")
+
+
+@pytest.mark.asyncio
+async def test_asset_upload_queue_dead_letters_rejected_messages():
+    from shared.events import ASSET_UPLOAD_QUEUE_ARGUMENTS, QueueEventNames, declare_asset_upload_queue
+
+    declared = []
+
+    class FakeQueue:
+        def __init__(self, name, arguments):
+            self.name = name
+            self.arguments = arguments
+            self.bound_to = None
+
+        async def bind(self, exchange):
+            self.bound_to = exchange
+
+    class FakeChannel:
+        async def declare_exchange(self, name, kind, durable):
+            return name
+
+        async def declare_queue(self, name, durable, arguments=None):
+            declared.append(FakeQueue(name, arguments))
+            return declared[-1]
+
+    queue = await declare_asset_upload_queue(FakeChannel())
+    failed = declared[0]
+    assert queue.name == QueueEventNames.asset_upload
+    assert queue.arguments == ASSET_UPLOAD_QUEUE_ARGUMENTS
+    assert ASSET_UPLOAD_QUEUE_ARGUMENTS["x-dead-letter-exchange"] == QueueEventNames.asset_upload_dead_letter
+    assert (failed.name, failed.bound_to) == (QueueEventNames.asset_upload_failed, QueueEventNames.asset_upload_dead_letter)
@@ -0,0 +1,75 @@
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from src.core.config import Settings
+from src.database.crud.metadata_service_crud import AssetCRUD
+from src.database.db import db
+from src.utils import asset_extration
+from src.utils.asset_extration import AssetExtraction
+from src.utils.extraction_cache import extraction_cache
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate")
+        self.docs[doc["_id"]] = doc
+
+
+class FakeS3:
+    def head_object(self, Bucket, Key):
+        return {"ETag": '"abc123"'}
+
+
+@pytest.fixture
+def extraction(monkeypatch):
+    parsed = []
+
+    async def get_by_id(asset_id):
+        return {
+            "id": asset_id, "url": f"http://s3/assets/{asset_id}.pdf",
+            "content_type": "application/pdf", "content_hash": None,
+        }
+
+    async def read_from_s3(url, content_type):
+        parsed.append(url)
+        return f"text of {url}"
+
+    monkeypatch.setattr(db, "extraction_cache", FakeCollection())
+    monkeypatch.setattr(asset_extration, "_s3", FakeS3())
+    monkeypatch.setattr(AssetCRUD, "get_by_id", get_by_id)
+    monkeypatch.setattr(AssetExtraction, "read_from_s3", read_from_s3)
+    return parsed
+
+
+@pytest.mark.asyncio
+async def test_same_content_is_extracted_once(extraction):
+    first = await AssetExtraction.read_asset_by_id("a1", "f00d")
+    # another asset with the same bytes, e.g. a second upload
+    second = await AssetExtraction.read_asset_by_id("a2", "f00d")
+    assert first == second == "text of http://s3/assets/a1.pdf"
+    assert extraction == ["http://s3/assets/a1.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_unhashed_uploads_are_keyed_by_etag(extraction):
+    await AssetExtraction.read_asset_by_id("a1")
+    await AssetExtraction.read_asset_by_id("a1")
+    assert len(extraction) == 1
+    key, = db.extraction_cache.docs
+    assert key.endswith("application/pdf:etag:abc123")
+
+
+@pytest.mark.asyncio
+async def test_budget_is_part_of_the_key(monkeypatch, extraction):
+    await AssetExtraction.read_asset_by_id("a1", "f00d")
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MAX_CHARS", 100)
+    await AssetExtraction.read_asset_by_id("a1", "f00d")
+    assert len(extraction) == 2
+    assert extraction_cache.key("text/plain") is None
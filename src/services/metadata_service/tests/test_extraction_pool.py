@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import pytest_asyncio
+
+from src.core.config import Settings
+from src.utils.extraction_pool import ExtractionPool, ExtractionTimeout
+from src.utils.parsers import parse_document
+
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = ExtractionPool()
+    yield pool
+    await pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_documents_are_parsed_in_worker_processes(pool):
+    assert await pool.run(parse_document, "héllo".encode(), "plain") == "héllo"
+    assert await pool.run(os.getpid) != os.getpid()
+
+
+@pytest.mark.asyncio
+async def test_hung_job_times_out_and_pool_recovers(monkeypatch, pool):
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_TIMEOUT", 0.5)
+    with pytest.raises(ExtractionTimeout):
+        await pool.run(time.sleep, 30)
+    assert pool.stats()["recycled"] == 1
+    assert await pool.run(parse_document, b"ok", "plain") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_crashing_worker_is_replaced(pool):
+    with pytest.raises(BrokenProcessPool):
+        await pool.run(os.abort)
+    assert pool.stats()["recycled"] == 2  # crashed again on the retry
+    assert await pool.run(parse_document, b"ok", "plain") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_applies_per_worker(monkeypatch, pool):
+    monkeypatch.setattr(Settings.Config, "EXTRACTION_MEMORY_MB", 256)
+    with pytest.raises(MemoryError):
+        await pool.run(bytearray, 1024 * 1024 * 1024)
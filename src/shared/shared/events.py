@@ -1,3 +1,33 @@
 class QueueEventNames:
     asset_upload = "asset_upload"
+    # dead-letter exchange of asset_upload, and the queue keeping the upload
+    # events metadata_service rejected (failed or timed out) for replay
+    asset_upload_dead_letter = "asset_upload.dead_letter"
+    asset_upload_failed = "asset_upload.failed"
+    # image/video assets waiting for thumbnails, renditions or poster frames
+    asset_derivatives = "asset_derivatives"
+    # fanout exchange: an asset's stored metadata changed
+    asset_updated = "asset_updated"
 
+
+# asset_upload must be declared with the same arguments by its publisher and
+# its consumer: RabbitMQ refuses to redeclare a queue with other arguments
+ASSET_UPLOAD_QUEUE_ARGUMENTS = {
+    "x-dead-letter-exchange": QueueEventNames.asset_upload_dead_letter,
+}
+
+
+async def declare_asset_upload_queue(channel):
+    """
+    Declare the asset_upload queue on an aio_pika ``channel``, along with its
+    dead-letter exchange and the asset_upload.failed queue bound to it, so
+    rejected upload events are kept instead of dropped.
+    """
+    dead_letters = await channel.declare_exchange(
+        QueueEventNames.asset_upload_dead_letter, "fanout", durable=True
+    )
+    failed = await channel.declare_queue(QueueEventNames.asset_upload_failed, durable=True)
+    await failed.bind(dead_letters)
+    return await channel.declare_queue(
+        QueueEventNames.asset_upload, durable=True, arguments=ASSET_UPLOAD_QUEUE_ARGUMENTS
+    )